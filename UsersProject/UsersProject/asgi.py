@@ -7,12 +7,16 @@ from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 from channels.security.websocket import AllowedHostsOriginValidator
-from notifications.routing import websocket_urlpatterns
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'UsersProject.settings')
 
 django_asgi_app = get_asgi_application()
 
+from notifications.routing import websocket_urlpatterns as notification_urlpatterns
+from user_management.routing import websocket_urlpatterns as computer_urlpatterns
+
+websocket_urlpatterns = notification_urlpatterns + computer_urlpatterns
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AllowedHostsOriginValidator(
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
+from urllib.parse import urlparse
 from decouple import config, Config, RepositoryEnv
 import dj_database_url
 import os
@@ -179,10 +180,16 @@ ASGI_APPLICATION = 'UsersProject.asgi.application'
 # Channels
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer'
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [os.getenv('CHANNEL_REDIS_URL', 'redis://localhost:6379/1')],
+        },
     },
 }
 
+# Maximum flushes per second of coalesced diffs to each ws/computers/ client
+FLEET_STREAM_MAX_HZ = float(os.getenv('FLEET_STREAM_MAX_HZ', 2))
+
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
@@ -239,6 +246,7 @@ ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'infotech')
 ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'gidget003')
 USER_PROFILES = ["Client"]
 CSV_FILE = os.getenv('CSV_FILE', 'Lab-Computers.csv')
+PC_NAMES_FILE = os.getenv('PC_NAMES_FILE', 'pc_names.txt')
 
 # Network share settings
 NETWORK_SHARE_PATH = 'shared/scans'  # Path to scan on network shares
@@ -319,10 +327,30 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'user_management.tasks.analyze_logs',
         'schedule': timedelta(minutes=5),
     },
+    'mark-offline-computers': {
+        'task': 'user_management.tasks.mark_offline_computers',
+        'schedule': timedelta(minutes=1),
+    },
+    'sweep-reachability': {
+        'task': 'user_management.tasks.sweep_reachability',
+        'schedule': timedelta(minutes=5),
+    },
+    'discover-computers': {
+        'task': 'user_management.tasks.discover_computers',
+        'schedule': timedelta(hours=1),
+    },
     'check-scan-schedules': {
         'task': 'user_management.tasks.check_and_run_scheduled_scans',
         'schedule': timedelta(minutes=2),
     },
+    'recover-scan-jobs': {
+        'task': 'user_management.tasks.recover_scan_jobs',
+        'schedule': timedelta(minutes=5),
+    },
+    'reap-stale-commands': {
+        'task': 'user_management.tasks.reap_stale_commands',
+        'schedule': timedelta(minutes=1),
+    },
 }
 
 # Email Configuration
@@ -408,6 +436,27 @@ AI_SETTINGS = {
     'CACHE_TIMEOUT': 86400,  # 24 hours
 }
 
+# Metrics ingestion dead-bands: a value is only written when it moves by more than
+# `delta` or `max_age` seconds have passed since the last full write of the row.
+# Defaults are DEFAULT_DEADBANDS in user_management/services/metrics_deadband.py; entries
+# set here, e.g. {'cpu.percent': {'delta': 5.0, 'max_age': 600}}, override them per path.
+METRICS_DEADBANDS = {}
+# Minimum seconds between last_seen-only heartbeat writes for suppressed reports
+METRICS_HEARTBEAT_INTERVAL = int(os.getenv('METRICS_HEARTBEAT_INTERVAL', 60))
+
+# Streaming anomaly detection on cpu/memory/disk percent: EWMA z-score spikes and
+# values held above `sustained_above` for `sustained_minutes`. Defaults are
+# DEFAULT_ANOMALY_RULES in user_management/services/metrics_anomaly.py; keys set here,
+# e.g. {'cooldown_minutes': 30, 'metrics': {'cpu.percent': {...}}}, override them.
+METRICS_ANOMALY_RULES = {}
+# Seconds between checkpoints of the detector baselines to METRICS_ANOMALY_STATE_FILE
+METRICS_ANOMALY_CHECKPOINT_INTERVAL = int(os.getenv('METRICS_ANOMALY_CHECKPOINT_INTERVAL', 60))
+# Kept out of the cache directory so cache culling never drops the baselines
+METRICS_ANOMALY_STATE_FILE = os.getenv('METRICS_ANOMALY_STATE_FILE', os.path.join(AI_CACHE_DIR, 'metrics_anomaly_state.json'))
+
+# Minutes without a report before a computer is marked offline
+COMPUTER_OFFLINE_THRESHOLD_MINUTES = int(os.getenv('COMPUTER_OFFLINE_THRESHOLD_MINUTES', 30))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -419,4 +468,77 @@ RELAY_TOKEN = os.getenv('RELAY_TOKEN', 'JXpV2Tl9UR1LQrhnhPQrzJ6GPCFlnEIzzlAkN3Pk
 # Token for computer agent authentication - load from environment or use default for development
 COMPUTER_AGENT_TOKEN = os.getenv('COMPUTER_AGENT_TOKEN', 'JXpV2Tl9UR1LQrhnhPQrzJ6GPCFlnEIzzlAkN3PkeT8')
 
-INFOTECH_PASSWORD = os.getenv('INFOTECH_PASSWORD', 'gidget003')
\ No newline at end of file
+INFOTECH_PASSWORD = os.getenv('INFOTECH_PASSWORD', 'gidget003')
+# Remote command execution over WinRM: global worker cap, per-command timeout (seconds),
+# lifetime of cached per-host sessions (seconds) and transport ('winrm' or 'fake' for offline use)
+REMOTE_EXEC_MAX_WORKERS = int(os.getenv('REMOTE_EXEC_MAX_WORKERS', 16))
+REMOTE_EXEC_TIMEOUT = float(os.getenv('REMOTE_EXEC_TIMEOUT', 75))
+REMOTE_EXEC_SESSION_TTL = int(os.getenv('REMOTE_EXEC_SESSION_TTL', 600))
+REMOTE_EXEC_TRANSPORT = os.getenv('REMOTE_EXEC_TRANSPORT', 'winrm')
+
+# Longest an agent may hold GET /api/computers/commands/?wait=N open
+COMMAND_LONG_POLL_MAX_SECONDS = float(os.getenv('COMMAND_LONG_POLL_MAX_SECONDS', 25))
+# Seconds a dispatched command may run without a result before the reaper fails it
+# (job commands) or hands it back to the agent's long-poll (stand-alone commands)
+COMMAND_RUNNING_TIMEOUT_SECONDS = int(os.getenv('COMMAND_RUNNING_TIMEOUT_SECONDS', 900))
+
+# Concurrent reachability sweep: TCP ports tried per host, per-probe timeout (seconds),
+# probes in flight and whether to fall back to ICMP ping where it is permitted
+REACHABILITY_PORTS = (445, 5985)
+REACHABILITY_TIMEOUT = float(os.getenv('REACHABILITY_TIMEOUT', 1.0))
+REACHABILITY_CONCURRENCY = int(os.getenv('REACHABILITY_CONCURRENCY', 256))
+REACHABILITY_ICMP_FALLBACK = env_config('REACHABILITY_ICMP_FALLBACK', default=False, cast=bool)
+
+# Subnet discovery: ranges swept hourly for unregistered lab machines, addresses to skip
+# (the relay server by default), probe rate limit and reverse DNS timeout (seconds).
+# New responders are only registered as computers when DISCOVERY_REGISTER_NEW is on;
+# otherwise they are logged and known machines are just refreshed.
+DISCOVERY_CIDRS = [cidr for cidr in os.getenv('DISCOVERY_CIDRS', '192.168.72.0/24').split(',') if cidr.strip()]
+DISCOVERY_EXCLUDE = [ip.strip() for ip in os.getenv('DISCOVERY_EXCLUDE', urlparse(RELAY_URL).hostname or '').split(',') if ip.strip()]
+DISCOVERY_REGISTER_NEW = env_config('DISCOVERY_REGISTER_NEW', default=False, cast=bool)
+DISCOVERY_PROBES_PER_SECOND = float(os.getenv('DISCOVERY_PROBES_PER_SECOND', 200))
+DISCOVERY_DNS_TIMEOUT = float(os.getenv('DISCOVERY_DNS_TIMEOUT', 2.0))
+
+# File scans: computers scanned in parallel, seconds before a host is given up on,
+# and the timeout for each net use call
+SCAN_MAX_PARALLEL_HOSTS = int(os.getenv('SCAN_MAX_PARALLEL_HOSTS', 8))
+SCAN_HOST_TIMEOUT = int(os.getenv('SCAN_HOST_TIMEOUT', 900))
+SCAN_COMMAND_TIMEOUT = int(os.getenv('SCAN_COMMAND_TIMEOUT', 120))
+
+# Where scans read from: 'unc' (\\ip\C$ admin shares) or 'local' (shares mounted under
+# SCAN_LOCAL_ROOT, e.g. CIFS mounts on Linux), which profile folders are searched and
+# which directory names (wildcards allowed) are never descended into
+SCAN_BACKEND = os.getenv('SCAN_BACKEND', 'unc')
+SCAN_LOCAL_ROOT = os.getenv('SCAN_LOCAL_ROOT', '/mnt/lab/{ip_address}/{share_path}')
+SCAN_TARGET_FOLDERS = [f.strip() for f in os.getenv('SCAN_TARGET_FOLDERS', 'Desktop,Documents,Downloads').split(',') if f.strip()]
+SCAN_PRUNE_DIRS = [d.strip() for d in os.getenv(
+    'SCAN_PRUNE_DIRS',
+    'AppData,Application Data,Local Settings,node_modules,OneDrive*,$Recycle.Bin,.git,.cache,__pycache__,My Documents,Cookies'
+).split(',') if d.strip()]
+
+# Parsed PDFs kept in memory per process (the database copy is unbounded)
+PDF_EXTRACTION_CACHE_SIZE = int(os.getenv('PDF_EXTRACTION_CACHE_SIZE', 512))
+
+# Per-host scan pipeline: worker threads for hashing/classifying, PDF extraction and
+# copying, the bounded queue size between stages, and processes shared by all hosts
+# for PDF parsing (defaults to the CPU count)
+SCAN_PIPELINE_CLASSIFY_WORKERS = int(os.getenv('SCAN_PIPELINE_CLASSIFY_WORKERS', 2))
+SCAN_PIPELINE_EXTRACT_WORKERS = int(os.getenv('SCAN_PIPELINE_EXTRACT_WORKERS', 2))
+SCAN_PIPELINE_COPY_WORKERS = int(os.getenv('SCAN_PIPELINE_COPY_WORKERS', 4))
+SCAN_PIPELINE_QUEUE_SIZE = int(os.getenv('SCAN_PIPELINE_QUEUE_SIZE', 64))
+SCAN_EXTRACT_PROCESSES = int(os.getenv('SCAN_EXTRACT_PROCESSES', 0)) or None
+
+# Scan job progress is buffered and written after this many finished hosts or seconds
+SCAN_PROGRESS_FLUSH_EVERY = int(os.getenv('SCAN_PROGRESS_FLUSH_EVERY', 10))
+SCAN_PROGRESS_FLUSH_SECONDS = float(os.getenv('SCAN_PROGRESS_FLUSH_SECONDS', 5))
+
+# Scan jobs checkpoint finished files to the manifest in batches of this size; a cancelled
+# scan gets SCAN_CANCEL_DRAIN_SECONDS to finish files in flight, and an active job whose
+# heartbeat is older than SCAN_JOB_STALE_SECONDS is treated as orphaned and can be resumed
+SCAN_CHECKPOINT_BATCH = int(os.getenv('SCAN_CHECKPOINT_BATCH', 200))
+SCAN_CANCEL_DRAIN_SECONDS = float(os.getenv('SCAN_CANCEL_DRAIN_SECONDS', 60))
+SCAN_JOB_STALE_SECONDS = int(os.getenv('SCAN_JOB_STALE_SECONDS', 300))
+
+# Copy engine: read/write buffer per copy and how many files a file copy job moves at once
+SCAN_COPY_BUFFER_SIZE = int(os.getenv('SCAN_COPY_BUFFER_SIZE', 8 * 1024 * 1024))
+SCAN_COPY_WORKERS = int(os.getenv('SCAN_COPY_WORKERS', 4))
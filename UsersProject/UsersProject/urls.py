@@ -8,7 +8,7 @@ from user_management.views import ScanScheduleViewSet
 from user_management.views_scan import ScanViewSet
 from user_management.views_notification import NotificationViewSet
 from user_management.views_document import DocumentViewSet
-from user_management.views_computer import ComputerViewSet
+from user_management.views_computer import ComputerViewSet, CommandJobViewSet
 from user_management.views_document_tags import DocumentTagViewSet
 
 from rest_framework.routers import DefaultRouter
@@ -16,6 +16,7 @@ from rest_framework.routers import DefaultRouter
 # Create a router for API endpoints
 router = DefaultRouter()
 router.register(r'computers', ComputerViewSet, basename='computer')
+router.register(r'command-jobs', CommandJobViewSet, basename='command-job')
 router.register(r'documents', DocumentViewSet, basename='document')
 router.register(r'notifications', NotificationViewSet, basename='notification')
 router.register(r'scan-schedules', ScanScheduleViewSet, basename='scan-schedule')
@@ -219,7 +219,10 @@ class RelayServer:
                 logging.debug(f"Received data: {message[:100]}...")  # Log first 100 chars
                 return
             
-            if source_type == "django":
+            if source_type == "django" and message_type == "command_fanout":
+                await self.fan_out_command(message_data)
+
+            elif source_type == "django":
                 # Relay from Django to agent
                 target_hostname = message_data.get("target_hostname") or hostname
                 if not target_hostname:
@@ -299,6 +302,46 @@ class RelayServer:
         except Exception as e:
             logging.error(f"Error relaying message: {e}", exc_info=True)
 
+    async def fan_out_command(self, message_data: dict) -> None:
+        """Deliver one command frame from Django to every targeted agent."""
+        command = message_data.get("command")
+        parameters = message_data.get("parameters") or {}
+        targets = message_data.get("targets") or []
+
+        async def deliver(target):
+            hostname = target.get("hostname")
+            command_id = target.get("command_id")
+            agent = self.clients.get(hostname)
+            try:
+                if agent is None:
+                    raise ConnectionError("agent not connected")
+                await agent.send(json.dumps({
+                    **parameters,
+                    "type": "command",
+                    "command": command,
+                    "command_id": command_id,
+                }))
+                return None
+            except Exception as e:
+                # Report undeliverable commands so the job does not wait on them
+                return {
+                    "type": "command_result",
+                    "hostname": hostname,
+                    "command_id": command_id,
+                    "status": "failed",
+                    "undelivered": True,
+                    "data": {"error": f"Could not deliver to {hostname}: {e}"},
+                }
+
+        failures = [r for r in await asyncio.gather(*(deliver(t) for t in targets)) if r]
+        logging.info(
+            f"Fanned out {command} for job {message_data.get('job_id')} "
+            f"to {len(targets) - len(failures)}/{len(targets)} agents"
+        )
+        if failures and self.django_client:
+            for failure in failures:
+                await self.django_client.send(json.dumps(failure))
+
 def main():
     server = RelayServer()
     asyncio.run(server.start())
@@ -256,7 +256,7 @@ def send_error_notification(error_type, title, message, details=None, attachment
         except Exception as e:
             logger.error(f"Error sending notification to admin {pref.user.username}: {str(e)}")
 
-def store_scanned_pdf(file_path, computer_label, user=None):
+def store_scanned_pdf(file_path, computer_label, user=None, filename=None, content=None):
     """
     Store a scanned PDF file in the web storage system.
     
@@ -264,28 +264,30 @@ def store_scanned_pdf(file_path, computer_label, user=None):
         file_path: Path to the PDF file
         computer_label: Label of the computer that was scanned
         user: Optional user who initiated the scan
+        filename: Optional name to store it under (defaults to the file's own name)
+        content: Optional open django File to read from instead of opening file_path,
+            so callers can stream the source straight into storage
     
     Returns:
         PDFAttachment instance if successful, None if failed
     """
     try:
         # Get the original filename
-        original_filename = os.path.basename(file_path)
+        original_filename = filename or os.path.basename(file_path)
         
         # Create a new PDFAttachment instance
-        with open(file_path, 'rb') as f:
-            attachment = PDFAttachment(
-                original_filename=f"{computer_label}_{original_filename}",
-                uploaded_by=user,
-                file_size=os.path.getsize(file_path)
-            )
-            
-            # Save the file to the storage system
-            attachment.file.save(
-                f"{computer_label}/{original_filename}",
-                File(f),
-                save=True
-            )
+        attachment = PDFAttachment(
+            original_filename=f"{computer_label}_{original_filename}",
+            uploaded_by=user,
+            file_size=os.path.getsize(file_path)
+        )
+
+        # Save the file to the storage system
+        if content is not None:
+            attachment.file.save(f"{computer_label}/{original_filename}", content, save=True)
+        else:
+            with open(file_path, 'rb') as f:
+                attachment.file.save(f"{computer_label}/{original_filename}", File(f), save=True)
             
         return attachment
     except Exception as e:
@@ -118,7 +118,7 @@ class ComputerAdmin(admin.ModelAdmin):
     get_status.admin_order_field = 'last_metrics_update'
 
 class FileTransferAdmin(admin.ModelAdmin):
-    list_display = ['computer', 'timestamp', 'source_file', 'successful']
+    list_display = ['computer', 'timestamp', 'source_file', 'bytes_transferred', 'duration', 'successful']
     list_filter = ['successful', 'timestamp']
     search_fields = ['source_file', 'destination_file']
 
@@ -6,6 +6,8 @@ class UserManagementConfig(AppConfig):
     name = 'user_management'
 
     def ready(self):
+        from . import signals  # noqa: F401
+
         # Only run in main process
         if os.environ.get('RUN_MAIN') != 'true':
             return
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import logging
+from http.cookies import SimpleCookie
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+
+from .services.fleet_stream import FLEET_GROUP, fleet_snapshot
+from .services.command_dispatch import command_dispatcher, job_group
+
+logger = logging.getLogger(__name__)
+
+
+@database_sync_to_async
+def get_user_for_token(token_key):
+    """Resolve the DRF token cookie used by the frontend to a user"""
+    from rest_framework.authtoken.models import Token
+    token = Token.objects.select_related('user').filter(key=token_key).first()
+    if token and token.user.is_active:
+        return token.user
+    return None
+
+
+class AuthenticatedConsumer(AsyncWebsocketConsumer):
+    """Base consumer accepting session users or the frontend's token cookie"""
+
+    async def _authenticate(self):
+        user = self.scope.get('user')
+        if user is not None and not user.is_anonymous:
+            return user
+
+        # Fall back to the token cookie the frontend authenticates with
+        headers = dict(self.scope.get('headers', []))
+        cookie = SimpleCookie(headers.get(b'cookie', b'').decode('latin-1'))
+        if 'token' in cookie:
+            return await get_user_for_token(cookie['token'].value)
+        return None
+
+
+class ComputerStreamConsumer(AuthenticatedConsumer):
+    """Live fleet stream: an initial snapshot followed by coalesced per-computer diffs"""
+
+    async def connect(self):
+        user = await self._authenticate()
+        if user is None:
+            await self.close()
+            return
+
+        self.pending = {}
+        self.flush_interval = 1.0 / max(getattr(settings, 'FLEET_STREAM_MAX_HZ', 2), 0.1)
+        self.flush_task = None
+
+        # Join before reading the snapshot so no update in between is lost
+        await self.channel_layer.group_add(FLEET_GROUP, self.channel_name)
+        await self.accept()
+
+        computers = await database_sync_to_async(fleet_snapshot)()
+        await self.send(text_data=json.dumps({
+            'type': 'snapshot',
+            'computers': computers
+        }))
+        self.flush_task = asyncio.create_task(self._flush_loop())
+
+    async def disconnect(self, close_code):
+        flush_task = getattr(self, 'flush_task', None)
+        if flush_task:
+            flush_task.cancel()
+        if hasattr(self, 'pending'):
+            await self.channel_layer.group_discard(FLEET_GROUP, self.channel_name)
+
+    async def computer_diff(self, event):
+        """Coalesce a computer update into the next flush"""
+        self.pending.setdefault(event['id'], {}).update(event['fields'])
+
+    async def _flush_loop(self):
+        """Send pending diffs at most FLEET_STREAM_MAX_HZ times per second"""
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                if not self.pending:
+                    continue
+                pending, self.pending = self.pending, {}
+                await self.send(text_data=json.dumps({
+                    'type': 'diff',
+                    'computers': [{'id': computer_id, **fields} for computer_id, fields in pending.items()]
+                }))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Fleet stream flush failed: {str(e)}")
+
+
+class CommandJobConsumer(AuthenticatedConsumer):
+    """Stream progress of one command job as its results arrive"""
+
+    async def connect(self):
+        user = await self._authenticate()
+        if user is None:
+            await self.close()
+            return
+
+        self.group_name = job_group(int(self.scope['url_route']['kwargs']['job_id']))
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        progress = await database_sync_to_async(self._current_progress)()
+        if progress is None:
+            await self.close()
+            return
+        await self.send(text_data=json.dumps({'type': 'progress', 'progress': progress}))
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def job_progress(self, event):
+        await self.send(text_data=json.dumps({'type': 'progress', 'progress': event['progress']}))
+
+    def _current_progress(self):
+        from .models import CommandJob
+        job = CommandJob.objects.filter(id=self.scope['url_route']['kwargs']['job_id']).first()
+        return command_dispatcher.progress(job) if job else None
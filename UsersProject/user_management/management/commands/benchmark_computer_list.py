@@ -0,0 +1,94 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from user_management.models import Computer
+from user_management.serializers import ComputerSerializer, ComputerListSerializer, parse_fields_param
+
+LIST_FIELDS = 'id,label,hostname,ip_address,status,cpu_percent,memory_percent,disk_percent,last_seen'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark computer list serialization (p50/p95) against a synthetic fleet; all rows are rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='Fleet sizes to benchmark')
+        parser.add_argument('--runs', type=int, default=20, help='Timed runs per case')
+        parser.add_argument('--fields', default=LIST_FIELDS, help='Projection used for the sparse cases')
+
+    def handle(self, *args, **options):
+        fields = parse_fields_param(options['fields'])
+        for size in options['sizes']:
+            with transaction.atomic():
+                Computer.objects.filter(hostname__startswith='bench-').delete()
+                self._create_fleet(size)
+                queryset = Computer.objects.filter(hostname__startswith='bench-').order_by('label')
+
+                cases = [
+                    ('model serializer, all fields',
+                     lambda: ComputerSerializer(queryset.all(), many=True).data),
+                    ('model serializer, ?fields= (metrics deferred)',
+                     lambda: ComputerSerializer(queryset.defer('metrics'), many=True, fields=fields).data),
+                    ('values() serializer, all fields',
+                     lambda: ComputerListSerializer().serialize(queryset.all())),
+                    ('values() serializer, ?fields=',
+                     lambda: ComputerListSerializer(fields=fields).serialize(queryset.all())),
+                ]
+
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{size} computers'))
+                for name, case in cases:
+                    p50, p95 = self._measure(case, options['runs'])
+                    self.stdout.write(f'  {name:<48} p50 {p50:8.1f} ms   p95 {p95:8.1f} ms')
+
+                transaction.set_rollback(True)
+
+    def _measure(self, case, runs):
+        case()  # warm up
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            case()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))]
+        return statistics.median(timings), p95
+
+    def _create_fleet(self, size):
+        now = timezone.now()
+        computers = []
+        for i in range(size):
+            # Half the fleet reported within the offline threshold, half went quiet hours ago
+            silence = timedelta(minutes=i % 30) if i % 60 < 30 else timedelta(hours=1 + i % 3)
+            computers.append(Computer(
+                label=f'BENCH{i:05d}',
+                hostname=f'bench-{i}',
+                ip_address=f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}',
+                os_version='Windows 10 Enterprise',
+                cpu_model='Intel(R) Core(TM) i5-8500 CPU @ 3.00GHz',
+                cpu_cores=6,
+                cpu_threads=6,
+                cpu_percent=i % 100,
+                memory_total=16 * 1024 ** 3,
+                memory_percent=(i * 7) % 100,
+                total_disk=512 * 1024 ** 3,
+                disk_percent=(i * 3) % 100,
+                device_class='Desktop',
+                boot_time=now - timedelta(hours=i % 200),
+                last_seen=now - silence,
+                last_metrics_update=now - silence,
+                logged_in_user=f'student{i % 40}',
+                metrics={
+                    'cpu': {'model': 'Intel(R) Core(TM) i5-8500 CPU @ 3.00GHz', 'cores': 6, 'threads': 6,
+                            'percent': i % 100},
+                    'memory': {'total_bytes': 16 * 1024 ** 3, 'available_bytes': 8 * 1024 ** 3,
+                               'used_bytes': 8 * 1024 ** 3, 'percent': (i * 7) % 100},
+                    'disk': {'total_bytes': 512 * 1024 ** 3, 'free_bytes': 256 * 1024 ** 3,
+                             'used_bytes': 256 * 1024 ** 3, 'percent': (i * 3) % 100},
+                    'system': {'os_version': 'Windows 10 Enterprise', 'device_class': 'Desktop',
+                               'logged_in_user': f'student{i % 40}'},
+                },
+            ))
+        Computer.objects.bulk_create(computers, batch_size=1000)
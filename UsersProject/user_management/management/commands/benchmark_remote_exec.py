@@ -0,0 +1,47 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from user_management.services.remote_exec import RemoteExecEngine, FakeWinRMTransport
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the remote-exec engine against a fake WinRM transport (no lab machines needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hosts', type=int, default=60, help='Number of fake hosts')
+        parser.add_argument('--latency', type=float, default=0.5, help='Simulated seconds per command')
+        parser.add_argument('--jitter', type=float, default=0.2, help='Random +/- seconds added to the latency')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 16, 32], help='Worker caps to compare')
+        parser.add_argument('--failures', type=int, default=0, help='Number of hosts that refuse connections')
+
+    def handle(self, *args, **options):
+        hosts = [f'10.0.{i >> 8}.{i & 255}' for i in range(options['hosts'])]
+        failing = hosts[:options['failures']]
+
+        for workers in options['workers']:
+            transport = FakeWinRMTransport(latency=options['latency'], jitter=options['jitter'],
+                                           failing_hosts=failing)
+            engine = RemoteExecEngine(transport=transport, max_workers=workers, timeout=60)
+            try:
+                # Two rounds show the effect of cached sessions on the second pass
+                for round_number in (1, 2):
+                    start = time.perf_counter()
+                    first = None
+                    durations = []
+                    errors = 0
+                    for result in engine.run_fleet(hosts, 'hostname'):
+                        if first is None:
+                            first = time.perf_counter() - start
+                        if result['error']:
+                            errors += 1
+                        if result['duration'] is not None:
+                            durations.append(result['duration'])
+                    total = time.perf_counter() - start
+                    self.stdout.write(
+                        f'workers {workers:>3} round {round_number}: first result {first:6.2f}s  '
+                        f'all {total:6.2f}s  median host {statistics.median(durations):5.2f}s  '
+                        f'errors {errors}  sessions opened {transport.sessions_opened}'
+                    )
+            finally:
+                engine.shutdown()
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from user_management.models import Computer, SystemLog, LogAlert, LogCorrelation
+from user_management.services.metrics_deadband import MetricsDeadband
+from user_management.services.status_events import get_offline_threshold
+
+# Paths of the logged metrics details that identify a machine's inventory
+INVENTORY_PATHS = (
+    'cpu.model', 'cpu.cores', 'cpu.threads',
+    'memory.total', 'memory.total_bytes',
+    'disk.total', 'disk.total_bytes',
+    'system.os_version', 'system.device_class', 'system.logged_in_user',
+)
+
+
+class Command(BaseCommand):
+    help = 'Collapse redundant per-report COMPUTER_ONLINE system logs into transition events'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be removed without deleting')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted/updated per statement')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+        threshold = get_offline_threshold()
+
+        # Rows referenced by alerts or correlations are never removed
+        protected = set(LogAlert.matched_logs.through.objects.values_list('systemlog_id', flat=True))
+        protected.update(LogCorrelation.objects.values_list('primary_log_id', flat=True))
+        protected.update(LogCorrelation.related_logs.through.objects.values_list('systemlog_id', flat=True))
+
+        total_kept = 0
+        total_removed = 0
+        computer_ids = SystemLog.objects.filter(
+            category='COMPUTER_STATUS', event='COMPUTER_ONLINE', computer__isnull=False
+        ).values_list('computer_id', flat=True).distinct()
+
+        for computer_id in computer_ids.iterator():
+            rows = SystemLog.objects.filter(
+                computer_id=computer_id, category='COMPUTER_STATUS', event='COMPUTER_ONLINE'
+            ).order_by('timestamp').values('id', 'timestamp', 'details')
+
+            keep = []  # [id, collapsed count]
+            remove = []
+            last_timestamp = None
+            last_inventory = None
+            for row in rows.iterator(chunk_size=batch_size):
+                flat = MetricsDeadband.flatten(row['details'] or {})
+                inventory = {path: flat.get(path) for path in INVENTORY_PATHS}
+                is_transition = last_timestamp is None or row['timestamp'] - last_timestamp > threshold
+                if is_transition or inventory != last_inventory or row['id'] in protected:
+                    keep.append([row['id'], 0])
+                elif keep:
+                    keep[-1][1] += 1
+                    remove.append(row['id'])
+                last_timestamp = row['timestamp']
+                last_inventory = inventory
+
+            total_kept += len(keep)
+            total_removed += len(remove)
+            if not remove:
+                continue
+
+            label = Computer.objects.filter(pk=computer_id).values_list('label', flat=True).first() or computer_id
+            self.stdout.write(f'{label}: keeping {len(keep)}, removing {len(remove)} redundant rows')
+            if dry_run:
+                continue
+
+            collapsed = {log_id: count for log_id, count in keep if count}
+            with transaction.atomic():
+                kept_logs = list(SystemLog.objects.filter(id__in=collapsed.keys()))
+                for log in kept_logs:
+                    details = log.details if isinstance(log.details, dict) else {}
+                    details['collapsed_reports'] = details.get('collapsed_reports', 0) + collapsed[log.id]
+                    log.details = details
+                SystemLog.objects.bulk_update(kept_logs, ['details'], batch_size=batch_size)
+                for start in range(0, len(remove), batch_size):
+                    SystemLog.objects.filter(id__in=remove[start:start + batch_size]).delete()
+
+        verb = 'Would remove' if dry_run else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {total_removed} redundant status logs, kept {total_kept} transition/inventory events'
+        ))
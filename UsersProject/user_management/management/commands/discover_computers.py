@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from user_management.services.discovery import SubnetDiscovery
+
+
+class Command(BaseCommand):
+    help = 'Sweep lab CIDR ranges and register computers that are not in the database yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cidr', nargs='+', help='Ranges to scan (defaults to DISCOVERY_CIDRS)')
+        parser.add_argument('--rate', type=float, help='Maximum probes started per second')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without saving')
+        parser.add_argument('--register', action='store_true',
+                            help='Register new responders even when DISCOVERY_REGISTER_NEW is off')
+
+    def handle(self, *args, **options):
+        discovery = SubnetDiscovery(cidrs=options['cidr'], rate=options['rate'], register=options['register'] or None)
+        if not discovery.cidrs:
+            self.stdout.write(self.style.ERROR('No ranges given and DISCOVERY_CIDRS is empty'))
+            return
+
+        try:
+            result = discovery.run(dry_run=options['dry_run'])
+        except ValueError as e:
+            self.stdout.write(self.style.ERROR(str(e)))
+            return
+
+        for computer in result.get('new_computers', []):
+            self.stdout.write(f"  new: {computer['label']} ({computer['ip_address']})")
+        prefix = 'Would have' if options['dry_run'] else 'Successfully'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} scanned {result['scanned']} addresses: {result['responding']} responding, "
+            f"{result['created']} new, {result['unregistered']} not registered, {result['updated']} refreshed"
+        ))
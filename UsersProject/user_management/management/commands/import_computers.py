@@ -1,43 +1,31 @@
-import os
 from django.core.management.base import BaseCommand
-from user_management.models import Computer
+from user_management.services.inventory_sync import InventorySync
+
 
 class Command(BaseCommand):
-    help = 'Import computers from pc_names.txt file'
+    help = 'Sync computers with Lab-Computers.csv and pc_names.txt (inserts, updates and soft-deletes in bulk)'
 
-    def handle(self, *args, **kwargs):
-        txt_file = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))), 'pc_names.txt')
-        if not os.path.exists(txt_file):
-            self.stdout.write(self.style.ERROR(f'pc_names.txt file not found: {txt_file}'))
-            return
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Show the diff without saving it')
+        parser.add_argument('--keep-missing', action='store_true',
+                            help='Do not retire computers that are missing from the inventory files')
 
+    def handle(self, *args, **options):
         try:
-            # Delete existing computers first
-            Computer.objects.all().delete()
-            self.stdout.write(self.style.SUCCESS('Deleted existing computers'))
-
-            # Read and parse pc_names.txt
-            with open(txt_file, 'r') as f:
-                # Skip header line
-                next(f)
-                for line in f:
-                    # Split by whitespace and get IP and label
-                    parts = line.strip().split()
-                    if len(parts) >= 2:
-                        ip_address = parts[0].strip()
-                        label = parts[1].strip()
-                        
-                        # Skip computers with IP 192.168.72.00
-                        if ip_address == '192.168.72.00':
-                            self.stdout.write(self.style.WARNING(f'Skipping invalid IP for {label}'))
-                            continue
-
-                        Computer.objects.create(
-                            ip_address=ip_address,
-                            label=label
-                        )
-                        self.stdout.write(self.style.SUCCESS(f'Created computer {label} with IP {ip_address}'))
-
-            self.stdout.write(self.style.SUCCESS('Successfully imported all computers'))
+            report = InventorySync().sync(dry_run=options['dry_run'], retire_missing=not options['keep_missing'])
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Error importing computers: {str(e)}'))
+            return
+
+        for row in report['created']:
+            self.stdout.write(self.style.SUCCESS(f"Created computer {row['label']} with IP {row['ip_address']}"))
+        for row in report['updated']:
+            self.stdout.write(f"Updated computer {row['ip_address']}: {row['previous_label']} -> {row['label']}")
+        for row in report['retired']:
+            self.stdout.write(self.style.WARNING(f"Retired computer {row['label']} ({row['ip_address']})"))
+
+        prefix = 'Dry run:' if options['dry_run'] else 'Successfully synced inventory:'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {len(report['created'])} created, {len(report['updated'])} updated, "
+            f"{len(report['retired'])} retired, {report['unchanged']} unchanged"
+        ))
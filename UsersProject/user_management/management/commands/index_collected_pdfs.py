@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from user_management.services.document_index import document_index
+
+
+class Command(BaseCommand):
+    help = 'Add PDFs already stored under MEDIA_ROOT/pdfs to the duplicate index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--root', help='Folder to index (defaults to MEDIA_ROOT/pdfs)')
+
+    def handle(self, *args, **options):
+        result = document_index.backfill(root=options['root'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {result['scanned']} PDFs, {result['indexed']} newly indexed"
+        ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from user_management.services.scan_jobs import scan_jobs
+from user_management.views_scan import ScanViewSet
+
+
+class Command(BaseCommand):
+    help = 'Resume scan jobs interrupted by a crash (or a given cancelled/failed job) and run them to completion'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', type=int, help='Resume this cancelled or failed job instead of looking for orphans')
+        parser.add_argument('--list', action='store_true', help='Only list orphaned jobs')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for job in scan_jobs.orphaned():
+                self.stdout.write(f"{job} last heartbeat {job.heartbeat_at}")
+            return
+
+        if options['job'] is not None:
+            job = scan_jobs.resume(options['job'])
+            if job is None:
+                raise CommandError(f"Scan job {options['job']} cannot be resumed")
+            jobs = [job]
+        else:
+            jobs = scan_jobs.recover_orphans()
+            if not jobs:
+                self.stdout.write('No interrupted scan jobs found')
+                return
+
+        scan_viewset = ScanViewSet()
+        for job in jobs:
+            self.stdout.write(f'Resuming scan job {job.id}')
+            scan_viewset._scan_thread(job.id)
+            job.refresh_from_db()
+            self.stdout.write(self.style.SUCCESS(
+                f"Scan job {job.id} {job.status}: {job.computers_scanned}/{job.total_computers} computers, "
+                f"{job.files_copied} files copied"
+            ))
@@ -3,6 +3,7 @@ from django.utils import timezone
 from django.conf import settings
 from user_management.models import ScanSchedule
 from user_management.views import ScanViewSet
+from user_management.services.scan_jobs import scan_jobs
 from user_management.utils import notify_scan_started, notify_scan_completed, notify_scan_error
 from django.core.mail import send_mail
 import logging
@@ -67,25 +68,13 @@ class Command(BaseCommand):
         with self.scan_semaphore:
             try:
                 # Try to acquire the scan lock
-                if not self._try_start_scan(scan_viewset):
+                job = self._try_start_scan(schedule)
+                if job is None:
                     error_msg = 'Another scan is already in progress'
                     logger.error(error_msg)
                     notify_scan_error(error_msg, user=schedule.user)
                     return
 
-                # Initialize scan stats
-                scan_viewset._current_scan_stats = {
-                    'processed_pdfs': 0,
-                    'renamed_pdfs': 0,
-                    'computers_scanned': 0,
-                    'total_computers': len(computer_ids),
-                    'start_time': timezone.now(),
-                    'estimated_completion': None,
-                    'per_computer_progress': {},
-                    'failed_computers': [],
-                    'retry_attempts': {}
-                }
-
                 # Send initial notifications
                 notify_scan_started(user=schedule.user)
                 if schedule.email_notification and schedule.email_addresses:
@@ -96,7 +85,7 @@ class Command(BaseCommand):
                     )
 
                 # Run the scan
-                scan_viewset._scan_thread(computer_ids)
+                scan_viewset._scan_thread(job.id)
                 
                 # Update schedule only if scan completed successfully
                 now = timezone.now()
@@ -124,18 +113,12 @@ class Command(BaseCommand):
                         f'An error occurred during the scheduled scan: {str(e)}'
                     )
 
-            finally:
-                # Always release the scan lock
-                with self.scan_lock:
-                    scan_viewset._scan_in_progress = False
-
-    def _try_start_scan(self, scan_viewset):
-        """Try to acquire the scan lock and start a new scan"""
+    def _try_start_scan(self, schedule):
+        """Queue a scan job for the schedule unless another scan is active"""
         with self.scan_lock:
-            if scan_viewset._scan_in_progress:
-                return False
-            scan_viewset._scan_in_progress = True
-            return True
+            if scan_jobs.active():
+                return None
+            return scan_jobs.create(schedule.computers.all(), trigger='schedule', schedule=schedule, user=schedule.user)
 
     def _send_email_notification(self, schedule, subject, message):
         """Send an email notification with proper error handling"""
@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("user_management", "0011_computer_updated_at_computertombstone"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="computer",
+            name="tags",
+            field=models.ManyToManyField(
+                blank=True, related_name="computers", to="user_management.tag"
+            ),
+        ),
+        migrations.CreateModel(
+            name="CommandJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "type",
+                    models.CharField(
+                        choices=[
+                            ("restart", "Restart Computer"),
+                            ("update", "Update Agent"),
+                            ("custom", "Custom Command"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                ("parameters", models.JSONField(blank=True, default=dict)),
+                (
+                    "targets",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        help_text="Target selector the job was created with",
+                    ),
+                ),
+                ("max_concurrency", models.PositiveIntegerField(default=10)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="command",
+            name="job",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="commands",
+                to="user_management.commandjob",
+            ),
+        ),
+        migrations.AddField(
+            model_name="command",
+            name="result",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="command",
+            name="dispatched_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_management", "0012_computer_tags_command_job"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="command",
+            index=models.Index(
+                fields=["computer", "status"], name="user_manage_compute_055f79_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_management", "0013_command_computer_status_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="computer",
+            name="probe_latency_ms",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="computer",
+            name="last_probed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
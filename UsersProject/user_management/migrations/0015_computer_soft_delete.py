@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_management", "0014_computer_probe_latency"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="computer",
+            name="is_active",
+            field=models.BooleanField(db_index=True, default=True),
+        ),
+        migrations.AddField(
+            model_name="computer",
+            name="retired_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,86 @@
+from django.db import migrations, models
+
+GIN_INDEX = "user_manage_compute_metrics_gin"
+
+
+def backfill_metric_columns(apps, schema_editor):
+    Computer = apps.get_model("user_management", "Computer")
+    batch = []
+    for computer in Computer.objects.exclude(metrics__isnull=True).iterator(chunk_size=500):
+        metrics = computer.metrics or {}
+        cpu = metrics.get("cpu") or {}
+        memory = metrics.get("memory") or {}
+        disk = metrics.get("disk") or {}
+        system = metrics.get("system") or {}
+        computer.cpu_model = cpu.get("model") or computer.cpu_model
+        computer.memory_total = memory.get("total_bytes") or memory.get("total") or computer.memory_total
+        computer.disk_free = disk.get("free_bytes", disk.get("free"))
+        computer.os_version = system.get("os_version") or computer.os_version
+        computer.logged_in_user = system.get("logged_in_user") or computer.logged_in_user
+        batch.append(computer)
+        if len(batch) >= 500:
+            Computer.objects.bulk_update(
+                batch, ["cpu_model", "memory_total", "disk_free", "os_version", "logged_in_user"]
+            )
+            batch = []
+    if batch:
+        Computer.objects.bulk_update(
+            batch, ["cpu_model", "memory_total", "disk_free", "os_version", "logged_in_user"]
+        )
+
+
+def create_metrics_gin_index(apps, schema_editor):
+    # Containment queries on ad-hoc metrics paths; Postgres only
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {GIN_INDEX} "
+            "ON user_management_computer USING GIN (metrics jsonb_path_ops)"
+        )
+
+
+def drop_metrics_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {GIN_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_management", "0015_computer_soft_delete"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="computer",
+            name="disk_free",
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="computer",
+            name="cpu_model",
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name="computer",
+            name="logged_in_user",
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+        # 0008 added the column as total_memory while the model calls it memory_total
+        migrations.RenameField(
+            model_name="computer",
+            old_name="total_memory",
+            new_name="memory_total",
+        ),
+        migrations.AlterField(
+            model_name="computer",
+            name="memory_total",
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="computer",
+            name="os_version",
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+        migrations.RunPython(backfill_metric_columns, migrations.RunPython.noop),
+        migrations.RunPython(create_metrics_gin_index, drop_metrics_gin_index),
+    ]
@@ -0,0 +1,58 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_management", "0016_computer_metric_columns"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FileManifestEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("path", models.CharField(max_length=1024)),
+                ("size", models.BigIntegerField()),
+                ("mtime", models.FloatField()),
+                ("content_hash", models.CharField(blank=True, db_index=True, max_length=64)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("copied", "Copied"),
+                            ("duplicate", "Duplicate"),
+                            ("skipped", "Skipped"),
+                            ("failed", "Failed"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("result", models.JSONField(blank=True, default=dict)),
+                ("first_seen", models.DateTimeField(default=django.utils.timezone.now)),
+                ("processed_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("deleted_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "computer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="file_manifest",
+                        to="user_management.computer",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("computer", "path")},
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_management", "0017_filemanifestentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CollectedDocument",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sha256", models.CharField(max_length=64, unique=True)),
+                ("folder", models.CharField(max_length=255)),
+                ("person_key", models.CharField(max_length=255)),
+                (
+                    "doc_type",
+                    models.CharField(
+                        choices=[
+                            ("onet", "O*NET Interest Profiler"),
+                            ("strengths", "StrengthsProfile"),
+                            ("other", "Other"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("doc_date", models.DateField(blank=True, null=True)),
+                ("filename", models.CharField(max_length=255)),
+                ("size", models.BigIntegerField(default=0)),
+                ("source_path", models.CharField(blank=True, max_length=1024)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "computer",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="collected_documents",
+                        to="user_management.computer",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["person_key", "doc_type", "doc_date"],
+                        name="user_manage_person__6dad5a_idx",
+                    )
+                ],
+            },
+        ),
+    ]
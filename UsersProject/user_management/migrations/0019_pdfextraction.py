@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_management", "0018_collecteddocument"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PdfExtraction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("content_hash", models.CharField(max_length=64, unique=True)),
+                ("page_count", models.IntegerField(default=0)),
+                ("page1_text", models.TextField(blank=True)),
+                ("full_text", models.TextField(blank=True)),
+                (
+                    "classification",
+                    models.CharField(
+                        choices=[
+                            ("onet", "O*NET Interest Profiler"),
+                            ("strengths", "StrengthsProfile"),
+                            ("other", "Other"),
+                            ("unreadable", "Unreadable"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
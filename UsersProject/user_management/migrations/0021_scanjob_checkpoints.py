@@ -0,0 +1,47 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_management", "0020_scanjob_scanjobhost"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="scanjob",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("queued", "Queued"),
+                    ("running", "Running"),
+                    ("cancelling", "Cancelling"),
+                    ("completed", "Completed"),
+                    ("failed", "Failed"),
+                    ("cancelled", "Cancelled"),
+                ],
+                default="queued",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="scanjob",
+            name="heartbeat_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="scanjob",
+            name="attempts",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="scanjobhost",
+            name="files_checkpointed",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="scanjobhost",
+            name="checkpoint_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_management", "0021_scanjob_checkpoints"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scanschedule",
+            name="last_status",
+            field=models.CharField(blank=True, max_length=20),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_management", "0022_scanschedule_last_status"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="filetransfer",
+            name="source_file",
+            field=models.CharField(max_length=1024),
+        ),
+        migrations.AlterField(
+            model_name="filetransfer",
+            name="destination_file",
+            field=models.CharField(max_length=1024),
+        ),
+        migrations.AddField(
+            model_name="filetransfer",
+            name="duration",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="filetransfer",
+            name="sha256",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="scanjob",
+            name="bytes_copied",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="scanjobhost",
+            name="bytes_copied",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="scanjobhost",
+            name="copy_seconds",
+            field=models.FloatField(default=0),
+        ),
+    ]
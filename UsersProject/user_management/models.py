@@ -119,32 +119,54 @@ class CustomUser(AbstractUser):
                 self.locked_until = timezone.now() + timezone.timedelta(minutes=30)
             self.save()
 
+class ActiveComputerManager(models.Manager):
+    """Hide computers retired by an inventory sync"""
+    def get_queryset(self):
+        return super().get_queryset().filter(is_active=True)
+
 class Computer(models.Model):
     """Track computer information and metrics"""
     hostname = models.CharField(max_length=255, unique=True, null=True, blank=True)
     label = models.CharField(max_length=255)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    os_version = models.CharField(max_length=255, null=True, blank=True)
-    cpu_model = models.CharField(max_length=255, null=True, blank=True)
+    os_version = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+    cpu_model = models.CharField(max_length=255, null=True, blank=True, db_index=True)
     cpu_cores = models.IntegerField(null=True, blank=True)
     cpu_threads = models.IntegerField(null=True, blank=True)
     cpu_usage = models.FloatField(null=True, blank=True)
     cpu_percent = models.FloatField(null=True, blank=True)
-    memory_total = models.BigIntegerField(null=True, blank=True)
+    memory_total = models.BigIntegerField(null=True, blank=True, db_index=True)
     memory_usage = models.FloatField(null=True, blank=True)
     memory_percent = models.FloatField(null=True, blank=True)
     total_disk = models.BigIntegerField(null=True, blank=True)
     disk_usage = models.FloatField(null=True, blank=True)
     disk_percent = models.FloatField(null=True, blank=True)
+    # Denormalized from metrics.disk so "less than N GB free" is an index scan
+    disk_free = models.BigIntegerField(null=True, blank=True, db_index=True)
     device_class = models.CharField(max_length=50, null=True, blank=True)
     manufacturer = models.CharField(max_length=255, null=True, blank=True)
     boot_time = models.DateTimeField(null=True, blank=True)
     last_seen = models.DateTimeField(null=True, blank=True)
     last_metrics_update = models.DateTimeField(null=True, blank=True)
     is_online = models.BooleanField(default=False)
-    logged_in_user = models.CharField(max_length=255, null=True, blank=True)
+    logged_in_user = models.CharField(max_length=255, null=True, blank=True, db_index=True)
     metrics = models.JSONField(null=True, blank=True)
     system_uptime = models.DurationField(null=True, blank=True)
+    # Bumped on every save; drives conditional GET and ?since= delta sync
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Lab/group tags used to target fleet-wide commands
+    tags = models.ManyToManyField('Tag', related_name='computers', blank=True)
+    # Result of the last reachability sweep
+    probe_latency_ms = models.FloatField(null=True, blank=True)
+    last_probed_at = models.DateTimeField(null=True, blank=True)
+    # Soft delete: retired machines keep their logs and transfers
+    is_active = models.BooleanField(default=True, db_index=True)
+    retired_at = models.DateTimeField(null=True, blank=True)
+
+    # Plain default manager, so validators, the admin and related lookups see retired rows too
+    objects = models.Manager()
+    # Computers still in the lab inventory; fleet-wide listings and jobs use this
+    active = ActiveComputerManager()
 
     def is_online(self) -> bool:
         """
@@ -224,6 +246,38 @@ class Computer(models.Model):
             return "0 GB"
         return f"{self.total_disk / (1024 * 1024 * 1024):.1f} GB"
 
+    def sync_metric_columns(self) -> None:
+        """
+        Copy values from the metrics blob into the normalized scalar columns.
+        Called on the ingest path before saving so read paths never have to write.
+        """
+        metrics = self.metrics or {}
+        cpu_info = metrics.get('cpu') or {}
+        memory_info = metrics.get('memory') or {}
+        disk_info = metrics.get('disk') or {}
+        system_info = metrics.get('system') or {}
+
+        if cpu_info:
+            self.cpu_model = cpu_info.get('model') or self.cpu_model
+            self.cpu_cores = cpu_info.get('cores') or self.cpu_cores
+            self.cpu_threads = cpu_info.get('threads') or self.cpu_threads
+            self.cpu_percent = cpu_info.get('percent', self.cpu_percent)
+        if memory_info:
+            self.memory_total = memory_info.get('total_bytes') or memory_info.get('total') or self.memory_total
+            self.memory_percent = memory_info.get('percent', self.memory_percent)
+            self.memory_usage = self.memory_percent
+        if disk_info:
+            self.total_disk = disk_info.get('total_bytes') or disk_info.get('total') or self.total_disk
+            self.disk_percent = disk_info.get('percent', self.disk_percent)
+            self.disk_usage = self.disk_percent
+            free = disk_info.get('free_bytes', disk_info.get('free'))
+            if free is not None:
+                self.disk_free = free
+        if system_info:
+            self.device_class = system_info.get('device_class') or self.device_class
+            self.os_version = system_info.get('os_version') or self.os_version
+            self.logged_in_user = system_info.get('logged_in_user') or self.logged_in_user
+
     def update_metrics(self, metrics_data: Dict[str, Any]) -> None:
         """Update computer metrics from received data"""
         if not metrics_data:
@@ -289,6 +343,14 @@ class Computer(models.Model):
     class Meta:
         ordering = ['label']
 
+class ComputerTombstone(models.Model):
+    """Marker left behind when a computer is deleted so delta sync clients can drop it"""
+    computer_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Computer {self.computer_id} deleted at {self.deleted_at}"
+
 class Command(models.Model):
     COMMAND_TYPES = [
         ('restart', 'Restart Computer'),
@@ -304,18 +366,40 @@ class Command(models.Model):
     ]
 
     computer = models.ForeignKey(Computer, on_delete=models.CASCADE, related_name='commands')
+    job = models.ForeignKey('CommandJob', on_delete=models.CASCADE, null=True, blank=True, related_name='commands')
     type = models.CharField(max_length=50, choices=COMMAND_TYPES)
     parameters = models.JSONField(default=dict, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    result = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['computer', 'status']),
+        ]
 
     def __str__(self):
         return f"{self.type} command for {self.computer}"
 
+class CommandJob(models.Model):
+    """A command fanned out to many computers, tracked as one job"""
+    type = models.CharField(max_length=50, choices=Command.COMMAND_TYPES)
+    parameters = models.JSONField(default=dict, blank=True)
+    targets = models.JSONField(default=dict, blank=True, help_text="Target selector the job was created with")
+    max_concurrency = models.PositiveIntegerField(default=10)
+    created_by = models.ForeignKey('CustomUser', on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.type} job #{self.pk}"
+
 class Schedule(models.Model):
     SCHEDULE_TYPES = [
         ('I', 'Immediate'),
@@ -340,15 +424,170 @@ class Schedule(models.Model):
 class FileTransfer(models.Model):
     computer = models.ForeignKey(Computer, on_delete=models.CASCADE, related_name='transfers')
     timestamp = models.DateTimeField(default=timezone.now)
-    source_file = models.CharField(max_length=255)
-    destination_file = models.CharField(max_length=255)
+    source_file = models.CharField(max_length=1024)
+    destination_file = models.CharField(max_length=1024)
     bytes_transferred = models.BigIntegerField()
+    duration = models.FloatField(null=True, blank=True)  # Seconds spent copying
+    sha256 = models.CharField(max_length=64, blank=True)
     successful = models.BooleanField(default=True)
     error_message = models.TextField(null=True, blank=True)
 
     def __str__(self):
         return f"Transfer {self.source_file} -> {self.destination_file}"
 
+class FileManifestEntry(models.Model):
+    """Last known state of one PDF on a scanned computer, so rescans only process what changed"""
+    STATUS_CHOICES = [
+        ('copied', 'Copied'),
+        ('duplicate', 'Duplicate'),
+        ('skipped', 'Skipped'),
+        ('failed', 'Failed'),
+    ]
+
+    computer = models.ForeignKey(Computer, on_delete=models.CASCADE, related_name='file_manifest')
+    path = models.CharField(max_length=1024)
+    size = models.BigIntegerField()
+    mtime = models.FloatField()
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    result = models.JSONField(default=dict, blank=True)
+    first_seen = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(default=timezone.now)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('computer', 'path')
+
+    def __str__(self):
+        return f"{self.path} on {self.computer_id} ({self.status})"
+
+class CollectedDocument(models.Model):
+    """Index of every PDF stored under MEDIA_ROOT/pdfs, used for duplicate checks"""
+    DOC_TYPE_CHOICES = [
+        ('onet', 'O*NET Interest Profiler'),
+        ('strengths', 'StrengthsProfile'),
+        ('other', 'Other'),
+    ]
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    folder = models.CharField(max_length=255)
+    person_key = models.CharField(max_length=255)
+    doc_type = models.CharField(max_length=20, choices=DOC_TYPE_CHOICES)
+    doc_date = models.DateField(null=True, blank=True)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(default=0)
+    computer = models.ForeignKey(Computer, on_delete=models.SET_NULL, null=True, blank=True, related_name='collected_documents')
+    source_path = models.CharField(max_length=1024, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['person_key', 'doc_type', 'doc_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.folder}/{self.filename}"
+
+class PdfExtraction(models.Model):
+    """Text pulled out of a PDF, keyed by content hash so each file is parsed once"""
+    CLASSIFICATION_CHOICES = [
+        ('onet', 'O*NET Interest Profiler'),
+        ('strengths', 'StrengthsProfile'),
+        ('other', 'Other'),
+        ('unreadable', 'Unreadable'),
+    ]
+
+    content_hash = models.CharField(max_length=64, unique=True)
+    page_count = models.IntegerField(default=0)
+    page1_text = models.TextField(blank=True)
+    full_text = models.TextField(blank=True)
+    classification = models.CharField(max_length=20, choices=CLASSIFICATION_CHOICES)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.classification}, {self.page_count} pages)"
+
+class ScanJob(models.Model):
+    """One run of a file scan over a set of computers; the source of truth for scan progress"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('cancelling', 'Cancelling'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    ACTIVE_STATUSES = ('queued', 'running', 'cancelling')
+    RESUMABLE_STATUSES = ('failed', 'cancelled')
+    TRIGGER_CHOICES = [
+        ('manual', 'Manual'),
+        ('schedule', 'Schedule'),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    trigger = models.CharField(max_length=20, choices=TRIGGER_CHOICES, default='manual')
+    schedule = models.ForeignKey('ScanSchedule', on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_by = models.ForeignKey('CustomUser', on_delete=models.SET_NULL, null=True, blank=True)
+    total_computers = models.IntegerField(default=0)
+    computers_scanned = models.IntegerField(default=0)
+    computers_failed = models.IntegerField(default=0)
+    files_seen = models.IntegerField(default=0)
+    files_processed = models.IntegerField(default=0)
+    files_copied = models.IntegerField(default=0)
+    bytes_copied = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Scan job #{self.pk} ({self.status})"
+
+class ScanJobHost(models.Model):
+    """Progress of one computer within a scan job"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    job = models.ForeignKey(ScanJob, on_delete=models.CASCADE, related_name='hosts')
+    computer = models.ForeignKey(Computer, on_delete=models.SET_NULL, null=True, blank=True, related_name='scan_job_hosts')
+    label = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    files_seen = models.IntegerField(default=0)
+    files_new = models.IntegerField(default=0)
+    files_changed = models.IntegerField(default=0)
+    files_copied = models.IntegerField(default=0)
+    files_duplicate = models.IntegerField(default=0)
+    files_failed = models.IntegerField(default=0)
+    files_checkpointed = models.IntegerField(default=0)
+    bytes_copied = models.BigIntegerField(default=0)
+    copy_seconds = models.FloatField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    checkpoint_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    stage_metrics = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        unique_together = ('job', 'computer')
+
+    def __str__(self):
+        return f"{self.label} in scan job #{self.job_id} ({self.status})"
+
 class AuditLog(models.Model):
     """Model for storing audit logs."""
     LEVEL_CHOICES = (
@@ -696,6 +935,7 @@ class ScanSchedule(models.Model):
     computers = models.ManyToManyField('Computer', related_name='scan_schedules')
     next_run = models.DateTimeField(null=True, blank=True)
     last_run = models.DateTimeField(null=True, blank=True)
+    last_status = models.CharField(max_length=20, blank=True)  # Outcome of the last scan job it queued
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     class Meta:
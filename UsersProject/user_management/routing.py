@@ -0,0 +1,7 @@
+from django.urls import re_path
+from . import consumers
+
+websocket_urlpatterns = [
+    re_path(r'ws/computers/$', consumers.ComputerStreamConsumer.as_asgi()),
+    re_path(r'ws/command-jobs/(?P<job_id>\d+)/$', consumers.CommandJobConsumer.as_asgi()),
+]
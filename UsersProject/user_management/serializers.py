@@ -2,6 +2,7 @@
 import logging
 import json
 from django.utils import timezone
+from django.utils.duration import duration_string
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
@@ -31,6 +32,22 @@ class UserSerializer(serializers.ModelSerializer):
             validated_data['is_superuser'] = True
         return super().create(validated_data)
 
+def parse_fields_param(value):
+    """Parse a ?fields=a,b,c projection; None means every field"""
+    if not value:
+        return None
+    return {field.strip() for field in value.split(',') if field.strip()}
+
+
+def format_computer_timestamp(value):
+    """Render a computer timestamp the way the dashboard expects (local time, seconds precision)"""
+    if not isinstance(value, datetime):
+        return value
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
 class ComputerSerializer(serializers.ModelSerializer):
     status = serializers.SerializerMethodField()
     ip = serializers.CharField(source='ip_address', required=False)  # For backward compatibility
@@ -61,26 +78,28 @@ class ComputerSerializer(serializers.ModelSerializer):
             'disk_percent', 'metrics'
         ]
 
+    def __init__(self, *args, **kwargs):
+        # Optional sparse fieldset, e.g. ComputerSerializer(obj, fields={'id', 'label'})
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        self._online_threshold = timezone.now() - timezone.timedelta(minutes=30)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     def to_representation(self, instance):
         data = super().to_representation(instance)
         
-        # Get status before formatting timestamps
-        data['status'] = self.get_status(instance)
-        
-        # Format timestamps
+        # Format timestamps straight from the model instead of re-parsing the ISO output
         for field in ['last_seen', 'last_metrics_update', 'boot_time']:
             if data.get(field):
-                try:
-                    dt = datetime.fromisoformat(data[field].replace('Z', '+00:00'))
-                    data[field] = dt.strftime('%Y-%m-%d %H:%M:%S')
-                except (ValueError, AttributeError):
-                    pass
+                data[field] = format_computer_timestamp(getattr(instance, field))
         
         return data
 
     def get_status(self, obj):
         """Get the online/offline status of the computer."""
-        thirty_mins_ago = timezone.now() - timezone.timedelta(minutes=30)
+        thirty_mins_ago = self._online_threshold
         is_online = (
             (obj.last_metrics_update and obj.last_metrics_update >= thirty_mins_ago) or
             (obj.last_seen and obj.last_seen >= thirty_mins_ago)
@@ -99,6 +118,87 @@ class ComputerSerializer(serializers.ModelSerializer):
         """Get disk usage percentage."""
         return obj.disk_percent if obj.disk_percent is not None else 0
 
+
+class ComputerListSerializer:
+    """
+    values()-based serializer for computer lists.
+    Produces the same keys and formatting as ComputerSerializer without building
+    model instances or DRF field objects per row, and only selects the columns
+    the requested fields need.
+    """
+
+    # Output fields computed from other columns
+    DERIVED_SOURCES = {
+        'ip': ('ip_address',),
+        'status': ('last_seen', 'last_metrics_update'),
+        'uptime': ('boot_time',),
+        'memory_gb': ('memory_total',),
+        'disk_gb': ('total_disk',),
+    }
+    TIMESTAMP_FIELDS = ('last_seen', 'last_metrics_update', 'boot_time')
+    PERCENT_FIELDS = ('cpu_percent', 'memory_percent', 'disk_percent')
+
+    def __init__(self, fields=None):
+        self.fields = [f for f in ComputerSerializer.Meta.fields if fields is None or f in fields]
+        columns = set()
+        for field in self.fields:
+            columns.update(self.DERIVED_SOURCES.get(field, (field,)))
+        self.columns = sorted(columns)
+
+    def serialize(self, queryset):
+        now = timezone.now()
+        threshold = now - timezone.timedelta(minutes=30)
+        return [self._row(values, now, threshold) for values in queryset.values(*self.columns)]
+
+    def _row(self, values, now, threshold):
+        data = {}
+        for field in self.fields:
+            if field == 'ip':
+                data[field] = values['ip_address']
+            elif field == 'status':
+                is_online = (
+                    (values['last_metrics_update'] and values['last_metrics_update'] >= threshold) or
+                    (values['last_seen'] and values['last_seen'] >= threshold)
+                )
+                data[field] = 'online' if is_online else 'offline'
+            elif field == 'uptime':
+                data[field] = self._format_uptime(values['boot_time'], now)
+            elif field == 'memory_gb':
+                data[field] = self._format_gb(values['memory_total'])
+            elif field == 'disk_gb':
+                data[field] = self._format_gb(values['total_disk'])
+            elif field in self.TIMESTAMP_FIELDS:
+                data[field] = format_computer_timestamp(values[field])
+            elif field in self.PERCENT_FIELDS:
+                data[field] = values[field] if values[field] is not None else 0
+            elif field == 'system_uptime':
+                data[field] = duration_string(values[field]) if values[field] is not None else None
+            else:
+                data[field] = values[field]
+        return data
+
+    @staticmethod
+    def _format_gb(total_bytes):
+        if not total_bytes:
+            return "0 GB"
+        return f"{total_bytes / (1024 * 1024 * 1024):.1f} GB"
+
+    @staticmethod
+    def _format_uptime(boot_time, now):
+        if not boot_time:
+            return "Not Available"
+        if timezone.is_naive(boot_time):
+            boot_time = timezone.make_aware(boot_time)
+        uptime = now - boot_time
+        days = uptime.days
+        hours = uptime.seconds // 3600
+        minutes = (uptime.seconds % 3600) // 60
+        if days > 0:
+            return f"{days}d {hours}h {minutes}m"
+        elif hours > 0:
+            return f"{hours}h {minutes}m"
+        return f"{minutes}m"
+
 class FileTransferSerializer(serializers.ModelSerializer):
     class Meta:
         model = FileTransfer
@@ -193,9 +293,9 @@ class ScanScheduleSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'type', 'type_display', 'time', 'selected_days', 'monthly_date',
             'email_notification', 'email_addresses', 'computers', 'computer_ids',
-            'created_at', 'updated_at', 'enabled', 'last_run', 'next_run'
+            'created_at', 'updated_at', 'enabled', 'last_run', 'next_run', 'last_status'
         ]
-        read_only_fields = ['created_at', 'updated_at', 'last_run', 'next_run']
+        read_only_fields = ['created_at', 'updated_at', 'last_run', 'next_run', 'last_status']
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
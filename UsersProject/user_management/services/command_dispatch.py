@@ -0,0 +1,338 @@
+import asyncio
+import logging
+import re
+from datetime import timedelta
+from typing import Dict, Any, List, Optional
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from ..models import Computer, Command, CommandJob
+from .status_events import get_offline_threshold, online_filter
+
+logger = logging.getLogger(__name__)
+
+# Channel layer group the relay client process listens on for frames to forward to the relay
+RELAY_OUTBOX_GROUP = 'relay_outbox'
+
+FINISHED_STATUSES = ('completed', 'failed')
+
+# Statuses a command may move to from each current status; 'running' -> 'pending'
+# re-queues a pushed command the relay could not deliver
+ALLOWED_TRANSITIONS = {
+    'pending': ('running', 'completed', 'failed'),
+    'running': ('pending', 'completed', 'failed'),
+}
+
+
+def job_group(job_id: int) -> str:
+    """Channel layer group that streams progress for one command job"""
+    return f'command_job_{job_id}'
+
+
+def host_group(hostname: str) -> str:
+    """Channel layer group long-polling agents for one host wait on"""
+    return 'command_host_' + re.sub(r'[^A-Za-z0-9_.-]', '_', hostname)[:80]
+
+
+class CommandDispatcher:
+    """Create fleet-wide command jobs and feed them to agents through the relay"""
+
+    def __init__(self):
+        self._channel_layer = None
+
+    @property
+    def channel_layer(self):
+        if self._channel_layer is None:
+            self._channel_layer = get_channel_layer()
+        return self._channel_layer
+
+    def resolve_targets(self, targets: Dict[str, Any]):
+        """
+        Turn a target selector into a computer queryset. Supported selectors:
+        {'ids': [1, 2]}, {'tag': 'Lab A'} and {'all_online': true}
+        """
+        if targets.get('ids'):
+            return Computer.active.filter(id__in=targets['ids'])
+        if targets.get('tag'):
+            return Computer.active.filter(tags__name=targets['tag'])
+        if targets.get('all_online'):
+            return Computer.active.filter(online_filter(timezone.now() - get_offline_threshold()))
+        raise ValueError("targets must contain 'ids', 'tag' or 'all_online'")
+
+    def create_job(self, command_type: str, parameters: Dict[str, Any], targets: Dict[str, Any],
+                   max_concurrency: int = 10, user=None) -> CommandJob:
+        """Create a job and one pending command per target with a single bulk insert"""
+        computer_ids = list(self.resolve_targets(targets).values_list('id', flat=True).distinct())
+        if not computer_ids:
+            raise ValueError('No computers match the given targets')
+
+        with transaction.atomic():
+            job = CommandJob.objects.create(
+                type=command_type,
+                parameters=parameters,
+                targets=targets,
+                max_concurrency=max(1, max_concurrency),
+                created_by=user
+            )
+            Command.objects.bulk_create([
+                Command(job=job, computer_id=computer_id, type=command_type,
+                        parameters=parameters, status='pending')
+                for computer_id in computer_ids
+            ], batch_size=500)
+        logger.info(f"Created command job {job.id} ({command_type}) for {len(computer_ids)} computers")
+        return job
+
+    def dispatch_next(self, job_id: int) -> int:
+        """
+        Hand the next wave of pending commands to the relay, keeping at most
+        max_concurrency of the job's commands in flight. Returns how many were sent.
+        """
+        with transaction.atomic():
+            job = CommandJob.objects.select_for_update().get(id=job_id)
+            running = job.commands.filter(status='running').count()
+            slots = job.max_concurrency - running
+            if slots <= 0:
+                return 0
+            wave = list(
+                job.commands.filter(status='pending').order_by('id')
+                .values('id', 'computer__hostname')[:slots]
+            )
+            if not wave:
+                self._maybe_finish(job)
+                return 0
+
+            now = timezone.now()
+            routable = [row for row in wave if row['computer__hostname']]
+            unroutable = [row['id'] for row in wave if not row['computer__hostname']]
+            Command.objects.filter(id__in=[row['id'] for row in routable]).update(status='running', dispatched_at=now)
+            if unroutable:
+                Command.objects.filter(id__in=unroutable).update(
+                    status='failed', completed_at=now, result={'error': 'Computer has no hostname to route to'}
+                )
+
+        if routable:
+            # One frame for the whole wave; the relay fans it out to each agent
+            self.send_frame({
+                'type': 'command_fanout',
+                'job_id': job.id,
+                'command': job.type,
+                'parameters': job.parameters,
+                'targets': [{'hostname': row['computer__hostname'], 'command_id': row['id']} for row in routable],
+            })
+        if unroutable:
+            # Failed rows free their slots straight away
+            return len(routable) + self.dispatch_next(job_id)
+        return len(routable)
+
+    def transition(self, command_id, status: str, result: Optional[Dict[str, Any]] = None,
+                   from_statuses=None) -> bool:
+        """
+        Move a command to `status` with one filtered UPDATE that only writes the
+        columns the transition changes. Returns False if the command does not
+        exist or is not in a status it may leave for `status`.
+        """
+        if from_statuses is None:
+            from_statuses = [source for source, targets in ALLOWED_TRANSITIONS.items() if status in targets]
+        fields = {'status': status}
+        if status == 'running':
+            fields['dispatched_at'] = timezone.now()
+        elif status == 'pending':
+            fields['dispatched_at'] = None
+        elif status in FINISHED_STATUSES:
+            fields['completed_at'] = timezone.now()
+        if result is not None:
+            fields['result'] = result
+        return bool(Command.objects.filter(id=command_id, status__in=from_statuses).update(**fields))
+
+    def deliver(self, command: Command) -> bool:
+        """
+        Push a single command to its agent through the relay. Returns False when
+        it cannot be pushed, leaving it pending for the long-poll fallback.
+        """
+        hostname = command.computer.hostname
+        if not hostname or self.channel_layer is None:
+            self.notify_host(hostname)
+            return False
+        if not self.transition(command.id, 'running', from_statuses=('pending',)):
+            return False
+        sent = self.send_frame({
+            'type': 'command_fanout',
+            'job_id': None,
+            'command': command.type,
+            'parameters': command.parameters,
+            'targets': [{'hostname': hostname, 'command_id': command.id}],
+        })
+        if not sent:
+            # Never reached the outbox; hand it back to the long-poll. Frames the outbox
+            # accepts but nobody forwards are requeued by reap_stale.
+            self.transition(command.id, 'pending', from_statuses=('running',))
+            self.notify_host(hostname)
+            return False
+        return True
+
+    def claim_pending(self, computer_id: int) -> List[Dict[str, Any]]:
+        """Hand a polling agent its pending stand-alone commands, marking them running"""
+        with transaction.atomic():
+            commands = list(
+                Command.objects.select_for_update(skip_locked=True)
+                .filter(computer_id=computer_id, status='pending', job__isnull=True)
+                .order_by('created_at')
+                .values('id', 'type', 'parameters')
+            )
+            if commands:
+                Command.objects.filter(id__in=[c['id'] for c in commands]).update(
+                    status='running', dispatched_at=timezone.now()
+                )
+        return commands
+
+    def wait_for_commands(self, hostname: str, timeout: float, fetch) -> List[Dict[str, Any]]:
+        """
+        Return fetch() as soon as it has commands, blocking up to `timeout` seconds
+        on the host's channel group instead of re-querying the database
+        """
+        if timeout <= 0 or self.channel_layer is None:
+            return fetch()
+        return async_to_sync(self._await_commands)(hostname, timeout, fetch)
+
+    async def _await_commands(self, hostname: str, timeout: float, fetch) -> List[Dict[str, Any]]:
+        group = host_group(hostname)
+        channel = await self.channel_layer.new_channel()
+        # Subscribe before the first read so a command queued in between still wakes us
+        await self.channel_layer.group_add(group, channel)
+        try:
+            commands = await sync_to_async(fetch)()
+            if commands:
+                return commands
+            try:
+                await asyncio.wait_for(self.channel_layer.receive(channel), timeout)
+            except asyncio.TimeoutError:
+                return []
+            return await sync_to_async(fetch)()
+        finally:
+            await self.channel_layer.group_discard(group, channel)
+
+    def notify_host(self, hostname: Optional[str]) -> None:
+        """Wake any agent long-polling for this host"""
+        if hostname:
+            self._group_send(host_group(hostname), {'type': 'commands.available'})
+
+    def record_result(self, command_id, status: str, result: Optional[Dict[str, Any]] = None,
+                      undelivered: bool = False) -> bool:
+        """Store an agent's command result and keep its job moving. Returns False if nothing changed."""
+        if undelivered:
+            row = Command.objects.filter(id=command_id).values('job_id', 'computer__hostname').first()
+            if row and row['job_id'] is None:
+                # The agent is not on the relay; leave the command for its long-poll
+                requeued = self.transition(command_id, 'pending', from_statuses=('running',))
+                if requeued:
+                    self.notify_host(row['computer__hostname'])
+                return requeued
+
+        if status not in FINISHED_STATUSES and status != 'running':
+            status = 'failed'
+        if not self.transition(command_id, status, result):
+            return False
+
+        job_id = Command.objects.filter(id=command_id).values_list('job_id', flat=True).first()
+        if job_id:
+            if status in FINISHED_STATUSES:
+                self.dispatch_next(job_id)
+            self.publish_progress(job_id)
+        return True
+
+    def reap_stale(self, timeout: Optional[float] = None) -> int:
+        """
+        Deal with commands that have been running longer than `timeout` seconds
+        without a result. Job commands are failed so they give back their
+        concurrency slot and the job can finish; stand-alone commands go back to
+        pending, since a pushed frame may never have reached the relay, and are
+        picked up again by the agent's long-poll. Returns how many were reaped.
+        """
+        if timeout is None:
+            timeout = getattr(settings, 'COMMAND_RUNNING_TIMEOUT_SECONDS', 900)
+        now = timezone.now()
+        stale = Command.objects.filter(status='running', dispatched_at__lt=now - timedelta(seconds=timeout))
+
+        requeue = list(stale.filter(job__isnull=True).values_list('id', 'computer__hostname'))
+        requeued = 0
+        if requeue:
+            requeued = Command.objects.filter(id__in=[row[0] for row in requeue], status='running').update(
+                status='pending', dispatched_at=None
+            )
+            logger.warning(f"Requeued {requeued} unacknowledged commands after {int(timeout)}s")
+            for hostname in {row[1] for row in requeue}:
+                self.notify_host(hostname)
+
+        stale_jobs = stale.filter(job__isnull=False)
+        job_ids = set(stale_jobs.values_list('job_id', flat=True))
+        if not job_ids:
+            return requeued
+        failed = stale_jobs.update(
+            status='failed', completed_at=now,
+            result={'error': f'No result from the agent within {int(timeout)} seconds'}
+        )
+        logger.warning(f"Failed {failed} commands with no result after {int(timeout)}s in jobs {sorted(job_ids)}")
+        for job_id in job_ids:
+            # Frees the slots for the next wave, or completes the job when nothing is left
+            self.dispatch_next(job_id)
+            self.publish_progress(job_id)
+        return requeued + failed
+
+    def progress(self, job: CommandJob) -> Dict[str, Any]:
+        """Aggregate job state with one grouped count"""
+        counts = job.commands.aggregate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='pending')),
+            running=Count('id', filter=Q(status='running')),
+            completed=Count('id', filter=Q(status='completed')),
+            failed=Count('id', filter=Q(status='failed')),
+        )
+        finished = counts['completed'] + counts['failed']
+        return {
+            'job_id': job.id,
+            'type': job.type,
+            'max_concurrency': job.max_concurrency,
+            **counts,
+            'percent_complete': round(finished / counts['total'] * 100, 1) if counts['total'] else 100.0,
+            'completed_at': job.completed_at.isoformat() if job.completed_at else None,
+        }
+
+    def hosts(self, job: CommandJob) -> List[Dict[str, Any]]:
+        """Per-host status rows for a job"""
+        return list(job.commands.order_by('computer__label').values(
+            'id', 'computer_id', 'computer__label', 'computer__hostname',
+            'status', 'result', 'dispatched_at', 'completed_at'
+        ))
+
+    def publish_progress(self, job_id: int) -> None:
+        job = CommandJob.objects.get(id=job_id)
+        self._group_send(job_group(job_id), {'type': 'job.progress', 'progress': self.progress(job)})
+
+    def send_frame(self, frame: Dict[str, Any]) -> bool:
+        """Queue a frame for the relay client process to forward to the relay"""
+        return self._group_send(RELAY_OUTBOX_GROUP, {'type': 'relay.frame', 'frame': frame})
+
+    def _maybe_finish(self, job: CommandJob) -> None:
+        if job.completed_at is None and not job.commands.exclude(status__in=FINISHED_STATUSES).exists():
+            job.completed_at = timezone.now()
+            job.save(update_fields=['completed_at'])
+
+    def _group_send(self, group: str, message: Dict[str, Any]) -> bool:
+        if self.channel_layer is None:
+            logger.warning(f"No channel layer configured; dropping message for {group}")
+            return False
+        try:
+            async_to_sync(self.channel_layer.group_send)(group, message)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to send message to {group}: {str(e)}")
+            return False
+
+
+# Global dispatcher shared by the API and the relay client
+command_dispatcher = CommandDispatcher()
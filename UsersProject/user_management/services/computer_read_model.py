@@ -0,0 +1,73 @@
+import logging
+from typing import Dict, Any, Optional, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..models import Computer
+from ..serializers import ComputerSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class ComputerReadModel:
+    """
+    Cached, presentation-ready view of a single computer.
+    Entries are keyed by the row's updated_at, so any write on the ingest path
+    makes the old entry unreachable; the TTL bounds drift of time-derived
+    fields such as status and uptime.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'COMPUTER_READ_MODEL_TTL', 60)
+
+    @staticmethod
+    def cache_key(computer_id, updated_at) -> str:
+        version = updated_at.timestamp() if updated_at else 0
+        return f'computer_view:{computer_id}:{version}'
+
+    def get(self, computer_id, fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """Return the serialized computer, or None if it does not exist"""
+        try:
+            computer_id = int(computer_id)
+        except (TypeError, ValueError):
+            return None
+
+        # One indexed lookup decides whether the cached view is still current
+        versions = list(Computer.objects.filter(pk=computer_id).values_list('updated_at', flat=True))
+        if not versions:
+            return None
+        key = self.cache_key(computer_id, versions[0])
+
+        data = cache.get(key)
+        if data is None:
+            computer = Computer.objects.filter(pk=computer_id).first()
+            if computer is None:
+                return None
+            data = self._store(key, computer)
+        return self._project(data, fields)
+
+    def get_for(self, computer: Computer, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Return the serialized view of a computer the caller already resolved"""
+        key = self.cache_key(computer.pk, computer.updated_at)
+        data = cache.get(key)
+        if data is None:
+            data = self._store(key, computer)
+        return self._project(data, fields)
+
+    def _store(self, key: str, computer: Computer) -> Dict[str, Any]:
+        data = dict(ComputerSerializer(computer).data)
+        try:
+            cache.set(key, data, self.ttl)
+        except Exception as e:
+            logger.warning(f"Could not cache read model for computer {computer.pk}: {str(e)}")
+        return data
+
+    @staticmethod
+    def _project(data: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+        if fields is not None:
+            data = {name: value for name, value in data.items() if name in fields}
+        return data
+
+# Global read model shared by the detail endpoints
+computer_read_model = ComputerReadModel()
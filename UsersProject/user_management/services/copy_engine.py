@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.files import File
+
+from ..models import FileTransfer
+
+logger = logging.getLogger(__name__)
+
+# SMB reads are latency bound; a few MiB per request keeps the pipe full
+DEFAULT_BUFFER_SIZE = 8 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class CopyResult:
+    source: str
+    destination: str
+    bytes: int = 0
+    seconds: float = 0.0
+    sha256: str = ''
+    error: str = ''
+    # The destination already existed, so nothing was written
+    conflict: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+class HashingFile(File):
+    """Django File that hashes and counts the bytes storage reads from it, in large chunks"""
+
+    def __init__(self, file, name=None, buffer_size: Optional[int] = None):
+        super().__init__(file, name)
+        self.DEFAULT_CHUNK_SIZE = buffer_size or DEFAULT_BUFFER_SIZE
+        self.digest = hashlib.sha256()
+        self.bytes_read = 0
+
+    def chunks(self, chunk_size=None):
+        # Storage may rewind and read again; only the last full pass counts
+        self.digest = hashlib.sha256()
+        self.bytes_read = 0
+        for chunk in super().chunks(chunk_size):
+            self.digest.update(chunk)
+            self.bytes_read += len(chunk)
+            yield chunk
+
+
+class CopyEngine:
+    """
+    Copies files in a single pass with large buffers, hashing the bytes as they
+    go by so the copy is verified without reading either file again.
+    """
+
+    def __init__(self, buffer_size: Optional[int] = None, workers: Optional[int] = None):
+        self.buffer_size = buffer_size or getattr(settings, 'SCAN_COPY_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)
+        self.workers = workers or getattr(settings, 'SCAN_COPY_WORKERS', 4)
+
+    def copy(self, source: str, destination: str, expected_hash: Optional[str] = None,
+             overwrite: bool = False) -> CopyResult:
+        """
+        Copy source to destination through a temporary file next to it, so readers
+        never see a partial file. If expected_hash is given and the bytes copied
+        don't match it, the copy is discarded. Unless overwrite is set, an existing
+        destination is left alone and the result has conflict=True; the check and
+        the rename are one atomic step, so concurrent copies to one name cannot
+        both win. Never raises; errors are in the result.
+        """
+        started = time.perf_counter()
+        temp_path = f"{destination}.{uuid.uuid4().hex[:8]}.part"
+        digest = hashlib.sha256()
+        copied = 0
+        try:
+            buffer = bytearray(self.buffer_size)
+            view = memoryview(buffer)
+            with open(source, 'rb', buffering=0) as src, open(temp_path, 'wb') as dst:
+                while True:
+                    read = src.readinto(buffer)
+                    if not read:
+                        break
+                    digest.update(view[:read])
+                    dst.write(view[:read])
+                    copied += read
+            content_hash = digest.hexdigest()
+            if expected_hash and content_hash != expected_hash:
+                raise OSError(f"Content changed while copying (sha256 {content_hash[:12]}, expected {expected_hash[:12]})")
+            shutil.copystat(source, temp_path)
+            if overwrite:
+                os.replace(temp_path, destination)
+            else:
+                self._publish_exclusive(temp_path, destination)
+            return CopyResult(source, destination, copied, round(time.perf_counter() - started, 3), content_hash)
+        except FileExistsError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return CopyResult(source, destination, copied, round(time.perf_counter() - started, 3),
+                              error=f"{destination} already exists", conflict=True)
+        except OSError as e:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return CopyResult(source, destination, copied, round(time.perf_counter() - started, 3), error=str(e))
+
+    @staticmethod
+    def _publish_exclusive(temp_path: str, destination: str) -> None:
+        """Move temp_path to destination, raising FileExistsError if the destination exists"""
+        try:
+            # A hard link fails atomically when the name is taken
+            os.link(temp_path, destination)
+        except FileExistsError:
+            raise
+        except OSError:
+            # Filesystems without hard links: claim the name with O_EXCL, then fill it
+            os.close(os.open(destination, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            os.replace(temp_path, destination)
+            return
+        os.remove(temp_path)
+
+    def stream_into(self, source: str, save: Callable[[HashingFile], str]) -> CopyResult:
+        """
+        Stream source straight into storage: save(content) stores the HashingFile
+        and returns the stored name. The byte count is checked against the source size.
+        """
+        started = time.perf_counter()
+        content = None
+        try:
+            with open(source, 'rb') as f:
+                expected_size = os.fstat(f.fileno()).st_size
+                content = HashingFile(f, name=os.path.basename(source), buffer_size=self.buffer_size)
+                destination = save(content)
+            if content.bytes_read != expected_size:
+                raise OSError(f"Stored {content.bytes_read} of {expected_size} bytes")
+            return CopyResult(source, destination, content.bytes_read, round(time.perf_counter() - started, 3),
+                              content.digest.hexdigest())
+        except Exception as e:
+            return CopyResult(source, '', content.bytes_read if content is not None else 0,
+                              round(time.perf_counter() - started, 3), error=str(e))
+
+    def map(self, func: Callable, items: Iterable) -> List:
+        """Run func over items on up to `workers` threads, keeping input order"""
+        items = list(items)
+        if self.workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items)), thread_name_prefix='copy') as pool:
+            return list(pool.map(func, items))
+
+    def record(self, computer, results: List[CopyResult]) -> int:
+        """Write one FileTransfer row per copy attempt in a single statement"""
+        if not results:
+            return 0
+        FileTransfer.objects.bulk_create([
+            FileTransfer(
+                computer=computer,
+                source_file=result.source,
+                destination_file=result.destination,
+                bytes_transferred=result.bytes,
+                duration=result.seconds,
+                sha256=result.sha256,
+                successful=result.ok,
+                error_message=result.error or None,
+            )
+            for result in results
+        ], batch_size=500)
+        total = sum(result.bytes for result in results if result.ok)
+        seconds = sum(result.seconds for result in results)
+        logger.info(
+            f"Recorded {len(results)} transfers for {getattr(computer, 'label', computer)}: "
+            f"{total / 1048576:.1f} MiB in {seconds:.1f}s of copy time"
+        )
+        return len(results)
+
+
+# Global copy engine used by the scan pipeline and the file copy jobs
+copy_engine = CopyEngine()
@@ -0,0 +1,215 @@
+import asyncio
+import ipaddress
+import logging
+import re
+import socket
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from ..models import Computer
+from .reachability import ReachabilitySweeper
+
+logger = logging.getLogger(__name__)
+
+# Refuse ranges bigger than a /16 so a typo cannot sweep half the campus
+MAX_DISCOVERY_HOSTS = 65536
+
+# Labels the relay gives new machines: PC1, PC2, ...
+PC_LABEL = re.compile(r'^PC(\d+)$')
+
+
+class AsyncRateLimiter:
+    """Space calls evenly so no more than `rate` start per second"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def expand_cidrs(cidrs: Iterable[str], exclude: Iterable[str] = ()) -> List[str]:
+    """Expand CIDR ranges into unique host addresses, minus excluded addresses"""
+    excluded = set(exclude)
+    hosts = {}
+    for cidr in cidrs:
+        network = ipaddress.ip_network(cidr.strip(), strict=False)
+        if network.num_addresses > MAX_DISCOVERY_HOSTS:
+            raise ValueError(f'{cidr} is larger than a /16; split it into smaller ranges')
+        for host in network.hosts():
+            address = str(host)
+            if address not in excluded:
+                hosts[address] = None
+    return list(hosts)
+
+
+class SubnetDiscovery:
+    """
+    Find lab machines by sweeping CIDR ranges and register the ones we do not
+    know yet (only when `register` is on; otherwise they are just reported).
+    Existing rows are only updated, never deleted, so history survives.
+    """
+
+    def __init__(self, cidrs: Optional[Iterable[str]] = None, rate: Optional[float] = None,
+                 dns_timeout: Optional[float] = None, sweeper: Optional[ReachabilitySweeper] = None,
+                 register: Optional[bool] = None):
+        self.cidrs = list(cidrs or getattr(settings, 'DISCOVERY_CIDRS', []))
+        self.exclude = getattr(settings, 'DISCOVERY_EXCLUDE', [])
+        self.register = register if register is not None else getattr(settings, 'DISCOVERY_REGISTER_NEW', False)
+        self.rate = rate or getattr(settings, 'DISCOVERY_PROBES_PER_SECOND', 200)
+        self.dns_timeout = dns_timeout or getattr(settings, 'DISCOVERY_DNS_TIMEOUT', 2.0)
+        self.sweeper = sweeper or ReachabilitySweeper()
+
+    async def _reverse_dns(self, address: str) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        try:
+            name, _, _ = await asyncio.wait_for(
+                loop.run_in_executor(None, socket.gethostbyaddr, address), self.dns_timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            return None
+        # Agents report the NetBIOS-style short name, so match that
+        short_name = name.split('.')[0].upper()
+        return short_name or None
+
+    async def scan(self, addresses: List[str]) -> List[Tuple[str, Optional[str], float]]:
+        """Probe every address under the rate limit; returns (ip, hostname, latency_ms) for responders"""
+        limiter = AsyncRateLimiter(self.rate)
+        semaphore = asyncio.Semaphore(self.sweeper.concurrency)
+
+        async def probe(address):
+            await limiter.wait()
+            async with semaphore:
+                latency = await self.sweeper.probe(address)
+            if latency is None:
+                return None
+            return address, await self._reverse_dns(address), latency
+
+        results = await asyncio.gather(*(probe(address) for address in addresses))
+        return [result for result in results if result]
+
+    def run(self, dry_run: bool = False) -> Dict[str, Any]:
+        """Sweep the configured ranges and upsert what was found in bulk"""
+        addresses = expand_cidrs(self.cidrs, self.exclude)
+        if not addresses:
+            return {'scanned': 0, 'responding': 0, 'created': 0, 'unregistered': 0, 'updated': 0}
+
+        found = asyncio.run(self.scan(addresses))
+        logger.info(f"Discovery probed {len(addresses)} addresses in {', '.join(self.cidrs)}; {len(found)} responded")
+
+        created, updated = self.upsert(found, dry_run=dry_run, register=self.register)
+        if not self.register:
+            for computer in created:
+                logger.info(f"Discovery found unregistered responder {computer.ip_address} ({computer.hostname or 'no DNS name'})")
+        return {
+            'scanned': len(addresses),
+            'responding': len(found),
+            'created': len(created) if self.register else 0,
+            'unregistered': 0 if self.register else len(created),
+            'updated': len(updated),
+            'new_computers': [{'ip_address': c.ip_address, 'hostname': c.hostname, 'label': c.label} for c in created],
+        }
+
+    def upsert(self, found: List[Tuple[str, Optional[str], float]], dry_run: bool = False, register: bool = True):
+        """
+        Diff responders against Computer rows: refresh known ones and create unknown
+        machines (returned unsaved when `register` is off)
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            ips = [ip for ip, _, _ in found]
+            hostnames = [hostname for _, hostname, _ in found if hostname]
+            # Reverse DNS names are uppercased; stored hostnames may not be
+            existing = list(
+                Computer.objects.select_for_update()
+                .annotate(hostname_upper=Upper('hostname'))
+                .filter(Q(ip_address__in=ips) | Q(hostname_upper__in=hostnames))
+            )
+            by_ip = {c.ip_address: c for c in existing if c.ip_address}
+            by_hostname = {c.hostname.upper(): c for c in existing if c.hostname}
+            taken_hostnames = set(
+                name.upper() for name in
+                Computer.objects.filter(hostname__isnull=False).values_list('hostname', flat=True)
+            )
+            next_pc = self.next_pc_number()
+
+            to_create, to_update = [], {}
+            for ip, hostname, latency in found:
+                computer = by_ip.get(ip)
+                if computer is None and hostname and hostname in by_hostname:
+                    # Known machine that picked up a new address
+                    computer = by_hostname[hostname]
+                    by_ip.pop(computer.ip_address, None)
+                    computer.ip_address = ip
+                    by_ip[ip] = computer
+                if computer is not None:
+                    if not computer.hostname and hostname and hostname not in taken_hostnames:
+                        computer.hostname = hostname
+                        taken_hostnames.add(hostname)
+                    computer.probe_latency_ms = latency
+                    computer.last_probed_at = now
+                    computer.updated_at = now
+                    to_update[computer.pk] = computer
+                    continue
+
+                if hostname in taken_hostnames:
+                    hostname = None
+                if hostname:
+                    taken_hostnames.add(hostname)
+                to_create.append(Computer(
+                    label=f'PC{next_pc}',
+                    hostname=hostname,
+                    ip_address=ip,
+                    probe_latency_ms=latency,
+                    # Reachable, but no agent has reported yet: an empty last_seen reads as offline
+                    last_probed_at=now
+                ))
+                next_pc += 1
+
+            if dry_run:
+                transaction.set_rollback(True)
+                return to_create, list(to_update.values())
+
+            created = Computer.objects.bulk_create(to_create, batch_size=500) if register else []
+            Computer.objects.bulk_update(
+                list(to_update.values()),
+                ['hostname', 'ip_address', 'probe_latency_ms', 'last_probed_at', 'updated_at'],
+                batch_size=500
+            )
+
+        if created:
+            from .fleet_summary import fleet_summary
+            fleet_summary.invalidate()
+            for computer in created:
+                logger.info(f"Discovered new computer {computer.label} ({computer.ip_address})")
+        return (created if register else to_create), list(to_update.values())
+
+    @staticmethod
+    def next_pc_number() -> int:
+        """Next free N for a PC{N} label, compared numerically so PC10 sorts after PC9"""
+        numbers = [
+            int(match.group(1)) for match in
+            (PC_LABEL.match(label) for label in
+             Computer.objects.filter(label__startswith='PC').values_list('label', flat=True))
+            if match
+        ]
+        return max(numbers, default=0) + 1
+
+
+# Global discovery job used by the management command and the hourly task
+subnet_discovery = SubnetDiscovery()
@@ -0,0 +1,143 @@
+import logging
+import os
+import re
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from ..models import CollectedDocument
+from ..utils.scans.hashing import sha256_file
+from ..utils.scans.onet import normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Standardized names produced by process_onet_pdf / process_strengthsprofile_pdf,
+# optionally with a " (N)" copy suffix
+ONET_FILENAME = re.compile(r'^O_NET_Interest_Profiler_(?P<name>.+)_(?P<date>\d{8})(?:\s*\(\d+\))?\.pdf$', re.IGNORECASE)
+STRENGTHS_FILENAME = re.compile(r'^StrengthsProfile_(?P<name>.+)-(?P<date>\d{2}-\d{2}-\d{4})(?:\s*\(\d+\))?\.pdf$', re.IGNORECASE)
+COPY_SUFFIX = re.compile(r'\s*\(\d+\)$')
+
+
+def person_key(name: str) -> str:
+    """Case-insensitive key for a person's name"""
+    return normalize_name(name.replace('_', ' ')).lower()
+
+
+def parse_document_filename(filename: str) -> Tuple[str, str, Optional[date]]:
+    """Return (doc_type, person_key, doc_date) for a collected PDF's filename"""
+    match = ONET_FILENAME.match(filename)
+    if match:
+        return 'onet', person_key(match.group('name')), _parse_date(match.group('date'), '%m%d%Y')
+    match = STRENGTHS_FILENAME.match(filename)
+    if match:
+        return 'strengths', person_key(match.group('name')), _parse_date(match.group('date'), '%m-%d-%Y')
+    stem = COPY_SUFFIX.sub('', os.path.splitext(filename)[0])
+    return 'other', stem.lower(), None
+
+
+def _parse_date(value: str, fmt: str) -> Optional[date]:
+    try:
+        return datetime.strptime(value, fmt).date()
+    except ValueError:
+        return None
+
+
+class DocumentIndex:
+    """
+    Dedup store for collected PDFs, keyed by content hash and by
+    (person, document type, date). Every check is one indexed query.
+    """
+
+    def find_duplicate(self, filename: str, content_hash: Optional[str] = None) -> Optional[CollectedDocument]:
+        """The stored document this file duplicates, if any"""
+        doc_type, key, doc_date = parse_document_filename(filename)
+        query = Q(person_key=key, doc_type=doc_type, doc_date=doc_date)
+        if content_hash:
+            query |= Q(sha256=content_hash)
+        return CollectedDocument.objects.filter(query).only('id', 'folder', 'filename').first()
+
+    def is_duplicate(self, filename: str, content_hash: Optional[str] = None) -> bool:
+        duplicate = self.find_duplicate(filename, content_hash)
+        if duplicate is not None:
+            logger.info(f"{filename} duplicates {duplicate.folder}/{duplicate.filename}")
+        return duplicate is not None
+
+    def register(self, stored_path: str, content_hash: Optional[str] = None, computer=None,
+                 source_path: str = '') -> Optional[CollectedDocument]:
+        """Add a freshly stored PDF to the index; returns None if the content was already indexed"""
+        return self.claim(stored_path, content_hash or sha256_file(stored_path), os.path.getsize(stored_path),
+                          computer=computer, source_path=source_path)
+
+    def claim(self, stored_path: str, content_hash: str, size: int = 0, computer=None,
+              source_path: str = '') -> Optional[CollectedDocument]:
+        """
+        Index a PDF before it is stored, so concurrent copies of the same content
+        race on the unique hash instead of on the file. Returns None if the
+        content is already indexed; call release() if the copy then fails.
+        """
+        filename = os.path.basename(stored_path)
+        doc_type, key, doc_date = parse_document_filename(filename)
+        try:
+            with transaction.atomic():
+                return CollectedDocument.objects.create(
+                    sha256=content_hash,
+                    folder=os.path.basename(os.path.dirname(stored_path)),
+                    person_key=key,
+                    doc_type=doc_type,
+                    doc_date=doc_date,
+                    filename=filename,
+                    size=size,
+                    computer=computer,
+                    source_path=source_path,
+                )
+        except IntegrityError:
+            return None
+
+    def release(self, document: CollectedDocument) -> None:
+        """Drop a claim whose copy did not happen"""
+        CollectedDocument.objects.filter(pk=document.pk).delete()
+
+    def backfill(self, root: Optional[str] = None, batch_size: int = 500) -> Dict[str, Any]:
+        """Index every PDF already under MEDIA_ROOT/pdfs"""
+        root = root or os.path.join(settings.MEDIA_ROOT, 'pdfs')
+        before = CollectedDocument.objects.count()
+        batch, scanned = [], 0
+
+        def flush():
+            CollectedDocument.objects.bulk_create(batch, batch_size=batch_size, ignore_conflicts=True)
+            batch.clear()
+
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if not filename.lower().endswith('.pdf'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    content_hash = sha256_file(path)
+                    size = os.path.getsize(path)
+                except OSError as e:
+                    logger.warning(f"Could not index {path}: {str(e)}")
+                    continue
+                scanned += 1
+                doc_type, key, doc_date = parse_document_filename(filename)
+                batch.append(CollectedDocument(
+                    sha256=content_hash,
+                    folder=os.path.basename(dirpath),
+                    person_key=key,
+                    doc_type=doc_type,
+                    doc_date=doc_date,
+                    filename=filename,
+                    size=size,
+                ))
+                if len(batch) >= batch_size:
+                    flush()
+        if batch:
+            flush()
+        return {'scanned': scanned, 'indexed': CollectedDocument.objects.count() - before}
+
+
+# Global index used by the scan helpers and the backfill command
+document_index = DocumentIndex()
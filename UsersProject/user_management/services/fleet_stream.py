@@ -0,0 +1,128 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.utils import timezone
+
+from ..models import Computer
+from .status_events import get_offline_threshold
+
+logger = logging.getLogger(__name__)
+
+# Channel layer group every live fleet consumer joins
+FLEET_GROUP = 'fleet'
+
+# Lean per-computer fields streamed to dashboards (no metrics blob)
+STREAM_VALUES = {
+    'id': 'id',
+    'label': 'label',
+    'hostname': 'hostname',
+    'ip_address': 'ip_address',
+    'os_version': 'os_version',
+    'logged_in_user': 'logged_in_user',
+    'last_seen': 'last_seen',
+    'last_metrics_update': 'last_metrics_update',
+    'cpu_percent': 'metrics__cpu__percent',
+    'memory_percent': 'metrics__memory__percent',
+    'disk_percent': 'metrics__disk__percent',
+}
+
+
+def _status(last_seen, last_metrics_update, now=None) -> str:
+    """Online/offline using the same silence window as the status tracker"""
+    threshold = (now or timezone.now()) - get_offline_threshold()
+    is_online = (last_metrics_update and last_metrics_update >= threshold) or (last_seen and last_seen >= threshold)
+    return 'online' if is_online else 'offline'
+
+
+def _jsonable(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+
+
+def stream_row(computer: Computer) -> Dict[str, Any]:
+    """Build the streamed representation of a computer instance"""
+    metrics = computer.metrics or {}
+    row = {
+        'id': computer.pk,
+        'label': computer.label,
+        'hostname': computer.hostname,
+        'ip_address': computer.ip_address,
+        'os_version': computer.os_version,
+        'logged_in_user': computer.logged_in_user,
+        'last_seen': computer.last_seen,
+        'last_metrics_update': computer.last_metrics_update,
+        'cpu_percent': (metrics.get('cpu') or {}).get('percent'),
+        'memory_percent': (metrics.get('memory') or {}).get('percent'),
+        'disk_percent': (metrics.get('disk') or {}).get('percent'),
+        'status': _status(computer.last_seen, computer.last_metrics_update),
+    }
+    return _jsonable(row)
+
+
+def fleet_snapshot() -> List[Dict[str, Any]]:
+    """Read the whole fleet in its streamed shape with a single query"""
+    now = timezone.now()
+    rows = []
+    for values in Computer.active.order_by('label').values(*STREAM_VALUES.values()):
+        row = {name: values[lookup] for name, lookup in STREAM_VALUES.items()}
+        row['status'] = _status(row['last_seen'], row['last_metrics_update'], now)
+        rows.append(_jsonable(row))
+    return rows
+
+
+class FleetStreamPublisher:
+    """Publish per-computer field diffs to the fleet channel layer group"""
+
+    def __init__(self):
+        self._channel_layer = None
+        self._last = {}  # computer id -> last published row
+        self._lock = threading.Lock()
+
+    @property
+    def channel_layer(self):
+        if self._channel_layer is None:
+            self._channel_layer = get_channel_layer()
+        return self._channel_layer
+
+    def diff(self, computer: Computer) -> Dict[str, Any]:
+        """Return the streamed fields that changed since this computer was last published"""
+        row = stream_row(computer)
+        with self._lock:
+            previous = self._last.get(computer.pk, {})
+            self._last[computer.pk] = row
+        return {key: value for key, value in row.items() if key != 'id' and previous.get(key) != value}
+
+    async def apublish(self, computer: Computer) -> None:
+        """Publish changed fields of a computer from async code"""
+        await self.apublish_fields(computer.pk, self.diff(computer))
+
+    async def apublish_fields(self, computer_id: int, fields: Dict[str, Any]) -> None:
+        if not fields or self.channel_layer is None:
+            return
+        try:
+            await self.channel_layer.group_send(FLEET_GROUP, {
+                'type': 'computer.diff',
+                'id': computer_id,
+                'fields': fields,
+            })
+        except Exception as e:
+            logger.warning(f"Failed to publish fleet update for computer {computer_id}: {str(e)}")
+
+    def publish(self, computer: Computer) -> None:
+        """Publish changed fields of a computer from sync code"""
+        self.publish_fields(computer.pk, self.diff(computer))
+
+    def publish_fields(self, computer_id: int, fields: Dict[str, Any]) -> None:
+        if not fields:
+            return
+        with self._lock:
+            if computer_id in self._last:
+                self._last[computer_id].update(fields)
+        async_to_sync(self.apublish_fields)(computer_id, fields)
+
+
+# Global publisher shared by ingestion workers
+fleet_publisher = FleetStreamPublisher()
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import logging
+import threading
+import uuid
+from collections import Counter
+from typing import Dict, Any, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from ..models import Computer
+from .status_events import get_offline_threshold, reported_since
+
+logger = logging.getLogger(__name__)
+
+# Cache keys for the published summary and the generation token other processes bump
+FLEET_SUMMARY_CACHE_KEY = 'fleet_summary'
+FLEET_SUMMARY_GENERATION_KEY = 'fleet_summary_generation'
+
+SUMMARY_VALUES = ('id', 'last_seen', 'last_metrics_update', 'os_version', 'metrics__cpu__percent',
+                  'metrics__memory__percent', 'metrics__disk__percent')
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class FleetSummary:
+    """
+    Fleet aggregates kept up to date one computer at a time.
+    Each computer's contribution is remembered so an update subtracts the old
+    contribution and adds the new one instead of rescanning the fleet.
+    """
+
+    def __init__(self, disk_alert_percent=None):
+        self.disk_alert_percent = (
+            disk_alert_percent if disk_alert_percent is not None
+            else getattr(settings, 'FLEET_DISK_ALERT_PERCENT', 90)
+        )
+        self._lock = threading.Lock()
+        self._contributions = {}  # computer id -> (online, cpu, memory, disk_full, os_version)
+        self._generation = None
+        self._reset_totals()
+
+    def _reset_totals(self) -> None:
+        self._online = 0
+        self._cpu_sum = 0.0
+        self._cpu_count = 0
+        self._memory_sum = 0.0
+        self._memory_count = 0
+        self._disk_full = 0
+        self._os_versions = Counter()
+
+    def _contribution(self, is_online, os_version, cpu, memory, disk) -> Tuple:
+        cpu, memory, disk = _number(cpu), _number(memory), _number(disk)
+        return (
+            bool(is_online),
+            cpu if is_online else None,
+            memory if is_online else None,
+            disk is not None and disk > self.disk_alert_percent,
+            os_version or 'Unknown',
+        )
+
+    def _add(self, contribution: Tuple, sign: int) -> None:
+        online, cpu, memory, disk_full, os_version = contribution
+        self._online += sign * online
+        if cpu is not None:
+            self._cpu_sum += sign * cpu
+            self._cpu_count += sign
+        if memory is not None:
+            self._memory_sum += sign * memory
+            self._memory_count += sign
+        self._disk_full += sign * disk_full
+        self._os_versions[os_version] += sign
+        if self._os_versions[os_version] <= 0:
+            del self._os_versions[os_version]
+
+    def _summary(self) -> Dict[str, Any]:
+        return {
+            'total': len(self._contributions),
+            'online_count': self._online,
+            'offline_count': len(self._contributions) - self._online,
+            'avg_cpu_percent': round(self._cpu_sum / self._cpu_count, 1) if self._cpu_count else None,
+            'avg_memory_percent': round(self._memory_sum / self._memory_count, 1) if self._memory_count else None,
+            'disk_alert_percent': self.disk_alert_percent,
+            'disk_over_threshold': self._disk_full,
+            'os_versions': dict(self._os_versions.most_common()),
+        }
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Recompute every contribution with a single query and publish the result"""
+        rows = Computer.active.values_list(*SUMMARY_VALUES)
+        cutoff = timezone.now() - get_offline_threshold()
+        generation = cache.get(FLEET_SUMMARY_GENERATION_KEY)
+        if generation is None:
+            cache.add(FLEET_SUMMARY_GENERATION_KEY, uuid.uuid4().hex, None)
+            generation = cache.get(FLEET_SUMMARY_GENERATION_KEY)
+        with self._lock:
+            self._contributions = {}
+            self._reset_totals()
+            for computer_id, last_seen, last_metrics_update, os_version, cpu, memory, disk in rows:
+                is_online = reported_since(cutoff, last_seen, last_metrics_update)
+                contribution = self._contribution(is_online, os_version, cpu, memory, disk)
+                self._contributions[computer_id] = contribution
+                self._add(contribution, 1)
+            self._generation = generation
+            summary = self._summary()
+        return self._publish(summary)
+
+    def apply(self, computer: Computer) -> None:
+        """Fold one computer's current state into the aggregates"""
+        if self._generation is None or cache.get(FLEET_SUMMARY_GENERATION_KEY) != self._generation:
+            # Another process changed the fleet behind our back; start over
+            self.rebuild()
+            return
+
+        metrics = computer.metrics or {}
+        cutoff = timezone.now() - get_offline_threshold()
+        contribution = self._contribution(
+            reported_since(cutoff, computer.last_seen, computer.last_metrics_update),
+            computer.os_version,
+            (metrics.get('cpu') or {}).get('percent'),
+            (metrics.get('memory') or {}).get('percent'),
+            (metrics.get('disk') or {}).get('percent'),
+        )
+        with self._lock:
+            previous = self._contributions.get(computer.pk)
+            if previous == contribution:
+                return
+            before = self._summary()
+            if previous is not None:
+                self._add(previous, -1)
+            self._contributions[computer.pk] = contribution
+            self._add(contribution, 1)
+            summary = self._summary()
+        if summary != before:
+            self._publish(summary)
+
+    def invalidate(self) -> None:
+        """Mark the summary stale after a change made outside the ingestion path"""
+        try:
+            cache.set(FLEET_SUMMARY_GENERATION_KEY, uuid.uuid4().hex, None)
+            cache.delete(FLEET_SUMMARY_CACHE_KEY)
+        except Exception as e:
+            logger.warning(f"Could not invalidate fleet summary: {str(e)}")
+
+    def get(self) -> Dict[str, Any]:
+        """Return the published summary, rebuilding it if nobody has published one"""
+        summary = cache.get(FLEET_SUMMARY_CACHE_KEY)
+        if summary is None:
+            summary = self.rebuild()
+        return summary
+
+    def _publish(self, summary: Dict[str, Any]) -> Dict[str, Any]:
+        body = json.dumps(summary, sort_keys=True)
+        summary = dict(summary,
+                       etag=hashlib.md5(body.encode()).hexdigest(),
+                       updated_at=timezone.now().isoformat())
+        try:
+            cache.set(FLEET_SUMMARY_CACHE_KEY, summary, None)
+        except Exception as e:
+            logger.warning(f"Could not publish fleet summary: {str(e)}")
+        return summary
+
+
+# Global summary maintained by the ingestion path
+fleet_summary = FleetSummary()
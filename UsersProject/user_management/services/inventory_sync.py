@@ -0,0 +1,147 @@
+import ipaddress
+import logging
+import os
+from typing import Dict, Any, Iterable
+
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Computer, ComputerTombstone
+
+logger = logging.getLogger(__name__)
+
+INVENTORY_COLUMNS = ['ip_address', 'label']
+
+
+def _valid_ip(value) -> bool:
+    try:
+        ipaddress.ip_address(value)
+        return True
+    except ValueError:
+        return False
+
+
+def read_lab_csv(path) -> pd.DataFrame:
+    """Read Lab-Computers.csv (IPAddress,ComputerLabel; may start with a BOM)"""
+    frame = pd.read_csv(path, encoding='utf-8-sig', dtype=str, skipinitialspace=True)
+    return frame.rename(columns={'IPAddress': 'ip_address', 'ComputerLabel': 'label'})[INVENTORY_COLUMNS]
+
+
+def read_pc_names(path) -> pd.DataFrame:
+    """Read pc_names.txt (whitespace separated, one header line)"""
+    return pd.read_csv(path, sep=r'\s+', skiprows=1, header=None, names=INVENTORY_COLUMNS,
+                       usecols=[0, 1], dtype=str, encoding='utf-8-sig')
+
+
+def normalize_inventory(frames: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """Merge sources into one row per IP; later sources win, rows with invalid IPs are dropped"""
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        return pd.DataFrame(columns=INVENTORY_COLUMNS)
+    inventory = pd.concat(frames, ignore_index=True)
+    inventory['ip_address'] = inventory['ip_address'].str.strip()
+    inventory['label'] = inventory['label'].str.strip()
+    inventory = inventory.dropna(subset=INVENTORY_COLUMNS)
+    inventory = inventory[(inventory['label'] != '') & inventory['ip_address'].map(_valid_ip)]
+    return inventory.drop_duplicates('ip_address', keep='last').reset_index(drop=True)
+
+
+class InventorySync:
+    """
+    Reconcile Computer rows with the lab inventory files in a handful of
+    queries: one read, then bulk insert, bulk update and a soft-delete.
+    """
+
+    def default_sources(self):
+        root = getattr(settings, 'PROJECT_ROOT', settings.BASE_DIR)
+        return [
+            (read_lab_csv, os.path.join(root, getattr(settings, 'CSV_FILE', 'Lab-Computers.csv'))),
+            (read_pc_names, os.path.join(root, getattr(settings, 'PC_NAMES_FILE', 'pc_names.txt'))),
+        ]
+
+    def load(self, sources=None) -> pd.DataFrame:
+        frames = []
+        for reader, path in sources or self.default_sources():
+            if not os.path.exists(path):
+                logger.warning(f"Inventory source not found: {path}")
+                continue
+            frames.append(reader(path))
+        return normalize_inventory(frames)
+
+    def diff(self, inventory: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """Split the inventory against existing rows into inserts, updates and retirements"""
+        existing = pd.DataFrame(
+            list(Computer.objects.exclude(ip_address__isnull=True)
+                 .values('id', 'ip_address', 'label', 'is_active')),
+            columns=['id', 'ip_address', 'label', 'is_active']
+        )
+        merged = inventory.merge(existing, on='ip_address', how='outer',
+                                 suffixes=('', '_current'), indicator=True)
+        both = merged[merged['_merge'] == 'both']
+        return {
+            'create': merged[merged['_merge'] == 'left_only'],
+            'update': both[(both['label'] != both['label_current']) | ~both['is_active'].astype(bool)],
+            'retire': merged[(merged['_merge'] == 'right_only') & merged['is_active'].astype(bool)],
+            'unchanged': both[(both['label'] == both['label_current']) & both['is_active'].astype(bool)],
+        }
+
+    def sync(self, sources=None, dry_run: bool = False, retire_missing: bool = True) -> Dict[str, Any]:
+        """Apply the inventory; returns what changed"""
+        inventory = self.load(sources)
+        if inventory.empty:
+            # An empty or missing inventory must never retire the whole fleet
+            raise ValueError('No valid rows found in the inventory sources')
+
+        now = timezone.now()
+        with transaction.atomic():
+            changes = self.diff(inventory)
+            to_create = changes['create']
+            to_update = changes['update']
+            to_retire = changes['retire'] if retire_missing else changes['retire'].iloc[0:0]
+
+            report = {
+                'created': to_create[INVENTORY_COLUMNS].to_dict('records'),
+                'updated': to_update[['ip_address', 'label_current', 'label']]
+                           .rename(columns={'label_current': 'previous_label'}).to_dict('records'),
+                'retired': to_retire[['ip_address', 'label_current']]
+                           .rename(columns={'label_current': 'label'}).to_dict('records'),
+                'unchanged': len(changes['unchanged']),
+            }
+            if dry_run:
+                return report
+
+            Computer.objects.bulk_create([
+                Computer(ip_address=row.ip_address, label=row.label)
+                for row in to_create.itertuples(index=False)
+            ], batch_size=500)
+
+            Computer.objects.bulk_update([
+                Computer(id=int(row.id), label=row.label, is_active=True, retired_at=None, updated_at=now)
+                for row in to_update.itertuples(index=False)
+            ], ['label', 'is_active', 'retired_at', 'updated_at'], batch_size=500)
+
+            retire_ids = [int(computer_id) for computer_id in to_retire['id']]
+            if retire_ids:
+                Computer.objects.filter(id__in=retire_ids).update(
+                    is_active=False, retired_at=now, updated_at=now
+                )
+                # Delta sync clients see retired machines as deleted
+                ComputerTombstone.objects.bulk_create(
+                    [ComputerTombstone(computer_id=computer_id, deleted_at=now) for computer_id in retire_ids],
+                    batch_size=500
+                )
+
+        if len(to_create) or len(to_update) or retire_ids:
+            from .fleet_summary import fleet_summary
+            fleet_summary.invalidate()
+        logger.info(
+            f"Inventory sync: {len(report['created'])} created, {len(report['updated'])} updated, "
+            f"{len(report['retired'])} retired, {report['unchanged']} unchanged"
+        )
+        return report
+
+
+# Global inventory sync used by import_computers and the file operations task
+inventory_sync = InventorySync()
@@ -0,0 +1,285 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from ..models import Computer, LogPattern, LogAlert
+from .metrics_deadband import MetricsDeadband
+
+logger = logging.getLogger(__name__)
+
+# File the detector checkpoints its baselines to, outside the culled cache directory
+DEFAULT_ANOMALY_STATE_FILE = os.path.join(settings.BASE_DIR, 'ai_cache', 'metrics_anomaly_state.json')
+
+# Name of the LogPattern every metrics anomaly alert is filed under
+ANOMALY_PATTERN_NAME = 'Metrics anomaly'
+
+DEFAULT_ANOMALY_RULES = {
+    # EWMA smoothing factor; ~0.05 remembers roughly the last 40 reports
+    'alpha': 0.05,
+    # Reports needed before z-scores are trusted
+    'min_samples': 30,
+    # Minutes between two alerts for the same host, metric and rule
+    'cooldown_minutes': 60,
+    'metrics': {
+        'cpu.percent': {'z_threshold': 4.0, 'min_std': 5.0, 'sustained_above': 95.0, 'sustained_minutes': 20},
+        'memory.percent': {'z_threshold': 4.0, 'min_std': 3.0, 'sustained_above': 95.0, 'sustained_minutes': 20},
+        'disk.percent': {'z_threshold': 4.0, 'min_std': 1.0, 'sustained_above': 95.0, 'sustained_minutes': 0},
+    },
+}
+
+
+class MetricsAnomalyDetector:
+    """
+    Incremental per-host anomaly detector over streamed metrics.
+    Keeps an EWMA mean/variance per host and metric in fixed-size numpy rows,
+    so memory is O(1) per host and a batch of reports is scored in one pass.
+    """
+
+    def __init__(self, rules=None, checkpoint_interval=None, state_file=None):
+        if rules is None:
+            overrides = getattr(settings, 'METRICS_ANOMALY_RULES', {})
+            rules = {
+                **DEFAULT_ANOMALY_RULES,
+                **overrides,
+                'metrics': {
+                    path: {**DEFAULT_ANOMALY_RULES['metrics'].get(path, {}), **metric_rules}
+                    for path, metric_rules in {**DEFAULT_ANOMALY_RULES['metrics'], **overrides.get('metrics', {})}.items()
+                },
+            }
+        self.alpha = rules.get('alpha', 0.05)
+        self.min_samples = rules.get('min_samples', 30)
+        self.cooldown = rules.get('cooldown_minutes', 60) * 60
+        self.paths = list(rules['metrics'])
+        metric_rules = [rules['metrics'][path] for path in self.paths]
+        self.z_threshold = np.array([r.get('z_threshold', 4.0) for r in metric_rules])
+        self.min_var = np.array([r.get('min_std', 1.0) for r in metric_rules]) ** 2
+        self.sustained_above = np.array([r.get('sustained_above', np.inf) for r in metric_rules])
+        self.sustained_seconds = np.array([r.get('sustained_minutes', 0) * 60 for r in metric_rules])
+        self.checkpoint_interval = (
+            checkpoint_interval if checkpoint_interval is not None
+            else getattr(settings, 'METRICS_ANOMALY_CHECKPOINT_INTERVAL', 60)
+        )
+        self.state_file = state_file or getattr(settings, 'METRICS_ANOMALY_STATE_FILE', DEFAULT_ANOMALY_STATE_FILE)
+
+        self._lock = threading.Lock()
+        self._index = {}  # computer id -> row
+        self._allocate(64)
+        self._loaded = False
+        self._checkpointed_at = 0.0
+        self._pattern_id = None
+
+    def _allocate(self, capacity: int) -> None:
+        width = len(self.paths)
+        self.mean = np.zeros((capacity, width))
+        self.var = np.zeros((capacity, width))
+        self.count = np.zeros((capacity, width), dtype=np.int64)
+        self.above_since = np.full((capacity, width), np.nan)  # epoch seconds a threshold breach started
+        self.spike_alerted_at = np.full((capacity, width), -np.inf)
+        self.sustained_alerted_at = np.full((capacity, width), -np.inf)
+
+    def _arrays(self):
+        return (self.mean, self.var, self.count, self.above_since, self.spike_alerted_at, self.sustained_alerted_at)
+
+    def _grow(self, capacity: int) -> None:
+        old = self._arrays()
+        self._allocate(capacity)
+        size = old[0].shape[0]
+        for new, previous in zip(self._arrays(), old):
+            new[:size] = previous
+
+    def _rows_for(self, computer_ids: Sequence[int]) -> np.ndarray:
+        for computer_id in computer_ids:
+            if computer_id not in self._index:
+                if len(self._index) >= self.mean.shape[0]:
+                    self._grow(self.mean.shape[0] * 2)
+                self._index[computer_id] = len(self._index)
+        return np.array([self._index[computer_id] for computer_id in computer_ids], dtype=np.int64)
+
+    def values_for(self, metrics: Dict[str, Any]) -> List[float]:
+        """Pick the watched metric values out of a metrics blob (NaN when missing)"""
+        flat = MetricsDeadband.flatten(metrics or {})
+        values = []
+        for path in self.paths:
+            try:
+                values.append(float(flat[path]))
+            except (KeyError, TypeError, ValueError):
+                values.append(np.nan)
+        return values
+
+    def observe(self, computer_id: int, metrics: Dict[str, Any], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Score one host's report; returns the anomalies it raised"""
+        return self.evaluate_batch([computer_id], [self.values_for(metrics)], now)
+
+    def evaluate_batch(self, computer_ids: Sequence[int], values, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Score a batch of reports (one row per computer, one column per watched metric)
+        and fold them into the baselines. Returns the anomalies that passed their cooldown.
+        Reads and writes the checkpoint file, so async callers run it through sync_to_async.
+        """
+        now = now if now is not None else time.time()
+        x = np.asarray(values, dtype=float).reshape(len(computer_ids), len(self.paths))
+        self._load_checkpoint()
+
+        with self._lock:
+            rows = self._rows_for(computer_ids)
+            mean, var, count = self.mean[rows], self.var[rows], self.count[rows]
+            present = ~np.isnan(x)
+
+            # Z-score against the baseline as it stood before this report
+            z = np.abs(x - mean) / np.sqrt(np.maximum(var, self.min_var))
+            spike = present & (count >= self.min_samples) & (z >= self.z_threshold)
+
+            # Sustained threshold: track when each breach started
+            above = present & (x >= self.sustained_above)
+            above_since = np.where(above, np.where(np.isnan(self.above_since[rows]), now, self.above_since[rows]), np.nan)
+            sustained = above & (now - above_since >= self.sustained_seconds)
+
+            # EWMA update; the first sample seeds the mean
+            delta = np.where(present, x - mean, 0.0)
+            first = present & (count == 0)
+            new_mean = np.where(first, np.nan_to_num(x), mean + self.alpha * delta)
+            new_var = np.where(first, 0.0, (1 - self.alpha) * (var + self.alpha * delta ** 2))
+            self.mean[rows] = np.where(present, new_mean, mean)
+            self.var[rows] = np.where(present, new_var, var)
+            self.count[rows] = count + present
+            self.above_since[rows] = above_since
+
+            # Each rule has its own cooldown so a spike does not mask a later sustained breach
+            spike &= now - self.spike_alerted_at[rows] >= self.cooldown
+            sustained &= now - self.sustained_alerted_at[rows] >= self.cooldown
+            self.spike_alerted_at[rows] = np.where(spike, now, self.spike_alerted_at[rows])
+            self.sustained_alerted_at[rows] = np.where(sustained, now, self.sustained_alerted_at[rows])
+
+        anomalies = []
+        for rule, fired in (('zscore', spike), ('sustained', sustained)):
+            for i, j in zip(*np.nonzero(fired)):
+                anomalies.append({
+                    'computer_id': computer_ids[i],
+                    'metric': self.paths[j],
+                    'rule': rule,
+                    'value': round(float(x[i, j]), 2),
+                    'baseline_mean': round(float(mean[i, j]), 2),
+                    'baseline_std': round(float(np.sqrt(var[i, j])), 2),
+                    'z_score': round(float(z[i, j]), 2),
+                    'sustained_seconds': int(now - above_since[i, j]) if rule == 'sustained' else 0,
+                })
+
+        self._maybe_checkpoint(now)
+        return anomalies
+
+    def raise_alerts(self, anomalies: List[Dict[str, Any]]) -> int:
+        """Persist anomalies as LogAlerts and notify staff users; only called when rules fire"""
+        if not anomalies:
+            return 0
+        from notifications.models import Notification
+
+        labels = dict(Computer.objects.filter(
+            id__in={a['computer_id'] for a in anomalies}
+        ).values_list('id', 'label'))
+        staff = list(get_user_model().objects.filter(is_staff=True, is_active=True))
+
+        alerts, notifications = [], []
+        for anomaly in anomalies:
+            label = labels.get(anomaly['computer_id'], anomaly['computer_id'])
+            message = self._describe(label, anomaly)
+            logger.warning(message)
+            alerts.append(dict(anomaly, computer_label=label))
+            notifications.extend(
+                Notification(user=user, title=f"Metrics anomaly on {label}", message=message, type='warning')
+                for user in staff
+            )
+
+        with transaction.atomic():
+            pattern_id = self._get_pattern_id()
+            LogAlert.objects.bulk_create([LogAlert(pattern_id=pattern_id, details=details) for details in alerts])
+            Notification.objects.bulk_create(notifications, batch_size=500)
+        return len(anomalies)
+
+    @staticmethod
+    def _describe(label, anomaly: Dict[str, Any]) -> str:
+        if anomaly['rule'] == 'sustained':
+            minutes = anomaly['sustained_seconds'] // 60
+            return f"{label}: {anomaly['metric']} at {anomaly['value']} for {minutes} minutes"
+        return (
+            f"{label}: {anomaly['metric']} at {anomaly['value']} "
+            f"(baseline {anomaly['baseline_mean']} ± {anomaly['baseline_std']}, z={anomaly['z_score']})"
+        )
+
+    def _get_pattern_id(self) -> int:
+        if self._pattern_id is None:
+            pattern, _ = LogPattern.objects.get_or_create(
+                name=ANOMALY_PATTERN_NAME,
+                defaults={
+                    'description': 'Raised by the streaming metrics anomaly detector',
+                    'pattern_type': 'THRESHOLD',
+                    'conditions': {'source': 'metrics_anomaly', 'metrics': self.paths},
+                }
+            )
+            self._pattern_id = pattern.id
+        return self._pattern_id
+
+    def checkpoint(self) -> None:
+        """Save the baselines so a restart resumes from them"""
+        with self._lock:
+            size = len(self._index)
+            state = {
+                'paths': self.paths,
+                'ids': list(self._index),
+                'mean': self.mean[:size].tolist(),
+                'var': self.var[:size].tolist(),
+                'count': self.count[:size].tolist(),
+                'above_since': self.above_since[:size].tolist(),
+                'spike_alerted_at': self.spike_alerted_at[:size].tolist(),
+                'sustained_alerted_at': self.sustained_alerted_at[:size].tolist(),
+            }
+        # Write next to the target and swap it in, so a crash never leaves half a file
+        temp_path = f"{self.state_file}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            with open(temp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.state_file)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not checkpoint anomaly detector state: {str(e)}")
+
+    def _maybe_checkpoint(self, now: float) -> None:
+        if now - self._checkpointed_at >= self.checkpoint_interval:
+            self._checkpointed_at = now
+            self.checkpoint()
+
+    def _load_checkpoint(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load anomaly detector state: {str(e)}")
+            return
+        if not state or state.get('paths') != self.paths:
+            return
+
+        with self._lock:
+            rows = self._rows_for(state['ids'])
+            self.mean[rows] = state['mean']
+            self.var[rows] = state['var']
+            self.count[rows] = state['count']
+            self.above_since[rows] = state['above_since']
+            self.spike_alerted_at[rows] = state['spike_alerted_at']
+            self.sustained_alerted_at[rows] = state['sustained_alerted_at']
+        logger.info(f"Restored anomaly baselines for {len(rows)} computers")
+
+
+# Global detector shared by the ingestion path
+anomaly_detector = MetricsAnomalyDetector()
@@ -0,0 +1,193 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from ..models import Computer
+
+logger = logging.getLogger(__name__)
+
+# Cache key the ingesting process publishes its counters under so web workers can read them
+INGEST_STATS_CACHE_KEY = 'metrics_ingest_stats'
+
+# Default dead-bands: a banded value is only persisted when it moves by more than
+# `delta` or when `max_age` seconds have passed since the row was last written.
+DEFAULT_DEADBANDS = {
+    'cpu.percent': {'delta': 2.0, 'max_age': 300},
+    'memory.percent': {'delta': 2.0, 'max_age': 300},
+    'memory.available': {'delta': 256 * 1024 * 1024, 'max_age': 300},
+    'memory.used': {'delta': 256 * 1024 * 1024, 'max_age': 300},
+    'disk.percent': {'delta': 1.0, 'max_age': 900},
+    'disk.free': {'delta': 1024 * 1024 * 1024, 'max_age': 900},
+    'disk.used': {'delta': 1024 * 1024 * 1024, 'max_age': 900},
+}
+
+# Model columns compared for any change (no dead-band) alongside the metrics blob.
+# system_uptime is left out on purpose: it changes on every report, so it would defeat
+# the dead-band. It is derived from boot_time (tracked) and refreshed by heartbeats instead.
+TRACKED_FIELDS = ('hostname', 'ip_address', 'os_version', 'device_class', 'logged_in_user', 'boot_time')
+
+
+class MetricsDeadband:
+    """Decide whether a metrics report is worth a full row write or only a heartbeat"""
+
+    def __init__(self, bands=None, heartbeat_interval=None, stats_publish_interval=10):
+        # settings.METRICS_DEADBANDS only overrides or adds bands; the defaults live here
+        self.bands = bands if bands is not None else {**DEFAULT_DEADBANDS, **getattr(settings, 'METRICS_DEADBANDS', {})}
+        self.heartbeat_interval = (
+            heartbeat_interval if heartbeat_interval is not None
+            else getattr(settings, 'METRICS_HEARTBEAT_INTERVAL', 60)
+        )
+        self.stats_publish_interval = stats_publish_interval
+        self._state = {}  # computer id -> {'snapshot': dict, 'persisted_at': datetime, 'heartbeat_at': datetime}
+        self._lock = threading.Lock()
+        self._stats = {'persisted': 0, 'suppressed': 0, 'heartbeats': 0, 'heartbeats_skipped': 0}
+        self._stats_published_at = None
+
+    @classmethod
+    def flatten(cls, values: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+        """Flatten nested metrics into dotted paths, e.g. {'cpu': {'percent': 3}} -> {'cpu.percent': 3}"""
+        flat = {}
+        for key, value in (values or {}).items():
+            path = f"{prefix}{key}"
+            if isinstance(value, dict):
+                flat.update(cls.flatten(value, f"{path}."))
+            else:
+                flat[path] = value
+        return flat
+
+    def snapshot_for(self, computer: Computer) -> Dict[str, Any]:
+        """Build the comparable view of a computer's persisted state"""
+        snapshot = self.flatten(computer.metrics or {})
+        for field in TRACKED_FIELDS:
+            value = getattr(computer, field, None)
+            snapshot[field] = value.isoformat() if isinstance(value, datetime) else value
+        return snapshot
+
+    def prime(self, computer: Computer) -> None:
+        """Seed the baseline from the row as loaded, before a report is applied to it"""
+        if computer.pk is None:
+            return
+        with self._lock:
+            if computer.pk in self._state or not computer.last_metrics_update:
+                return
+            self._state[computer.pk] = {
+                'snapshot': self.snapshot_for(computer),
+                'persisted_at': computer.last_metrics_update,
+                'heartbeat_at': computer.last_seen,
+            }
+
+    def _value_changed(self, path: str, old: Any, new: Any, age: float) -> bool:
+        band = self.bands.get(path)
+        if band is None:
+            return old != new
+        if age >= band.get('max_age', 0):
+            return old != new
+        try:
+            return abs(float(new) - float(old)) > band.get('delta', 0)
+        except (TypeError, ValueError):
+            return old != new
+
+    def should_persist(self, computer: Computer, now: Optional[datetime] = None) -> bool:
+        """Return True if the computer's pending state differs meaningfully from what was last written"""
+        if computer.pk is None:
+            return True
+        now = now or timezone.now()
+        with self._lock:
+            state = self._state.get(computer.pk)
+        if state is None:
+            return True
+
+        age = (now - state['persisted_at']).total_seconds()
+        previous = state['snapshot']
+        current = self.snapshot_for(computer)
+        for path in set(previous) | set(current):
+            if self._value_changed(path, previous.get(path), current.get(path), age):
+                return True
+
+        self._count('suppressed')
+        return False
+
+    def record_persisted(self, computer: Computer, now: Optional[datetime] = None) -> None:
+        """Remember what was just written so later reports are compared against it"""
+        now = now or timezone.now()
+        with self._lock:
+            self._state[computer.pk] = {
+                'snapshot': self.snapshot_for(computer),
+                'persisted_at': now,
+                'heartbeat_at': now,
+            }
+        self._count('persisted')
+
+    def heartbeat(self, computer: Computer, now: Optional[datetime] = None) -> bool:
+        """Update only last_seen for a suppressed report; returns True if a write was issued"""
+        now = now or timezone.now()
+        with self._lock:
+            state = self._state.setdefault(computer.pk, {
+                'snapshot': self.snapshot_for(computer),
+                'persisted_at': now,
+                'heartbeat_at': None,
+            })
+            last_heartbeat = state.get('heartbeat_at')
+            if last_heartbeat and (now - last_heartbeat).total_seconds() < self.heartbeat_interval:
+                due = False
+            else:
+                state['heartbeat_at'] = now
+                due = True
+
+        if not due:
+            self._count('heartbeats_skipped')
+            return False
+
+        # updated_at is left alone so a heartbeat does not show up in ?since= deltas
+        fields = {'last_seen': now}
+        if isinstance(computer.boot_time, datetime) and timezone.is_aware(computer.boot_time):
+            # Keep uptime current for reports whose full write was suppressed
+            fields['system_uptime'] = now - computer.boot_time
+        Computer.objects.filter(pk=computer.pk).update(**fields)
+        self._count('heartbeats')
+        return True
+
+    def forget(self, computer_id: int) -> None:
+        """Drop the baseline for a computer so its next report is written in full"""
+        with self._lock:
+            self._state.pop(computer_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return a copy of the write/suppression counters for this process"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['tracked_computers'] = len(self._state)
+        total = stats['persisted'] + stats['suppressed']
+        stats['suppression_ratio'] = round(stats['suppressed'] / total, 4) if total else 0.0
+        return stats
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+            now = timezone.now()
+            publish = (
+                self._stats_published_at is None or
+                (now - self._stats_published_at).total_seconds() >= self.stats_publish_interval
+            )
+            if publish:
+                self._stats_published_at = now
+        if publish:
+            self.publish_stats()
+
+    def publish_stats(self) -> None:
+        """Share counters through the cache so the API can expose them"""
+        try:
+            stats = self.get_stats()
+            stats['updated_at'] = timezone.now().isoformat()
+            cache.set(INGEST_STATS_CACHE_KEY, stats, None)
+        except Exception as e:
+            logger.warning(f"Could not publish metrics ingest stats: {str(e)}")
+
+
+# Global dead-band filter shared by the ingestion path
+metrics_deadband = MetricsDeadband()
@@ -0,0 +1,157 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from PyPDF2 import PdfReader
+
+from ..models import PdfExtraction
+from ..utils.scans.hashing import sha256_file
+
+logger = logging.getLogger(__name__)
+
+ONET_INDICATORS = [
+    "o*net interest profiler",
+    "o*net interest profile",
+    "o*net profile",
+    "o_net interest profiler",
+    "o_net profile",
+    "o_net interest profile",
+]
+STRENGTHS_INDICATORS = ["strengthsprofile", "strengths profile"]
+
+
+def classify_pdf_text(page1_text: str) -> str:
+    """Classify a document from its first page: 'onet', 'strengths' or 'other'"""
+    page_text = (page1_text or '').lower()
+    if any(indicator in page_text for indicator in ONET_INDICATORS):
+        return 'onet'
+    # Extraction often splits the title, so accept O*NET plus both words anywhere
+    if any(indicator in page_text for indicator in ("o*net", "o_net")) and "interest" in page_text and "profiler" in page_text:
+        return 'onet'
+    if any(indicator in page_text for indicator in STRENGTHS_INDICATORS):
+        return 'strengths'
+    return 'other'
+
+
+def read_pdf_pages(file_path: str) -> Tuple[List[str], str]:
+    """Parse a PDF into per-page text; returns (pages, error). Safe to run in a worker process."""
+    try:
+        reader = PdfReader(file_path)
+        return [page.extract_text() or '' for page in reader.pages], ''
+    except Exception as e:
+        logger.warning(f"Could not parse PDF {file_path}: {str(e)}")
+        return [], str(e)
+
+
+@dataclass(frozen=True)
+class ExtractedPdf:
+    content_hash: str
+    page_count: int
+    page1_text: str
+    full_text: str
+    classification: str
+    error: str = ''
+
+
+class PdfExtractionCache:
+    """
+    Parse each PDF at most once. Results are kept in an in-memory LRU keyed by
+    (path, size, mtime) and persisted by content hash, so a copy of a file or a
+    restarted worker does not parse it again either.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or getattr(settings, 'PDF_EXTRACTION_CACHE_SIZE', 512)
+        self._entries: 'OrderedDict[Tuple[str, int, int], ExtractedPdf]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.parsed = 0
+
+    @staticmethod
+    def _key(file_path: str) -> Tuple[str, int, int]:
+        st = os.stat(file_path)
+        return (os.path.normcase(os.path.abspath(file_path)), st.st_size, st.st_mtime_ns)
+
+    def _remember(self, key, extracted: ExtractedPdf) -> None:
+        with self._lock:
+            self._entries[key] = extracted
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _recall(self, key) -> Optional[ExtractedPdf]:
+        with self._lock:
+            extracted = self._entries.get(key)
+            if extracted is not None:
+                self._entries.move_to_end(key)
+            return extracted
+
+    def lookup(self, file_path: str, content_hash: str) -> Optional[ExtractedPdf]:
+        """Cached extraction for a file, from memory or the database, without parsing it"""
+        key = self._key(file_path)
+        extracted = self._recall(key)
+        if extracted is not None:
+            return extracted
+
+        stored = PdfExtraction.objects.filter(content_hash=content_hash).first()
+        if stored is None:
+            return None
+        extracted = ExtractedPdf(
+            content_hash=content_hash,
+            page_count=stored.page_count,
+            page1_text=stored.page1_text,
+            full_text=stored.full_text,
+            classification=stored.classification,
+            error=stored.error,
+        )
+        self._remember(key, extracted)
+        return extracted
+
+    def store(self, file_path: str, content_hash: str, pages: List[str], error: str = '') -> ExtractedPdf:
+        """Save the result of read_pdf_pages; pages may come from another process"""
+        self.parsed += 1
+        page1_text = pages[0] if pages else ''
+        extracted = ExtractedPdf(
+            content_hash=content_hash,
+            page_count=len(pages),
+            page1_text=page1_text,
+            full_text=''.join(pages),
+            # Remember broken files too, so they are not retried on every scan
+            classification='unreadable' if error else classify_pdf_text(page1_text),
+            error=error,
+        )
+        PdfExtraction.objects.get_or_create(content_hash=content_hash, defaults={
+            'page_count': extracted.page_count,
+            'page1_text': extracted.page1_text,
+            'full_text': extracted.full_text,
+            'classification': extracted.classification,
+            'error': extracted.error,
+        })
+        self._remember(self._key(file_path), extracted)
+        return extracted
+
+    def get(self, file_path: str, content_hash: Optional[str] = None) -> ExtractedPdf:
+        """
+        Text and classification for a PDF; raises OSError if the file cannot be read.
+        Pass content_hash when the caller has already hashed the file.
+        """
+        # An unchanged file is answered from memory by a stat, without reading it
+        extracted = self._recall(self._key(file_path))
+        if extracted is not None:
+            return extracted
+        content_hash = content_hash or sha256_file(file_path)
+        extracted = self.lookup(file_path, content_hash)
+        if extracted is None:
+            extracted = self.store(file_path, content_hash, *read_pdf_pages(file_path))
+        return extracted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Global cache shared by the PDF classifiers and name extractors
+pdf_extraction = PdfExtractionCache()
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import sys
+import time
+from typing import Dict, Iterable, Optional, Sequence
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import Computer, SystemLog
+
+logger = logging.getLogger(__name__)
+
+# SMB and WinRM; a lab machine that answers on either is up
+DEFAULT_PROBE_PORTS = (445, 5985)
+
+
+class ReachabilitySweeper:
+    """
+    Probe many hosts concurrently with TCP connects (and optionally ICMP ping)
+    under a single concurrency limit, so a sweep takes about one timeout window.
+    """
+
+    def __init__(self, ports: Optional[Sequence[int]] = None, timeout: Optional[float] = None,
+                 concurrency: Optional[int] = None, icmp_fallback: Optional[bool] = None):
+        self.ports = tuple(ports or getattr(settings, 'REACHABILITY_PORTS', DEFAULT_PROBE_PORTS))
+        self.timeout = timeout or getattr(settings, 'REACHABILITY_TIMEOUT', 1.0)
+        self.concurrency = concurrency or getattr(settings, 'REACHABILITY_CONCURRENCY', 256)
+        self.icmp_fallback = (
+            icmp_fallback if icmp_fallback is not None
+            else getattr(settings, 'REACHABILITY_ICMP_FALLBACK', False)
+        )
+
+    async def _connect(self, host: str, port: int) -> float:
+        started = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.timeout)
+        except ConnectionRefusedError:
+            # A reset still proves the host is up
+            return (time.perf_counter() - started) * 1000
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+        return (time.perf_counter() - started) * 1000
+
+    async def _ping(self, host: str) -> Optional[float]:
+        """ICMP echo via the system ping; only used where raw ICMP is not available to us"""
+        if sys.platform == 'win32':
+            args = ['ping', '-n', '1', '-w', str(int(self.timeout * 1000)), host]
+        else:
+            args = ['ping', '-c', '1', '-W', str(max(1, int(round(self.timeout)))), host]
+        started = time.perf_counter()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *args, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+            )
+            code = await asyncio.wait_for(process.wait(), self.timeout + 1)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        return (time.perf_counter() - started) * 1000 if code == 0 else None
+
+    async def probe(self, host: str) -> Optional[float]:
+        """Return the first successful connect latency in ms, or None if the host is unreachable"""
+        attempts = [asyncio.ensure_future(self._connect(host, port)) for port in self.ports]
+        latency = None
+        try:
+            for attempt in asyncio.as_completed(attempts):
+                try:
+                    latency = await attempt
+                    break
+                except (OSError, asyncio.TimeoutError):
+                    continue
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+        if latency is None and self.icmp_fallback:
+            latency = await self._ping(host)
+        return round(latency, 2) if latency is not None else None
+
+    async def sweep(self, hosts: Iterable[str]) -> Dict[str, Optional[float]]:
+        """Probe every host, at most `concurrency` at a time"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        hosts = list(dict.fromkeys(hosts))
+
+        async def bounded(host):
+            async with semaphore:
+                return await self.probe(host)
+
+        latencies = await asyncio.gather(*(bounded(host) for host in hosts))
+        return dict(zip(hosts, latencies))
+
+    def sweep_fleet(self, queryset=None) -> Dict[str, int]:
+        """
+        Probe every computer with an IP address and write back only what changed:
+        offline hosts that start answering, and answering hosts without an agent
+        whose last_seen would otherwise go stale. Online status follows last_seen,
+        so a host that stops answering is left to age out until mark_offline
+        reports it. Returns online/offline/changed counts.
+        """
+        from .status_events import reported_since, status_tracker
+
+        computers = list(
+            (queryset if queryset is not None else Computer.active.all())
+            .exclude(ip_address__isnull=True)
+            .values('id', 'ip_address', 'last_seen', 'last_metrics_update')
+        )
+        if not computers:
+            return {'probed': 0, 'online': 0, 'offline': 0, 'changed': 0}
+
+        started = time.perf_counter()
+        latencies = asyncio.run(self.sweep(c['ip_address'] for c in computers))
+        elapsed = time.perf_counter() - started
+
+        now = timezone.now()
+        offline_cutoff = now - status_tracker.offline_threshold
+        # Agentless hosts refresh last_seen well before mark_offline would report them
+        refresh_cutoff = now - status_tracker.offline_threshold / 2
+        came_online, refreshed = {}, {}
+        for computer in computers:
+            latency = latencies.get(computer['ip_address'])
+            if latency is None:
+                continue
+            last_seen = computer['last_seen']
+            if not reported_since(offline_cutoff, last_seen, computer['last_metrics_update']):
+                came_online[computer['id']] = latency
+            elif last_seen is None or last_seen < refresh_cutoff:
+                refreshed[computer['id']] = latency
+
+        if refreshed:
+            rows = list(Computer.objects.filter(id__in=refreshed).only('id', 'last_seen', 'probe_latency_ms',
+                                                                      'last_probed_at', 'updated_at'))
+            for computer in rows:
+                computer.probe_latency_ms = refreshed[computer.id]
+                # last_seen == last_probed_at marks the sighting as coming from a probe
+                computer.last_seen = computer.last_probed_at = now
+                # bulk_update bypasses auto_now
+                computer.updated_at = now
+            Computer.objects.bulk_update(rows, ['probe_latency_ms', 'last_probed_at', 'last_seen', 'updated_at'],
+                                         batch_size=500)
+
+        online_rows = []
+        if came_online:
+            events = []
+            for computer in Computer.objects.filter(id__in=came_online):
+                status_tracker.prime(computer)
+                computer.probe_latency_ms = came_online[computer.id]
+                computer.last_seen = computer.last_probed_at = now
+                computer.updated_at = now
+                events.extend(status_tracker.observe(computer, now))
+                online_rows.append(computer)
+            Computer.objects.bulk_update(
+                online_rows, ['probe_latency_ms', 'last_probed_at', 'last_seen', 'updated_at'], batch_size=500
+            )
+            SystemLog.objects.bulk_create(events)
+
+        online_count = sum(1 for latency in latencies.values() if latency is not None)
+        logger.info(
+            f"Reachability sweep of {len(computers)} computers took {elapsed:.2f}s: "
+            f"{online_count} online, {len(online_rows)} changed, {len(refreshed)} refreshed"
+        )
+        self._publish(online_rows)
+        return {
+            'probed': len(computers),
+            'online': online_count,
+            'offline': len(latencies) - online_count,
+            'changed': len(online_rows),
+            'seconds': round(elapsed, 2),
+        }
+
+    @staticmethod
+    def _publish(online_rows) -> None:
+        if not online_rows:
+            return
+        from .fleet_stream import fleet_publisher
+        from .fleet_summary import fleet_summary
+        for computer in online_rows:
+            fleet_publisher.publish_fields(computer.id, {'status': 'online'})
+            fleet_summary.apply(computer)
+
+# Global sweeper used by the management command and the periodic task
+reachability_sweeper = ReachabilitySweeper()
@@ -0,0 +1,215 @@
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Commands that must be run through an elevated PowerShell wrapper
+ELEVATED_COMMANDS = ('net user', 'net localgroup', 'net group')
+
+
+def needs_elevation(command: str) -> bool:
+    return any(cmd in command.lower() for cmd in ELEVATED_COMMANDS)
+
+
+def build_elevated_script(command: str) -> str:
+    """Wrap a cmd.exe command in a PowerShell script that runs it elevated and returns its output"""
+    return f'''
+    $outputFile = "$env:TEMP\\cmd_output.txt"
+    try {{
+        # Run command with elevation and redirect output
+        $pinfo = New-Object System.Diagnostics.ProcessStartInfo
+        $pinfo.FileName = "cmd.exe"
+        $pinfo.Arguments = "/c {command} > `"$outputFile`""
+        $pinfo.Verb = "runas"
+        $pinfo.WindowStyle = "Hidden"
+        $pinfo.UseShellExecute = $true
+
+        # Start the process and wait
+        $p = [System.Diagnostics.Process]::Start($pinfo)
+        $p.WaitForExit()
+
+        # Read and return the output
+        if (Test-Path $outputFile) {{
+            $output = Get-Content -Path $outputFile -Raw
+            Remove-Item -Path $outputFile -Force
+            Write-Output $output
+        }} else {{
+            Write-Output "Command executed but produced no output"
+        }}
+    }} catch {{
+        Write-Error "Failed to execute elevated command: $_"
+    }} finally {{
+        if (Test-Path $outputFile) {{
+            Remove-Item -Path $outputFile -Force -ErrorAction SilentlyContinue
+        }}
+    }}
+    '''
+
+
+class WinRMTransport:
+    """pywinrm-backed transport"""
+
+    def __init__(self, username='infotech', password=None, operation_timeout=60, read_timeout=70):
+        self.username = username
+        self.password = password if password is not None else getattr(settings, 'INFOTECH_PASSWORD', None)
+        self.operation_timeout = operation_timeout
+        self.read_timeout = read_timeout
+
+    def open(self, host: str):
+        import winrm
+        return winrm.Session(
+            host,
+            auth=(self.username, self.password),
+            transport='basic',
+            server_cert_validation='ignore',
+            message_encryption='never',
+            operation_timeout_sec=self.operation_timeout,
+            read_timeout_sec=self.read_timeout
+        )
+
+    def run(self, session, command: str, powershell: bool) -> Tuple[int, str, str]:
+        result = session.run_ps(command) if powershell else session.run_cmd(command)
+        return (
+            result.status_code,
+            result.std_out.decode('utf-8', errors='replace'),
+            result.std_err.decode('utf-8', errors='replace'),
+        )
+
+
+class FakeWinRMTransport:
+    """
+    Offline stand-in for WinRMTransport: sleeps for a configurable latency and
+    returns canned output, so the engine can be exercised without a lab.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, failing_hosts=(), outputs=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failing_hosts = set(failing_hosts)
+        self.outputs = outputs or {}
+        self.sessions_opened = 0
+        self._lock = threading.Lock()
+
+    def open(self, host: str):
+        with self._lock:
+            self.sessions_opened += 1
+        return {'host': host}
+
+    def run(self, session, command: str, powershell: bool) -> Tuple[int, str, str]:
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        host = session['host']
+        if host in self.failing_hosts:
+            raise ConnectionError(f"{host} refused the connection")
+        return 0, self.outputs.get(command, f"{host}: {command}"), ''
+
+
+class RemoteExecEngine:
+    """
+    Run commands on lab machines over WinRM from a shared thread pool.
+    Sessions are cached per host, a global worker cap bounds concurrency and
+    each host runs one command at a time.
+    """
+
+    def __init__(self, transport=None, max_workers=None, timeout=None, session_ttl=None):
+        self.transport = transport or self._default_transport()
+        self.max_workers = max_workers or getattr(settings, 'REMOTE_EXEC_MAX_WORKERS', 16)
+        self.timeout = timeout or getattr(settings, 'REMOTE_EXEC_TIMEOUT', 75)
+        self.session_ttl = session_ttl or getattr(settings, 'REMOTE_EXEC_SESSION_TTL', 600)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='remote-exec')
+        self._sessions = {}  # host -> (session, opened_at)
+        self._sessions_lock = threading.Lock()
+        self._host_locks = defaultdict(threading.Lock)
+
+    @staticmethod
+    def _default_transport():
+        if getattr(settings, 'REMOTE_EXEC_TRANSPORT', 'winrm') == 'fake':
+            return FakeWinRMTransport()
+        return WinRMTransport()
+
+    def _session(self, host: str):
+        now = time.monotonic()
+        with self._sessions_lock:
+            cached = self._sessions.get(host)
+            if cached and now - cached[1] < self.session_ttl:
+                return cached[0]
+        session = self.transport.open(host)
+        with self._sessions_lock:
+            self._sessions[host] = (session, now)
+        return session
+
+    def _drop_session(self, host: str) -> None:
+        with self._sessions_lock:
+            self._sessions.pop(host, None)
+
+    def _execute(self, host: str, command: str, powershell: bool, timeout: float,
+                 raise_errors: bool = False) -> Dict[str, Any]:
+        started = time.monotonic()
+        result = {'host': host, 'command': command, 'status_code': None, 'output': '', 'error': None}
+
+        lock = self._host_locks[host]
+        if not lock.acquire(timeout=timeout):
+            result['error'] = 'Timed out waiting for another command on this host'
+            result['duration'] = round(time.monotonic() - started, 3)
+            return result
+        try:
+            session = self._session(host)
+            status_code, output, error = self.transport.run(session, command, powershell)
+            result.update(status_code=status_code, output=output, error=error or None)
+        except Exception as e:
+            # A broken session is not reused
+            self._drop_session(host)
+            if raise_errors:
+                raise
+            logger.warning(f"Remote command on {host} failed: {str(e)}")
+            result['error'] = str(e)
+            result['exception'] = type(e).__name__
+        finally:
+            lock.release()
+        result['duration'] = round(time.monotonic() - started, 3)
+        return result
+
+    def run(self, host: str, command: str, powershell: bool = False, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run one command on one host and wait for its result; transport errors are re-raised"""
+        timeout = timeout or self.timeout
+        future = self._executor.submit(self._execute, host, command, powershell, timeout, True)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return {'host': host, 'command': command, 'status_code': None, 'output': '',
+                    'error': f'Timed out after {timeout}s', 'duration': timeout}
+
+    def run_fleet(self, hosts: Iterable[str], command: str, powershell: bool = False,
+                  timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Run one command on many hosts, yielding each result as soon as it completes"""
+        timeout = timeout or self.timeout
+        futures = {
+            self._executor.submit(self._execute, host, command, powershell, timeout): host
+            for host in dict.fromkeys(hosts)
+        }
+        deadline = time.monotonic() + timeout * max(1, len(futures) / self.max_workers)
+        pending = set(futures)
+        try:
+            for future in as_completed(futures, timeout=max(0.0, deadline - time.monotonic())):
+                pending.discard(future)
+                yield future.result()
+        except FutureTimeoutError:
+            for future in pending:
+                future.cancel()
+                yield {'host': futures[future], 'command': command, 'status_code': None, 'output': '',
+                       'error': 'Timed out waiting for a worker', 'duration': None}
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._sessions_lock:
+            self._sessions.clear()
+
+
+# Global engine shared by the API
+remote_exec = RemoteExecEngine()
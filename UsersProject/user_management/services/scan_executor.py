@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ScanExecutor:
+    """
+    Scan several computers at once on a bounded worker pool.
+    Each host gets its own timeout and its failures stay with it; progress
+    callbacks all run on the calling thread, one at a time, in completion order.
+    Once should_continue turns false, hosts not yet started are cancelled and
+    running ones get drain_timeout seconds to wind down before being given up on.
+    A host that is given up on has its own stop flag raised, which scan_host
+    sees through the host_continue callable it is passed.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, host_timeout: Optional[float] = None,
+                 drain_timeout: Optional[float] = None):
+        self.max_workers = max_workers or getattr(settings, 'SCAN_MAX_PARALLEL_HOSTS', 8)
+        self.host_timeout = host_timeout or getattr(settings, 'SCAN_HOST_TIMEOUT', 900)
+        self.drain_timeout = drain_timeout if drain_timeout is not None else getattr(settings, 'SCAN_CANCEL_DRAIN_SECONDS', 60)
+
+    def run(self, computers: Sequence[Any], scan_host: Callable[[Any, Callable[[], bool]], bool],
+            on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+            should_continue: Optional[Callable[[], bool]] = None) -> List[Dict[str, Any]]:
+        """
+        Run scan_host(computer, host_continue) for every computer and return one result
+        per computer, in input order: {'computer', 'label', 'success', 'error', 'duration'}.
+        host_continue() turns false once the host times out or is given up on.
+        """
+        total = len(computers)
+        results: List[Optional[Dict[str, Any]]] = [None] * total
+        if not total:
+            return []
+
+        started_at: Dict[int, float] = {}
+        started_lock = threading.Lock()
+        stop = [threading.Event() for _ in range(total)]
+
+        def scan_one(index, computer):
+            with started_lock:
+                started_at[index] = time.monotonic()
+            return scan_host(computer, lambda: not stop[index].is_set())
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, total), thread_name_prefix='scan-host')
+        futures = {executor.submit(scan_one, index, computer): index for index, computer in enumerate(computers)}
+        pending = set(futures)
+        completed = 0
+        drain_deadline = None
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+                finished = []
+                for future in done:
+                    index = futures[future]
+                    try:
+                        success, error = bool(future.result()), None
+                    except Exception as e:
+                        success, error = False, str(e)
+                    finished.append((index, success, error))
+
+                # Hosts that have been running too long are given up on; their thread
+                # sees its stop flag at the next file and unwinds on its own
+                now = time.monotonic()
+                for future in list(pending):
+                    index = futures[future]
+                    with started_lock:
+                        began = started_at.get(index)
+                    if began is not None and now - began > self.host_timeout:
+                        pending.discard(future)
+                        future.cancel()
+                        stop[index].set()
+                        finished.append((index, False, f'Timed out after {self.host_timeout}s'))
+
+                if drain_deadline is None and should_continue is not None and not should_continue():
+                    drain_deadline = now + self.drain_timeout
+                if drain_deadline is not None:
+                    for future in list(pending):
+                        # Queued hosts are dropped at once, running ones once the drain time is up
+                        if future.cancel() or now > drain_deadline:
+                            pending.discard(future)
+                            stop[futures[future]].set()
+                            finished.append((futures[future], False, 'Cancelled'))
+
+                for index, success, error in finished:
+                    computer = computers[index]
+                    with started_lock:
+                        began = started_at.get(index)
+                    completed += 1
+                    result = {
+                        'computer': computer,
+                        'label': getattr(computer, 'label', None) or getattr(computer, 'ip_address', str(computer)),
+                        'success': success,
+                        'error': error,
+                        'duration': round(time.monotonic() - began, 2) if began is not None else 0.0,
+                    }
+                    results[index] = result
+                    if on_progress is not None:
+                        try:
+                            on_progress({**result, 'completed': completed, 'total': total})
+                        except Exception as e:
+                            logger.error(f"Scan progress callback failed: {str(e)}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return [result for result in results if result is not None]
@@ -0,0 +1,377 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from ..models import ScanJob, ScanJobHost, ScanSchedule
+
+logger = logging.getLogger(__name__)
+
+# Jobs in these states keep scanning; 'cancelling' ones are draining
+RUNNABLE_STATUSES = ('queued', 'running')
+
+
+class ScanJobProgress:
+    """
+    Collects per-host progress for one running job in memory and writes it in
+    batches: one bulk_update for the host rows and one counter update for the job.
+    Every flush also refreshes the job's heartbeat, which is how a crashed job is told
+    apart from a slow one.
+    """
+
+    def __init__(self, job: ScanJob, flush_every: Optional[int] = None, flush_interval: Optional[float] = None,
+                 computer_id: Optional[int] = None):
+        self.job = job
+        self.flush_every = flush_every or getattr(settings, 'SCAN_PROGRESS_FLUSH_EVERY', 10)
+        self.flush_interval = flush_interval or getattr(settings, 'SCAN_PROGRESS_FLUSH_SECONDS', 5.0)
+        # A worker scanning a single host only tracks that host's row
+        hosts = job.hosts.all() if computer_id is None else job.hosts.filter(computer_id=computer_id)
+        self.hosts = {host.computer_id: host for host in hosts}
+        self._dirty = set()
+        # Hosts already settled; late reports from a timed-out host's thread are dropped
+        self._finished = set()
+        self._job_deltas: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._cancelled = False
+        self._last_cancel_check = 0.0
+
+    def host_started(self, computer_id: int) -> None:
+        with self._lock:
+            if computer_id in self._finished:
+                return
+            host = self.hosts[computer_id]
+            host.status = 'running'
+            host.started_at = timezone.now()
+            self._dirty.add(computer_id)
+
+    def host_files(self, computer_id: int, counts: Dict[str, int], outcomes: Iterable[Dict[str, Any]],
+                   stage_metrics: Optional[Dict[str, Any]] = None, transfers: Iterable = ()) -> None:
+        """Record what the pipeline did with one host's files and what its copies moved"""
+        statuses = [outcome['status'] for outcome in outcomes]
+        transfers = list(transfers)
+        with self._lock:
+            if computer_id in self._finished:
+                return
+            host = self.hosts[computer_id]
+            host.files_seen = sum(counts.values())
+            host.files_new = counts.get('new', 0)
+            host.files_changed = counts.get('changed', 0)
+            host.files_copied = statuses.count('copied')
+            host.files_duplicate = statuses.count('duplicate')
+            host.files_failed = statuses.count('failed')
+            host.bytes_copied = sum(transfer.bytes for transfer in transfers if transfer.ok)
+            host.copy_seconds = round(sum(transfer.seconds for transfer in transfers), 3)
+            host.stage_metrics = stage_metrics or {}
+            self._add('files_seen', host.files_seen)
+            self._add('bytes_copied', host.bytes_copied)
+            self._add('files_processed', len(statuses))
+            self._add('files_copied', host.files_copied)
+            self._dirty.add(computer_id)
+
+    def host_checkpoint(self, computer_id: int, files: int) -> None:
+        """Note that a batch of the host's files is safely in the manifest"""
+        with self._lock:
+            if computer_id in self._finished:
+                return
+            host = self.hosts[computer_id]
+            host.files_checkpointed += files
+            host.checkpoint_at = timezone.now()
+            self._dirty.add(computer_id)
+
+    def host_finished(self, computer_id: int, success: bool, error: Optional[str] = None,
+                      duration: Optional[float] = None) -> None:
+        with self._lock:
+            if computer_id in self._finished:
+                return
+            self._finished.add(computer_id)
+            host = self.hosts[computer_id]
+            host.status = 'completed' if success else ('cancelled' if error == 'Cancelled' else 'failed')
+            host.error = error or ''
+            host.duration = duration
+            host.finished_at = timezone.now()
+            self._add('computers_scanned' if success else 'computers_failed', 1)
+            self._dirty.add(computer_id)
+        self.flush()
+
+    def _add(self, field: str, amount: int) -> None:
+        self._job_deltas[field] = self._job_deltas.get(field, 0) + amount
+
+    def flush(self, force: bool = False) -> None:
+        """Write buffered changes and the heartbeat once enough have piled up or enough time has passed"""
+        with self._lock:
+            due = (force or len(self._dirty) >= self.flush_every
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+            if not due:
+                return
+            hosts = [self.hosts[computer_id] for computer_id in self._dirty]
+            deltas = {field: F(field) + amount for field, amount in self._job_deltas.items() if amount}
+            self._dirty.clear()
+            self._job_deltas.clear()
+            self._last_flush = time.monotonic()
+
+            if hosts:
+                ScanJobHost.objects.bulk_update(hosts, [
+                    'status', 'files_seen', 'files_new', 'files_changed', 'files_copied', 'files_duplicate',
+                    'files_failed', 'files_checkpointed', 'bytes_copied', 'copy_seconds', 'started_at', 'checkpoint_at', 'finished_at',
+                    'duration', 'error', 'stage_metrics',
+                ])
+            ScanJob.objects.filter(pk=self.job.pk).update(heartbeat_at=timezone.now(), **deltas)
+
+    def should_continue(self) -> bool:
+        """Flush if due and report whether the job is still wanted; safe to call often"""
+        self.flush()
+        now = time.monotonic()
+        if not self._cancelled and now - self._last_cancel_check >= 2.0:
+            self._last_cancel_check = now
+            self._cancelled = not ScanJob.objects.filter(pk=self.job.pk, status__in=RUNNABLE_STATUSES).exists()
+        return not self._cancelled
+
+    def finish(self, error: Optional[str] = None) -> None:
+        self.flush(force=True)
+        scan_jobs.close(self.job.pk, error)
+
+
+class ScanJobService:
+    """Create scan jobs and read their progress for the API"""
+
+    def stale_before(self):
+        return timezone.now() - timezone.timedelta(seconds=getattr(settings, 'SCAN_JOB_STALE_SECONDS', 300))
+
+    def host_dead_before(self):
+        """
+        A running host with no activity since this time cannot still have a live
+        task: host tasks are killed at SCAN_HOST_TIMEOUT plus the drain time
+        """
+        limit = getattr(settings, 'SCAN_HOST_TIMEOUT', 900) + getattr(settings, 'SCAN_CANCEL_DRAIN_SECONDS', 60)
+        return timezone.now() - timezone.timedelta(seconds=limit)
+
+    def live_hosts(self):
+        """Running hosts whose task may still be alive"""
+        cutoff = self.host_dead_before()
+        return ScanJobHost.objects.filter(status='running').filter(
+            Q(started_at__gte=cutoff) | Q(checkpoint_at__gte=cutoff)
+        )
+
+    def active(self) -> Optional[ScanJob]:
+        """The job currently scanning; jobs whose worker stopped sending heartbeats don't count"""
+        return ScanJob.objects.filter(status__in=ScanJob.ACTIVE_STATUSES, heartbeat_at__gte=self.stale_before()).first()
+
+    def orphaned(self):
+        """Jobs left active by a worker that died: no heartbeat lately and no host that may still be scanning"""
+        return ScanJob.objects.filter(
+            status__in=ScanJob.ACTIVE_STATUSES, heartbeat_at__lt=self.stale_before()
+        ).exclude(Exists(self.live_hosts().filter(job_id=OuterRef('pk'))))
+
+    def create(self, computers, trigger: str = 'manual', schedule=None, user=None) -> ScanJob:
+        computers = list(computers)
+        job = ScanJob.objects.create(
+            trigger=trigger,
+            schedule=schedule,
+            created_by=user if getattr(user, 'is_authenticated', False) else None,
+            total_computers=len(computers),
+            heartbeat_at=timezone.now(),
+        )
+        ScanJobHost.objects.bulk_create([
+            ScanJobHost(job=job, computer=computer, label=getattr(computer, 'label', None) or computer.ip_address)
+            for computer in computers
+        ])
+        return job
+
+    def start(self, job: ScanJob) -> ScanJobProgress:
+        now = timezone.now()
+        job.status = 'running'
+        job.started_at = job.started_at or now
+        job.heartbeat_at = now
+        job.attempts += 1
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at', 'attempts'])
+        return ScanJobProgress(job)
+
+    def claim_host(self, job_id: int, computer_id: int) -> Optional[ScanJobProgress]:
+        """
+        Take one pending host of a job for this worker. Returns None if the job
+        was stopped or another worker already has the host.
+        """
+        job = ScanJob.objects.filter(pk=job_id, status__in=RUNNABLE_STATUSES).first()
+        if job is None:
+            ScanJobHost.objects.filter(job_id=job_id, computer_id=computer_id, status='pending').update(status='cancelled')
+            return None
+        now = timezone.now()
+        claimed = ScanJobHost.objects.filter(job_id=job_id, computer_id=computer_id, status='pending').update(
+            status='running', started_at=now
+        )
+        if not claimed:
+            return None
+        # Host tasks may sit in the broker for a while; starting one shows the job is alive
+        ScanJob.objects.filter(pk=job_id).update(heartbeat_at=now)
+        return ScanJobProgress(job, computer_id=computer_id)
+
+    def close(self, job_id: int, error: Optional[str] = None) -> Optional[ScanJob]:
+        """Settle a finished job's status and record the outcome on the schedule that queued it"""
+        now = timezone.now()
+        ScanJobHost.objects.filter(job_id=job_id, status__in=('pending', 'running')).update(status='cancelled')
+        # A job stopped from another worker ends up cancelled, and can be resumed later
+        ScanJob.objects.filter(pk=job_id, status='cancelling').update(status='cancelled', finished_at=now)
+        ScanJob.objects.filter(pk=job_id, status__in=RUNNABLE_STATUSES).update(
+            status='failed' if error else 'completed', finished_at=now, error=error or ''
+        )
+        job = ScanJob.objects.filter(pk=job_id).first()
+        if job is not None and job.schedule_id:
+            outcome = job.status
+            if job.status == 'completed':
+                outcome = 'partial' if job.computers_failed else 'success'
+            ScanSchedule.objects.filter(pk=job.schedule_id).update(last_status=outcome)
+        return job
+
+    def cancel(self, job_id: Optional[int] = None) -> int:
+        """
+        Stop the given (or every) active job. Queued jobs are cancelled outright;
+        running ones go to 'cancelling' and drain within SCAN_CANCEL_DRAIN_SECONDS.
+        """
+        jobs = ScanJob.objects.all() if job_id is None else ScanJob.objects.filter(pk=job_id)
+        cancelled = jobs.filter(status='queued').update(status='cancelled', finished_at=timezone.now())
+        return cancelled + jobs.filter(status='running').update(status='cancelling')
+
+    def resume(self, job_id: int) -> Optional[ScanJob]:
+        """
+        Requeue a cancelled, failed or orphaned job. Completed hosts are kept, and
+        so are running hosts whose task may still be alive; the rest start over,
+        skipping files their last run already checkpointed.
+        """
+        with transaction.atomic():
+            job = ScanJob.objects.select_for_update().filter(pk=job_id).first()
+            if job is None:
+                return None
+            orphaned = job.status in ScanJob.ACTIVE_STATUSES and self.orphaned().filter(pk=job_id).exists()
+            if job.status not in ScanJob.RESUMABLE_STATUSES and not orphaned:
+                return None
+
+            live = list(self.live_hosts().filter(job_id=job_id).values_list('id', flat=True))
+            job.hosts.exclude(status='completed').exclude(id__in=live).update(
+                status='pending', error='', finished_at=None, duration=None,
+                files_seen=0, files_new=0, files_changed=0, files_copied=0, files_duplicate=0, files_failed=0,
+                bytes_copied=0, copy_seconds=0,
+            )
+            done = job.hosts.filter(status='completed').aggregate(
+                computers=Count('id'), seen=Sum('files_seen'), copied=Sum('files_copied'), bytes=Sum('bytes_copied'),
+                processed=Sum(F('files_copied') + F('files_duplicate') + F('files_failed')),
+            )
+            job.status = 'queued'
+            job.finished_at = None
+            job.error = ''
+            job.heartbeat_at = timezone.now()
+            job.computers_scanned = done['computers']
+            job.computers_failed = 0
+            job.files_seen = done['seen'] or 0
+            job.files_copied = done['copied'] or 0
+            job.files_processed = done['processed'] or 0
+            job.bytes_copied = done['bytes'] or 0
+            job.save()
+        logger.info(f"Requeued scan job {job.id}; {done['computers']} of {job.total_computers} computers already done")
+        return job
+
+    def recover_orphans(self) -> List[ScanJob]:
+        """
+        Requeue jobs whose worker died mid-scan. Ones that were being cancelled
+        are closed as cancelled instead.
+        """
+        orphans = list(self.orphaned())
+        resumed = []
+        for job in orphans:
+            if job.status == 'cancelling':
+                ScanJob.objects.filter(pk=job.pk, status='cancelling').update(status='cancelled', finished_at=timezone.now())
+                ScanJobHost.objects.filter(job_id=job.pk, status__in=('pending', 'running')).update(status='cancelled')
+                continue
+            job = self.resume(job.pk)
+            if job is not None:
+                resumed.append(job)
+        return resumed
+
+    def fail(self, job_id: int, error: str) -> None:
+        """Close a job that could not be run at all"""
+        ScanJobHost.objects.filter(job_id=job_id, status__in=('pending', 'running')).update(status='failed', error=error)
+        ScanJob.objects.filter(pk=job_id, status__in=ScanJob.ACTIVE_STATUSES).update(
+            status='failed', finished_at=timezone.now(), error=error
+        )
+        self.close(job_id, error)
+
+    def status_payload(self, job_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Progress of a job (the latest by default) in the shape the scan page
+        expects, read with a single query
+        """
+        job_filter = job_id if job_id is not None else Subquery(ScanJob.objects.order_by('-created_at').values('id')[:1])
+        hosts = list(ScanJobHost.objects.select_related('job').filter(job_id=job_filter).order_by('id'))
+        if not hosts:
+            return {"status": "idle", "message": "No scan in progress", "scanning": False}
+
+        job = hosts[0].job
+        job_info = {
+            'id': job.id,
+            'status': job.status,
+            'trigger': job.trigger,
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at,
+            'heartbeat_at': job.heartbeat_at,
+            'attempts': job.attempts,
+            'total_computers': job.total_computers,
+            'computers_scanned': job.computers_scanned,
+            'computers_failed': job.computers_failed,
+            'files_seen': job.files_seen,
+            'files_processed': job.files_processed,
+            'files_copied': job.files_copied,
+            'bytes_copied': job.bytes_copied,
+            'error': job.error,
+            'hosts': [{
+                'computer_id': host.computer_id,
+                'label': host.label,
+                'status': host.status,
+                'files_seen': host.files_seen,
+                'files_copied': host.files_copied,
+                'files_duplicate': host.files_duplicate,
+                'files_failed': host.files_failed,
+                'files_checkpointed': host.files_checkpointed,
+                'bytes_copied': host.bytes_copied,
+                'copy_mb_per_second': round(host.bytes_copied / 1048576 / host.copy_seconds, 2) if host.copy_seconds else None,
+                'duration': host.duration,
+                'error': host.error,
+            } for host in hosts],
+        }
+        if job.status not in ScanJob.ACTIVE_STATUSES:
+            return {"status": "idle", "message": "No scan in progress", "scanning": False, "last_job": job_info}
+
+        done = job.computers_scanned + job.computers_failed
+        estimated_completion = None
+        if done and job.started_at:
+            elapsed = (timezone.now() - job.started_at).total_seconds()
+            estimated_completion = (timezone.now() + timezone.timedelta(seconds=elapsed / done * (job.total_computers - done))).isoformat()
+
+        return {
+            "status": "running",
+            "message": "Scan stopping" if job.status == 'cancelling' else "Scan in progress",
+            "scanning": True,
+            "stats": {
+                'processed_pdfs': job.files_copied,
+                'computers_scanned': job.computers_scanned,
+                'total_computers': job.total_computers,
+                'start_time': job.started_at or job.created_at,
+                'estimated_completion': estimated_completion,
+                'per_computer_progress': {
+                    host.label: 100 if host.status in ('completed', 'failed', 'cancelled') else 0 for host in hosts
+                },
+                'failed_computers': [host.label for host in hosts if host.status == 'failed'],
+                'retry_attempts': {},
+            },
+            "queue_length": sum(1 for host in hosts if host.status == 'pending'),
+            "job": job_info,
+        }
+
+
+# Global scan job service used by the scan views and scheduled tasks
+scan_jobs = ScanJobService()
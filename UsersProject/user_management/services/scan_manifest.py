@@ -0,0 +1,110 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from django.utils import timezone
+
+from ..models import FileManifestEntry
+from ..utils.scans.hashing import sha256_file
+
+logger = logging.getLogger(__name__)
+
+# Copies on SMB shares can shift mtime by up to the FAT 2s granularity
+MTIME_TOLERANCE = 2.0
+
+
+class ScanManifest:
+    """
+    Per-computer record of every PDF a scan has seen. Scans diff the current
+    listing against it so unchanged files are never opened again.
+    """
+
+    def load(self, computer_id: int) -> Dict[str, FileManifestEntry]:
+        """Live manifest entries for a computer, by path"""
+        return {
+            entry.path: entry
+            for entry in FileManifestEntry.objects.filter(computer_id=computer_id, deleted_at__isnull=True)
+        }
+
+    @staticmethod
+    def classify(entry: Optional[FileManifestEntry], size: int, mtime: float) -> str:
+        """'new', 'changed' or 'unchanged'; files that failed last time count as changed"""
+        if entry is None:
+            return 'new'
+        if entry.status == 'failed' or entry.size != size or abs(entry.mtime - mtime) > MTIME_TOLERANCE:
+            return 'changed'
+        return 'unchanged'
+
+    def diff(self, computer_id: int, stats: Dict[str, Tuple[int, float]]) -> Dict[str, List]:
+        """
+        Split a complete listing ({path: (size, mtime)}) into new, changed and
+        unchanged paths plus the manifest entries whose files are gone
+        """
+        known = self.load(computer_id)
+        changes = {'new': [], 'changed': [], 'unchanged': []}
+        for path, (size, mtime) in stats.items():
+            changes[self.classify(known.get(path), size, mtime)].append(path)
+        changes['deleted'] = [entry for path, entry in known.items() if path not in stats]
+        return changes
+
+    @staticmethod
+    def content_unchanged(entry: Optional[FileManifestEntry], content_hash: str) -> bool:
+        """True when a touched file still has the bytes we already processed"""
+        return (entry is not None and entry.status != 'failed'
+                and bool(content_hash) and entry.content_hash == content_hash)
+
+    def hash_file(self, path: str) -> str:
+        try:
+            return sha256_file(path)
+        except OSError as e:
+            logger.warning(f"Could not hash {path}: {str(e)}")
+            return ''
+
+    def record(self, computer_id: int, outcomes: List[Dict]) -> None:
+        """
+        Upsert one entry per processed file in a single statement. Each outcome
+        carries path, size, mtime, content_hash, status and result.
+        """
+        if not outcomes:
+            return
+        now = timezone.now()
+        FileManifestEntry.objects.bulk_create(
+            [
+                FileManifestEntry(
+                    computer_id=computer_id,
+                    path=outcome['path'],
+                    size=outcome['size'],
+                    mtime=outcome['mtime'],
+                    content_hash=outcome.get('content_hash', ''),
+                    status=outcome['status'],
+                    result=outcome.get('result') or {},
+                    first_seen=now,
+                    processed_at=now,
+                    deleted_at=None,
+                )
+                for outcome in outcomes
+            ],
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['computer', 'path'],
+            update_fields=['size', 'mtime', 'content_hash', 'status', 'result', 'processed_at', 'deleted_at'],
+        )
+
+    def touch(self, computer_id: int, stats: Dict[str, Tuple[int, float]]) -> None:
+        """Store the new size/mtime of files whose content turned out to be unchanged"""
+        if not stats:
+            return
+        entries = list(FileManifestEntry.objects.filter(computer_id=computer_id, path__in=list(stats)))
+        for entry in entries:
+            entry.size, entry.mtime = stats[entry.path]
+        FileManifestEntry.objects.bulk_update(entries, ['size', 'mtime'], batch_size=500)
+
+    def mark_deleted(self, entries: List[FileManifestEntry]) -> int:
+        if not entries:
+            return 0
+        return FileManifestEntry.objects.filter(id__in=[entry.id for entry in entries]).update(
+            deleted_at=timezone.now()
+        )
+
+
+# Global manifest used by the scan views
+scan_manifest = ScanManifest()
@@ -0,0 +1,365 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from .copy_engine import copy_engine as default_copy_engine
+from .document_index import document_index
+from .pdf_extraction import pdf_extraction, read_pdf_pages
+from .scan_manifest import scan_manifest
+from ..utils.scans.logs import log_scan_operation
+from ..utils.scans.onet import is_duplicate_onet, is_onet_filename, onet_filename_from_text
+from ..utils.scans.operations import check_file_access
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+_extract_pool = None
+_extract_pool_lock = threading.Lock()
+
+
+def _init_extract_worker():
+    # Worker processes unpickle functions from this app, which needs Django set up
+    import django
+    django.setup()
+
+
+def get_extract_pool() -> ProcessPoolExecutor:
+    """Process pool shared by every host's pipeline for CPU-bound PDF parsing"""
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            _extract_pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'SCAN_EXTRACT_PROCESSES', None) or os.cpu_count(),
+                initializer=_init_extract_worker
+            )
+        return _extract_pool
+
+
+def can_use_processes() -> bool:
+    """Daemonic processes (e.g. Celery prefork workers) may not start children"""
+    return not multiprocessing.current_process().daemon
+
+
+def _reset_extract_pool() -> None:
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is not None:
+            _extract_pool.shutdown(wait=False, cancel_futures=True)
+        _extract_pool = None
+
+
+class StageMetrics:
+    """
+    Items handled, time spent and queue depth for one pipeline stage. Busy time
+    includes waiting on a full downstream queue, so it also shows backpressure.
+    """
+
+    def __init__(self, name: str, workers: int, inbox: Optional[queue.Queue]):
+        self.name = name
+        self.workers = workers
+        self.inbox = inbox
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.processed += 1
+            self.busy_seconds += seconds
+            if self.inbox is not None:
+                self.max_depth = max(self.max_depth, self.inbox.qsize())
+
+    def snapshot(self, elapsed: float) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'processed': self.processed,
+                'busy_seconds': round(self.busy_seconds, 3),
+                'items_per_second': round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+                'utilization': round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed > 0 else 0.0,
+                'queue_depth': self.inbox.qsize() if self.inbox is not None else 0,
+                'max_queue_depth': self.max_depth,
+            }
+
+
+class ScanPipeline:
+    """
+    Process one computer's files through bounded queues so listing, hashing,
+    PDF parsing and copying overlap:
+
+        discover -> classify (threads) -> extract (process pool) -> copy (threads)
+
+    Each stage has its own worker count; a full queue blocks the stage
+    before it, so a slow share or a slow parser throttles the whole host.
+
+    A file's outcome is final once it leaves the pipeline; finished outcomes
+    are handed to the checkpoint callback in batches. When should_continue
+    turns false, queued files are dropped (they are redone next run), work
+    in flight gets drain_timeout seconds to finish, and the rest is abandoned.
+    """
+
+    def __init__(self, classify_workers: Optional[int] = None, extract_workers: Optional[int] = None,
+                 copy_workers: Optional[int] = None, queue_size: Optional[int] = None,
+                 use_processes: Optional[bool] = None,
+                 checkpoint_every: Optional[int] = None, drain_timeout: Optional[float] = None, copy_engine=None):
+        self.classify_workers = classify_workers or getattr(settings, 'SCAN_PIPELINE_CLASSIFY_WORKERS', 2)
+        self.extract_workers = extract_workers or getattr(settings, 'SCAN_PIPELINE_EXTRACT_WORKERS', 2)
+        self.copy_workers = copy_workers or getattr(settings, 'SCAN_PIPELINE_COPY_WORKERS', 4)
+        self.queue_size = queue_size or getattr(settings, 'SCAN_PIPELINE_QUEUE_SIZE', 64)
+        # Default to the process pool unless this process is not allowed to start one
+        self.use_processes = can_use_processes() if use_processes is None else use_processes
+        self.checkpoint_every = checkpoint_every or getattr(settings, 'SCAN_CHECKPOINT_BATCH', 200)
+        self.drain_timeout = drain_timeout if drain_timeout is not None else getattr(settings, 'SCAN_CANCEL_DRAIN_SECONDS', 60)
+        self.copy_engine = copy_engine or default_copy_engine
+
+    def run(self, computer, entries: Iterable, known: Dict[str, Any], dest_dir: str,
+            should_continue: Optional[Callable[[], bool]] = None,
+            checkpoint: Optional[Callable[[List[Dict[str, Any]], Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Push walker entries through the stages. Returns the finished manifest
+        outcomes, the touched-but-unchanged files, the paths seen, per-state
+        counts, every copy attempt, per-stage metrics and whether the run was
+        cut short.
+        checkpoint(outcomes, touched) receives each batch of finished work.
+        """
+        classify_q = queue.Queue(maxsize=self.queue_size)
+        extract_q = queue.Queue(maxsize=self.queue_size)
+        copy_q = queue.Queue(maxsize=self.queue_size)
+        metrics = {
+            'discover': StageMetrics('discover', 1, None),
+            'classify': StageMetrics('classify', self.classify_workers, classify_q),
+            'extract': StageMetrics('extract', self.extract_workers, extract_q),
+            'copy': StageMetrics('copy', self.copy_workers, copy_q),
+        }
+        outcomes: List[Dict[str, Any]] = []
+        touched: Dict[str, Any] = {}
+        transfers = []
+        seen = set()
+        counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+        label = getattr(computer, 'label', computer.ip_address)
+        cancelled = threading.Event()
+        pending_outcomes: List[Dict[str, Any]] = []
+        pending_touched: Dict[str, Any] = {}
+        checkpoint_lock = threading.Lock()
+
+        def flush_checkpoint(force=False):
+            with checkpoint_lock:
+                if not (pending_outcomes or pending_touched):
+                    return
+                if not force and len(pending_outcomes) + len(pending_touched) < self.checkpoint_every:
+                    return
+                batch, batch_touched = list(pending_outcomes), dict(pending_touched)
+                pending_outcomes.clear()
+                pending_touched.clear()
+            if checkpoint is not None:
+                try:
+                    checkpoint(batch, batch_touched)
+                except Exception as e:
+                    logger.error(f"Scan checkpoint for {label} failed: {str(e)}")
+
+        def finished(outcome):
+            with checkpoint_lock:
+                outcomes.append(outcome)
+                pending_outcomes.append(outcome)
+            flush_checkpoint()
+
+        def discover():
+            try:
+                for entry in entries:
+                    if should_continue is not None and not should_continue():
+                        log_scan_operation(f"Stopping file discovery on {label}", event="SCAN_CANCELLED")
+                        cancelled.set()
+                        break
+                    started = time.perf_counter()
+                    seen.add(entry.path)
+                    manifest_entry = known.get(entry.path)
+                    state = scan_manifest.classify(manifest_entry, entry.size, entry.mtime)
+                    counts[state] += 1
+                    if state != 'unchanged':
+                        classify_q.put({'entry': entry, 'state': state, 'manifest_entry': manifest_entry})
+                    metrics['discover'].record(time.perf_counter() - started)
+            finally:
+                for _ in range(self.classify_workers):
+                    classify_q.put(_STOP)
+
+        def classify(item):
+            entry = item['entry']
+            content_hash = scan_manifest.hash_file(entry.path)
+            if item['state'] == 'changed' and scan_manifest.content_unchanged(item['manifest_entry'], content_hash):
+                # Touched but not modified; nothing to redo
+                with checkpoint_lock:
+                    touched[entry.path] = pending_touched[entry.path] = (entry.size, entry.mtime)
+                flush_checkpoint()
+                return
+            item['outcome'] = {'path': entry.path, 'size': entry.size, 'mtime': entry.mtime,
+                               'content_hash': content_hash, 'status': 'skipped'}
+            if not content_hash:
+                item['outcome'].update(status='failed', result={'error': 'File could not be read'})
+                return
+            if is_onet_filename(entry.path):
+                extract_q.put(item)
+                return True
+
+        def extract(item):
+            entry, outcome = item['entry'], item['outcome']
+            extracted = pdf_extraction.lookup(entry.path, outcome['content_hash'])
+            if extracted is None:
+                pages, error = self._read_pages(entry.path)
+                extracted = pdf_extraction.store(entry.path, outcome['content_hash'], pages, error)
+            new_filename = onet_filename_from_text(extracted.full_text)
+            if not new_filename:
+                log_scan_operation(f"Error processing O*NET PDF {entry.path}: no usable name", "error", event="FILE_PROCESSING_ERROR")
+                return
+            outcome['result'] = {'filename': new_filename}
+            copy_q.put(item)
+            return True
+
+        def copy(item):
+            entry, outcome = item['entry'], item['outcome']
+            new_filename = outcome['result']['filename']
+            accessible, access_error = check_file_access(entry.path)
+            if not accessible:
+                log_scan_operation(f"Skipping inaccessible file: {entry.path}", "warning", event="FILE_ACCESS_ERROR")
+                outcome.update(status='failed', result={'error': access_error})
+                return
+            if is_duplicate_onet(dest_dir, new_filename, outcome['content_hash']):
+                log_scan_operation(f"Skipping duplicate O*NET file: {new_filename}", "info", event="DUPLICATE_FILE")
+                outcome['status'] = 'duplicate'
+                return
+            os.makedirs(dest_dir, exist_ok=True)
+            dest_path = os.path.join(dest_dir, new_filename)
+            # Copy threads race here; whoever indexes the content first copies it
+            claim = document_index.claim(dest_path, outcome['content_hash'], entry.size,
+                                         computer=computer, source_path=entry.path)
+            if claim is None:
+                log_scan_operation(f"Skipping duplicate O*NET file: {new_filename}", "info", event="DUPLICATE_FILE")
+                outcome['status'] = 'duplicate'
+                return
+            # Verified against the hash taken in classify, so a file edited since is not stored half-changed
+            transfer = self.copy_engine.copy(entry.path, dest_path, expected_hash=outcome['content_hash'])
+            if not transfer.conflict:
+                transfers.append(transfer)
+            if not transfer.ok:
+                document_index.release(claim)
+                if transfer.conflict:
+                    # Another file already took this name (same person and date)
+                    log_scan_operation(f"Skipping duplicate O*NET file: {new_filename}", "info", event="DUPLICATE_FILE")
+                    outcome['status'] = 'duplicate'
+                    return
+                log_scan_operation(f"Error copying {entry.path}: {transfer.error}", "error", event="FILE_COPY_ERROR")
+                outcome.update(status='failed', result={**outcome['result'], 'error': transfer.error})
+                return
+            log_scan_operation(f"Successfully copied file to: {dest_path}", event="FILE_COPIED")
+            outcome['status'] = 'copied'
+
+        started_at = time.perf_counter()
+        threads = [threading.Thread(target=discover, name=f'scan-discover-{label}', daemon=True)]
+        stages = [
+            ('classify', classify, classify_q, extract_q, self.classify_workers, self.extract_workers),
+            ('extract', extract, extract_q, copy_q, self.extract_workers, self.copy_workers),
+            ('copy', copy, copy_q, None, self.copy_workers, 0),
+        ]
+        for name, handler, inbox, outbox, workers, downstream_workers in stages:
+            threads += self._stage_threads(name, handler, inbox, outbox, workers, downstream_workers,
+                                           metrics, label, finished, cancelled)
+        for thread in threads:
+            thread.start()
+
+        drain_deadline = None
+        while True:
+            alive = [thread for thread in threads if thread.is_alive()]
+            if not alive:
+                break
+            alive[0].join(timeout=0.5)
+            if not cancelled.is_set() and should_continue is not None and not should_continue():
+                cancelled.set()
+            if cancelled.is_set() and drain_deadline is None:
+                drain_deadline = time.monotonic() + self.drain_timeout
+            if drain_deadline is not None and time.monotonic() > drain_deadline:
+                log_scan_operation(f"Abandoning unfinished files on {label} after {self.drain_timeout}s drain", "warning", event="SCAN_CANCELLED")
+                break
+        flush_checkpoint(force=True)
+
+        elapsed = time.perf_counter() - started_at
+        stage_metrics = {name: stage.snapshot(elapsed) for name, stage in metrics.items()}
+        logger.info(
+            f"Scan pipeline for {label} took {elapsed:.2f}s: " +
+            ", ".join(f"{name} {m['processed']} ({m['items_per_second']}/s, max queue {m['max_queue_depth']})"
+                      for name, m in stage_metrics.items())
+        )
+        with checkpoint_lock:
+            return {
+                'outcomes': list(outcomes),
+                'touched': dict(touched),
+                'transfers': list(transfers),
+                'seen': seen,
+                'counts': counts,
+                'metrics': stage_metrics,
+                'seconds': round(elapsed, 2),
+                'cancelled': cancelled.is_set(),
+            }
+
+    def _stage_threads(self, name, handler, inbox, outbox, workers, downstream_workers, metrics, label,
+                       finished, cancelled):
+        """
+        Worker threads for one stage; the last one to finish passes the stop
+        signal on. Items the handler does not pass on are finished here.
+        """
+        remaining = [workers]
+        remaining_lock = threading.Lock()
+
+        def work():
+            try:
+                while True:
+                    item = inbox.get()
+                    if item is _STOP:
+                        break
+                    if cancelled.is_set():
+                        # Not checkpointed, so the next run picks it up again
+                        continue
+                    started = time.perf_counter()
+                    try:
+                        passed_on = handler(item)
+                    except Exception as e:
+                        passed_on = False
+                        path = item['entry'].path
+                        log_scan_operation(f"Error processing file {path}: {str(e)}", "error", event="FILE_PROCESSING_ERROR")
+                        if 'outcome' in item:
+                            item['outcome'].update(status='failed', result={**item['outcome'].get('result', {}), 'error': str(e)})
+                    if not passed_on and 'outcome' in item:
+                        finished(item['outcome'])
+                    metrics[name].record(time.perf_counter() - started)
+            finally:
+                with remaining_lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last and outbox is not None:
+                    for _ in range(downstream_workers):
+                        outbox.put(_STOP)
+
+        return [threading.Thread(target=work, name=f'scan-{name}-{label}-{i}', daemon=True) for i in range(workers)]
+
+    def _read_pages(self, file_path):
+        """Parse on the shared process pool, or inline if processes are off or the pool broke"""
+        if self.use_processes:
+            try:
+                return get_extract_pool().submit(read_pdf_pages, file_path).result()
+            except BrokenProcessPool:
+                logger.warning("PDF extraction pool broke; recreating it and parsing inline")
+                _reset_extract_pool()
+            except Exception as e:
+                # read_pdf_pages never raises, so this is the pool failing to start
+                logger.warning(f"PDF extraction pool unavailable ({str(e) or type(e).__name__}); parsing inline")
+                _reset_extract_pool()
+                self.use_processes = False
+        return read_pdf_pages(file_path)
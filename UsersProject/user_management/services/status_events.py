@@ -0,0 +1,167 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from ..models import Computer, SystemLog
+from .metrics_deadband import MetricsDeadband
+
+logger = logging.getLogger(__name__)
+
+# Inventory values whose change is worth a COMPUTER_UPDATED event
+INVENTORY_FIELDS = ('hostname', 'ip_address', 'os_version', 'device_class', 'logged_in_user')
+INVENTORY_METRICS = (
+    'cpu.model', 'cpu.cores', 'cpu.threads',
+    'memory.total', 'memory.total_bytes',
+    'disk.total', 'disk.total_bytes',
+)
+
+
+def get_offline_threshold() -> timedelta:
+    """How long a computer may stay silent before it is considered offline"""
+    return timedelta(minutes=getattr(settings, 'COMPUTER_OFFLINE_THRESHOLD_MINUTES', 30))
+
+
+def reported_since(cutoff: datetime, last_seen: Optional[datetime], last_metrics_update: Optional[datetime]) -> bool:
+    """Same rule as Computer.is_online(): seen or reporting metrics since the cutoff"""
+    return bool((last_metrics_update and last_metrics_update >= cutoff) or (last_seen and last_seen >= cutoff))
+
+
+def online_filter(cutoff: datetime) -> Q:
+    """Queryset form of reported_since()"""
+    return Q(last_metrics_update__gte=cutoff) | Q(last_seen__gte=cutoff)
+
+
+def inventory_of(computer: Computer) -> Dict[str, Any]:
+    """Extract the inventory fingerprint of a computer"""
+    inventory = {field: getattr(computer, field, None) for field in INVENTORY_FIELDS}
+    flat = MetricsDeadband.flatten(computer.metrics or {})
+    for path in INVENTORY_METRICS:
+        if path in flat:
+            inventory[path] = flat[path]
+    return inventory
+
+
+class ComputerStatusTracker:
+    """State machine that turns metrics reports into transition-only status events"""
+
+    def __init__(self, offline_threshold: Optional[timedelta] = None):
+        self.offline_threshold = offline_threshold or get_offline_threshold()
+        self._state = {}  # computer id -> {'last_report': datetime, 'inventory': dict}
+        self._lock = threading.Lock()
+
+    def prime(self, computer: Computer) -> None:
+        """Seed state from the row as loaded, before a report is applied to it"""
+        if computer.pk is None:
+            return
+        with self._lock:
+            if computer.pk in self._state:
+                return
+            # observe() applies the offline threshold to this, like the online rule does
+            last_report = max(filter(None, (computer.last_seen, computer.last_metrics_update)), default=None)
+            self._state[computer.pk] = {
+                'last_report': last_report,
+                'inventory': inventory_of(computer),
+            }
+
+    def observe(self, computer: Computer, now: Optional[datetime] = None) -> List[SystemLog]:
+        """
+        Record a metrics report and return the (unsaved) SystemLog rows it warrants.
+        Returns an empty list when the report is neither a transition nor an inventory change.
+        """
+        now = now or timezone.now()
+        inventory = inventory_of(computer)
+        with self._lock:
+            state = self._state.get(computer.pk) or {'last_report': None, 'inventory': None}
+            self._state[computer.pk] = {'last_report': now, 'inventory': inventory}
+
+        events = []
+        last_report = state['last_report']
+        if last_report is None or now - last_report > self.offline_threshold:
+            details = {'inventory': self._jsonable(inventory)}
+            if last_report is not None:
+                details['offline_for_seconds'] = int((now - last_report).total_seconds())
+            events.append(SystemLog(
+                computer=computer,
+                category='COMPUTER_STATUS',
+                event='COMPUTER_ONLINE',
+                level='INFO',
+                message=f"Computer {computer.label} came online",
+                details=details
+            ))
+        elif state['inventory'] is not None and state['inventory'] != inventory:
+            changes = {
+                key: {'old': self._jsonable(state['inventory'].get(key)), 'new': self._jsonable(inventory.get(key))}
+                for key in set(state['inventory']) | set(inventory)
+                if state['inventory'].get(key) != inventory.get(key)
+            }
+            events.append(SystemLog(
+                computer=computer,
+                category='COMPUTER_STATUS',
+                event='COMPUTER_UPDATED',
+                level='INFO',
+                message=f"Computer {computer.label} inventory changed: {', '.join(sorted(changes))}",
+                details={'changes': changes}
+            ))
+        return events
+
+    def mark_offline(self, now: Optional[datetime] = None) -> List[int]:
+        """Emit one COMPUTER_OFFLINE event for each computer that fell silent and return their ids"""
+        now = now or timezone.now()
+        cutoff = now - self.offline_threshold
+        # Online status is derived from the timestamps; an OFFLINE event newer than
+        # last_seen means this silence was already reported
+        already_reported = SystemLog.objects.filter(
+            computer=OuterRef('pk'), event='COMPUTER_OFFLINE', timestamp__gte=OuterRef('last_seen')
+        )
+        stale = list(
+            Computer.objects.filter(last_seen__lt=cutoff)
+            .exclude(last_metrics_update__gte=cutoff)
+            .exclude(Exists(already_reported))
+            .values('id', 'label', 'last_seen')
+        )
+        return self.set_offline(stale, now)
+
+    def set_offline(self, rows: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[int]:
+        """Record the given computers (id, label, last_seen dicts) as offline with one COMPUTER_OFFLINE event each"""
+        now = now or timezone.now()
+        if not rows:
+            return []
+
+        with transaction.atomic():
+            # Bump updated_at so ?since= delta sync picks up the status change
+            Computer.objects.filter(id__in=[row['id'] for row in rows]).update(updated_at=now)
+            SystemLog.objects.bulk_create([
+                SystemLog(
+                    computer_id=row['id'],
+                    category='COMPUTER_STATUS',
+                    event='COMPUTER_OFFLINE',
+                    level='WARNING',
+                    message=f"Computer {row['label']} went offline",
+                    details={'last_seen': row['last_seen'].isoformat() if row['last_seen'] else None}
+                )
+                for row in rows
+            ])
+
+        with self._lock:
+            for row in rows:
+                self._state.pop(row['id'], None)
+        logger.info(f"Marked {len(rows)} computers offline")
+        return [row['id'] for row in rows]
+
+    @staticmethod
+    def _jsonable(value):
+        if isinstance(value, dict):
+            return {k: ComputerStatusTracker._jsonable(v) for k, v in value.items()}
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+
+# Global tracker shared by the ingestion path
+status_tracker = ComputerStatusTracker()
@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import Computer, ComputerTombstone
+
+
+@receiver(post_delete, sender=Computer)
+def computer_deleted(sender, instance, **kwargs):
+    """Leave a tombstone so ?since= delta sync clients learn about the delete"""
+    ComputerTombstone.objects.create(computer_id=instance.pk)
@@ -59,29 +59,16 @@ def process_computer(computer_ip, computer_label):
 def run_file_operations():
     """Main function to read CSV and process each computer."""
     try:
-        csv_file = os.path.join(settings.BASE_DIR, settings.CSV_FILE)
-        if not os.path.exists(csv_file):
-            log_message(f"CSV file not found: {csv_file}", 'ERROR')
-            return
-
-        df = pd.read_csv(csv_file)
-        for _, row in df.iterrows():
-            computer_ip = row.get('IP')
-            computer_label = row.get('Label')
-            
-            if not computer_ip or not computer_label:
-                continue
-
-            # Create or update computer record
-            computer, created = Computer.objects.get_or_create(
-                ip_address=computer_ip,
-                defaults={'label': computer_label}
-            )
+        from .services.inventory_sync import inventory_sync
+        try:
+            inventory_sync.sync()
+        except ValueError as e:
+            log_message(f"Inventory sync skipped: {str(e)}", 'WARNING')
 
-            # Queue the file operation task
-            process_computer.delay(computer_ip, computer_label)
+        for computer_ip, computer_label in Computer.active.exclude(ip_address__isnull=True).values_list('ip_address', 'label'):
+            process_computer(computer_ip, computer_label)
 
-        log_message("File operations scheduled for all computers")
+        log_message("File operations completed for all computers")
         
         # Process O*NET PDFs
         source_dir = settings.SOURCE_DIR
@@ -106,7 +93,8 @@ def run_file_operations():
                 source_path = os.path.join(source_dir, filename)
                 
                 # Check if it's an O*NET profile and process it
-                if is_onet_profile(source_path):
+                is_onet, _ = is_onet_profile(source_path)
+                if is_onet:
                     success, result = process_onet_pdf(source_path)
                     if success:
                         logging.info(f"Processed O*NET PDF: {result}")
@@ -171,6 +159,33 @@ def analyze_logs():
     from .services.log_analysis import LogAnalysisService
     LogAnalysisService.analyze_logs()
 
+@app.task(name='user_management.tasks.mark_offline_computers')
+def mark_offline_computers():
+    """Emit COMPUTER_OFFLINE events for computers that stopped reporting"""
+    from .services.status_events import status_tracker
+    from .services.fleet_stream import fleet_publisher
+    from .services.fleet_summary import fleet_summary
+    offline_ids = status_tracker.mark_offline()
+    for computer_id in offline_ids:
+        fleet_publisher.publish_fields(computer_id, {'status': 'offline'})
+    if offline_ids:
+        fleet_summary.invalidate()
+    return len(offline_ids)
+
+@app.task(name='user_management.tasks.sweep_reachability')
+def sweep_reachability():
+    """Probe every computer concurrently and store reachability and latency"""
+    from .services.reachability import reachability_sweeper
+    return reachability_sweeper.sweep_fleet()
+
+@app.task(name='user_management.tasks.discover_computers')
+def discover_computers():
+    """Register lab machines that answer in the configured ranges but are not in the database"""
+    from .services.discovery import subnet_discovery
+    result = subnet_discovery.run()
+    result.pop('new_computers', None)
+    return result
+
 @app.task(
     name='user_management.tasks.check_and_run_scheduled_scans',
     bind=True,
@@ -182,169 +197,124 @@ def analyze_logs():
     task_track_started=True
 )
 def check_and_run_scheduled_scans(self):
-    """Check for and execute any scheduled scans that are due"""
+    """Queue a scan job for each scheduled scan that is due; the scans themselves run as separate tasks"""
     scan_logger = logging.getLogger('scan_operations')
     scan_logger.info("Starting scheduled scan check...")
     try:
         from user_management.models import ScanSchedule
-        from django.utils import timezone
-        import time
-        import pytz
-        from django.db.utils import OperationalError
-        
+        from .services.scan_jobs import scan_jobs
+
         now_utc = timezone.now()
-        est = pytz.timezone('America/New_York')
-        now_est = now_utc.astimezone(est)
-        
-        scan_logger.info(f"Current time - UTC: {now_utc}, EST: {now_est}")
-        
-        max_retries = 3
-        retry_delay = 1
-        
-        for attempt in range(max_retries):
-            try:
-                with transaction.atomic():
-                    all_schedules = (ScanSchedule.objects
-                        .select_for_update(nowait=True)
-                        .filter(enabled=True)
-                        .filter(next_run__lte=now_utc)
-                    )
-                    scan_logger.info(f"Found {all_schedules.count()} due schedules")
-                    
-                    for schedule in all_schedules:
-                        next_run_utc = schedule.next_run
-                        next_run_est = next_run_utc.astimezone(est) if next_run_utc else None
-                        
-                        scan_logger.info(
-                            f"Processing schedule {schedule.id}: time={schedule.time}, "
-                            f"next_run UTC={next_run_utc}, EST={next_run_est}"
-                        )
-                        
-                        try:
-                            with transaction.atomic():
-                                schedule.refresh_from_db()
-                                
-                                success = start_scan_for_schedule(schedule)
-                                
-                                if success:
-                                    schedule.next_run = schedule.calculate_next_run()
-                                    schedule.last_run = now_utc
-                                    schedule.last_status = 'success'
-                                    schedule.save()
-                                    scan_logger.info(f"Updated next run time to {schedule.next_run}")
-                                else:
-                                    schedule.last_status = 'failed'
-                                    schedule.save()
-                                    scan_logger.error("Scan failed. Schedule updated with failure status.")
-                                    
-                        except Exception as e:
-                            scan_logger.error(f"Error processing schedule {schedule.id}: {str(e)}", exc_info=True)
-                            schedule.last_status = 'error'
-                            schedule.save()
-                            continue
-                            
-                break  # Exit retry loop if successful
-                    
-            except OperationalError as e:
-                if attempt < max_retries - 1:
-                    scan_logger.warning(f"Database lock conflict, attempt {attempt + 1} of {max_retries}")
-                    time.sleep(retry_delay * (attempt + 1))
-                else:
-                    scan_logger.error("Failed to acquire database lock after max retries")
-                    raise
-                    
+        queued = []
+        # The lock only covers claiming due schedules, never the scan
+        with transaction.atomic():
+            due_schedules = (ScanSchedule.objects
+                .select_for_update(skip_locked=True)
+                .filter(enabled=True, next_run__lte=now_utc)
+                .prefetch_related('computers')
+            )
+            for schedule in due_schedules:
+                computers = list(schedule.computers.all())
+                if not computers:
+                    scan_logger.warning(f"Schedule {schedule.id} has no computers associated")
+                    schedule.next_run = schedule.calculate_next_run()
+                    schedule.last_status = 'skipped'
+                    schedule.save(update_fields=['next_run', 'last_status'])
+                    continue
+
+                # One scan at a time; a schedule that has to wait stays due for the next check
+                if queued or scan_jobs.active():
+                    scan_logger.info(f"Schedule {schedule.id} is due but another scan is active; will retry")
+                    continue
+
+                job = scan_jobs.create(computers, trigger='schedule', schedule=schedule, user=schedule.user)
+                schedule.last_run = now_utc
+                schedule.next_run = schedule.calculate_next_run()
+                schedule.last_status = 'queued'
+                schedule.save(update_fields=['last_run', 'next_run', 'last_status'])
+                queued.append(job.id)
+                scan_logger.info(f"Queued scan job {job.id} for schedule {schedule.id}; next run {schedule.next_run}")
+
+            transaction.on_commit(lambda: [enqueue_scan_job(job_id) for job_id in queued])
+        return queued
+
     except Exception as e:
         scan_logger.error(f"Error checking scheduled scans: {str(e)}", exc_info=True)
         raise
 
-def start_scan_for_schedule(schedule):
-    """Start a scan for the given schedule."""
-    scan_logger = logging.getLogger('scan_operations')
-    try:
-        computer_ids = list(schedule.computers.values_list('id', flat=True))
-        if not computer_ids:
-            scan_logger.warning(f"Schedule {schedule.id} has no computers associated")
-            return False
-            
-        scan_logger.info(f"Found {len(computer_ids)} computers to scan: {computer_ids}")
-        
-        from user_management.views_scan import ScanViewSet
-        from rest_framework.test import APIRequestFactory, force_authenticate
-        from rest_framework.request import Request
-        from django.contrib.auth import get_user_model
-        from rest_framework.parsers import JSONParser
-        
-        scan_viewset = ScanViewSet()
-        scan_viewset.format_kwarg = None
-        scan_viewset.action_map = {'post': 'start'}
-        scan_viewset.action = 'start'
-        scan_viewset.detail = False
-        scan_viewset.basename = 'scan'
-        scan_viewset.logger = scan_logger
-        
-        factory = APIRequestFactory()
-        wsgi_request = factory.post('/api/scan/start/', {'computers': computer_ids}, format='json')
-        
-        User = get_user_model()
-        admin_user = User.objects.filter(is_superuser=True).first()
-        if not admin_user:
-            scan_logger.error("No superuser found to authenticate scheduled scan")
-            return False
-
-        force_authenticate(wsgi_request, user=admin_user)
-        wsgi_request.META['CONTENT_TYPE'] = 'application/json'
-        wsgi_request.META['HTTP_ACCEPT'] = 'application/json'
-        request = Request(wsgi_request)
-        request.user = admin_user
-        request.method = 'POST'
-        request.parsers = [JSONParser()]
-        
-        computers_data = {'computers': [str(computer.id) for computer in schedule.computers.all()]}
-        request._data = computers_data
-        request._full_data = computers_data
-        
-        scan_logger.info(f"Starting scan for schedule {schedule.id}")
-        response = scan_viewset.start(request)
-        
-        if response.status_code != 200:
-            scan_logger.error(f"Scan failed with status {response.status_code}: {response.data}")
-            return False
-            
-        scan_logger.info(f"Scan initiated successfully. {response.data.get('message', '')}")
-        
-        max_wait = 240
-        check_interval = 5
-        wait_time = 0
-        
-        while wait_time < max_wait:
-            if not scan_viewset._scan_in_progress:
-                stats = scan_viewset._current_scan_stats
-                failed_computers = stats.get('failed_computers', [])
-                total_computers = stats.get('total_computers', 0)
-                computers_scanned = stats.get('computers_scanned', 0)
-                
-                if not failed_computers and computers_scanned == total_computers:
-                    scan_logger.info(f"Scan completed successfully. Processed {computers_scanned} computers.")
-                    return True
-                else:
-                    scan_logger.error(
-                        f"Scan completed with issues. Failed computers: {failed_computers}. "
-                        f"Computers scanned: {computers_scanned}/{total_computers}"
-                    )
-                    return False
-                    
-            time.sleep(check_interval)
-            wait_time += check_interval
-            
-            if wait_time % 30 == 0:
-                scan_logger.info(f"Scan in progress... Time elapsed: {wait_time}s")
-        
-        scan_logger.error(f"Scan timeout after {max_wait} seconds")
+def enqueue_scan_job(job_id):
+    """Run a scan job on the workers: one task per pending host, then a callback that closes the job"""
+    from celery import chord
+    from .models import ScanJob
+    from .services.scan_jobs import scan_jobs
+
+    job = ScanJob.objects.get(pk=job_id)
+    scan_jobs.start(job)
+    computer_ids = list(job.hosts.filter(status='pending').values_list('computer_id', flat=True))
+    if not computer_ids:
+        scan_jobs.close(job_id)
+        return
+    chord(scan_job_host.si(job_id, computer_id) for computer_id in computer_ids)(finish_scan_job.si(job_id))
+
+@app.task(
+    name='user_management.tasks.scan_job_host',
+    acks_late=True,
+    reject_on_worker_lost=True,
+    ignore_result=False,  # Chord members must keep their results
+    soft_time_limit=getattr(settings, 'SCAN_HOST_TIMEOUT', 900),
+    time_limit=getattr(settings, 'SCAN_HOST_TIMEOUT', 900) + getattr(settings, 'SCAN_CANCEL_DRAIN_SECONDS', 60),
+)
+def scan_job_host(job_id, computer_id):
+    """Scan one computer of a scan job"""
+    import time
+    from .services.scan_jobs import scan_jobs
+    from .views_scan import ScanViewSet
+
+    progress = scan_jobs.claim_host(job_id, computer_id)
+    if progress is None:
         return False
-        
+
+    started = time.monotonic()
+    try:
+        computer = Computer.objects.get(pk=computer_id)
+        success = ScanViewSet()._scan_single_computer(computer, progress=progress)
+        error = None if success or progress.should_continue() else 'Cancelled'
     except Exception as e:
-        scan_logger.error(f"Error in scan execution: {str(e)}", exc_info=True)
-        return False
+        success, error = False, str(e)
+    progress.host_finished(computer_id, success, error, round(time.monotonic() - started, 2))
+    progress.flush(force=True)
+    return success
+
+@app.task(name='user_management.tasks.finish_scan_job')
+def finish_scan_job(job_id):
+    """Chord callback: settle the job once every host task has run"""
+    from .models import ScanJobHost
+    from .services.scan_jobs import RUNNABLE_STATUSES, scan_jobs
+    requeued = ScanJobHost.objects.filter(job_id=job_id, status='pending', job__status__in=RUNNABLE_STATUSES)
+    if scan_jobs.live_hosts().filter(job_id=job_id).exists() or requeued.exists():
+        # A requeued copy of this job is still scanning or queued; its own callback closes the job
+        return
+    job = scan_jobs.close(job_id)
+    if job is not None:
+        logging.getLogger('scan_operations').info(
+            f"Scan job {job_id} {job.status}: {job.computers_scanned}/{job.total_computers} computers, "
+            f"{job.files_copied} files copied"
+        )
+
+@app.task(name='user_management.tasks.recover_scan_jobs')
+def recover_scan_jobs():
+    """Requeue scan jobs whose worker died mid-scan"""
+    from .services.scan_jobs import scan_jobs
+    resumed = [job.id for job in scan_jobs.recover_orphans()]
+    for job_id in resumed:
+        enqueue_scan_job(job_id)
+    return resumed
+
+@app.task(name='user_management.tasks.reap_stale_commands')
+def reap_stale_commands():
+    """Time out or requeue commands whose agent never reported back"""
+    from .services.command_dispatch import command_dispatcher
+    return command_dispatcher.reap_stale()
 
 def schedule_file_operations(hour: int, minute: int, name: str = "daily_backup"):
     """Schedule file operations to run at a specific time."""
@@ -1,3 +1,24 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+
+from .models import Computer, SystemLog
+from .services.status_events import ComputerStatusTracker
+
+
+class MarkOfflineTests(TestCase):
+    def test_mark_offline_reports_each_silent_computer_once(self):
+        now = timezone.now()
+        silent = Computer.objects.create(label='PC1', last_seen=now - timedelta(hours=2))
+        Computer.objects.create(label='PC2', last_seen=now - timedelta(minutes=5))
+        Computer.objects.create(label='PC3', last_seen=now - timedelta(hours=2), last_metrics_update=now)
+        Computer.objects.create(label='PC4')
+        tracker = ComputerStatusTracker(offline_threshold=timedelta(minutes=30))
 
-# Create your tests here.
+        self.assertEqual(tracker.mark_offline(now), [silent.id])
+        self.assertEqual(tracker.mark_offline(now), [])
+        self.assertEqual(
+            list(SystemLog.objects.filter(event='COMPUTER_OFFLINE').values_list('computer_id', flat=True)),
+            [silent.id]
+        )
@@ -1,7 +1,6 @@
 import os
 from datetime import datetime
 import re
-from PyPDF2 import PdfReader
 import logging
 
 # Get scan operations logger
@@ -13,40 +12,13 @@ def is_onet_profile(file_path: str) -> tuple[bool, str]:
     Returns (is_onet, error_message)
     """
     try:
+        from ..services.pdf_extraction import pdf_extraction
         logger.debug(f"Attempting to read PDF content from: {file_path}")
-        reader = PdfReader(file_path)
-        first_page = reader.pages[0].extract_text()
-        
-        logger.debug("Checking PDF content for O*NET indicators")
-        # Check for multiple possible O*NET indicators
-        onet_indicators = [
-            "O*NET Interest Profiler",
-            "O*NET Interest Profile",
-            "O*NET Profile",
-            "O_NET Interest Profiler",
-            "O_NET Profile",
-            "O_NET Interest Profile"
-        ]
-        
-        # Convert page text to lowercase for case-insensitive comparison
-        page_text = first_page.lower()
-        
-        # First try exact phrase match
-        is_onet = any(indicator.lower() in page_text for indicator in onet_indicators)
-        
-        # If no match found, try more flexible matching
-        if not is_onet:
-            # Look for both O*NET and O_NET (with any characters in between)
-            basic_indicators = ["o*net", "o_net"]
-            has_onet = any(indicator in page_text for indicator in basic_indicators)
-            
-            # If we found basic O*NET indicator, also check for "interest" and "profiler"
-            # to confirm it's an Interest Profiler document
-            if has_onet:
-                is_onet = "interest" in page_text and "profiler" in page_text
-                if is_onet:
-                    logger.debug("Found O*NET document using flexible matching")
-        
+        extracted = pdf_extraction.get(file_path)
+        if extracted.classification == 'unreadable':
+            raise ValueError(extracted.error)
+
+        is_onet = extracted.classification == 'onet'
         if is_onet:
             logger.info(f"Confirmed {file_path} is an O*NET Interest Profiler")
             return True, ""
@@ -70,12 +42,9 @@ def process_onet_pdf(file_path: str) -> tuple[bool, str]:
         if not is_onet:
             return False, error
 
-        # Read PDF
-        logger.info(f"Reading PDF file: {file_path}")
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
+        # Already parsed by is_onet_profile
+        from ..services.pdf_extraction import pdf_extraction
+        text = pdf_extraction.get(file_path).full_text
 
         # Look for "Printed for:" pattern with improved regex
         match = re.search(r"Printed\s+for:\s*([A-Za-z\s\-']+?)(?=\n|\s*O\*NET|$)", text, re.IGNORECASE)
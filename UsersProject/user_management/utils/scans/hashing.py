@@ -0,0 +1,12 @@
+import hashlib
+
+# 1 MiB reads keep SMB round trips low without holding much memory
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def sha256_file(file_path, chunk_size=HASH_CHUNK_SIZE):
+    """Return the hex SHA-256 of a file, streamed in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
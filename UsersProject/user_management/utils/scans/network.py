@@ -1,6 +1,20 @@
 import os
 import subprocess
+from django.conf import settings
 from .logs import log_scan_operation
+from .walker import DEFAULT_PRUNE_DIRS, DEFAULT_TARGET_FOLDERS, get_scan_backend, iter_profile_files
+
+def _command_timeout():
+    """Upper bound for a single net use call, so one hung host cannot stall a scan"""
+    return getattr(settings, 'SCAN_COMMAND_TIMEOUT', 120)
+
+def disconnect_network_share(computer_ip):
+    """Drop only this computer's C$ connection; other hosts may be mid-scan in parallel."""
+    try:
+        subprocess.run(f'net use \\\\{computer_ip}\\C$ /delete /y', shell=True, capture_output=True,
+                       text=True, timeout=_command_timeout())
+    except subprocess.TimeoutExpired:
+        log_scan_operation(f"Timed out disconnecting from {computer_ip}", "warning", event="NETWORK_ERROR")
 
 def cleanup_network_connections():
     """Clean up network connections."""
@@ -25,13 +39,13 @@ def cleanup_network_connections():
 def establish_network_connection(computer_ip, username='Client', password=None):
     """Authenticate to the remote computer using net use."""
     try:
-        # Clean up any existing connections first
-        cleanup_network_connections()
+        # Clear a stale connection to this host only
+        disconnect_network_share(computer_ip)
         
         # First try with computer's credentials if provided
         if username and password:
             connect_cmd = f'net use \\\\{computer_ip}\\C$ /user:"{username}" "{password}" /persistent:no /y'
-            result = subprocess.run(connect_cmd, shell=True, capture_output=True, text=True)
+            result = subprocess.run(connect_cmd, shell=True, capture_output=True, text=True, timeout=_command_timeout())
             if result.returncode == 0:
                 log_scan_operation(f"Successfully connected to \\\\{computer_ip}\\C$ with computer credentials", event="NETWORK_CONNECTED")
                 return True
@@ -45,7 +59,7 @@ def establish_network_connection(computer_ip, username='Client', password=None):
             return False
             
         connect_cmd = f'net use \\\\{computer_ip}\\C$ /user:"{admin_username}" "{admin_password}" /persistent:no /y'
-        result = subprocess.run(connect_cmd, shell=True, capture_output=True, text=True)
+        result = subprocess.run(connect_cmd, shell=True, capture_output=True, text=True, timeout=_command_timeout())
         
         if result.returncode == 0:
             log_scan_operation(f"Successfully connected to \\\\{computer_ip}\\C$ with admin credentials", event="NETWORK_CONNECTED")
@@ -55,74 +69,57 @@ def establish_network_connection(computer_ip, username='Client', password=None):
             log_scan_operation(f"Failed to connect to {computer_ip} with both sets of credentials: {error_msg}", "error", event="NETWORK_ERROR")
             return False
             
+    except subprocess.TimeoutExpired:
+        log_scan_operation(f"Timed out connecting to {computer_ip}", "error", event="NETWORK_ERROR")
+        return False
     except Exception as e:
         log_scan_operation(f"Error connecting to {computer_ip}: {str(e)}", "error", event="NETWORK_ERROR")
         return False
 
-def scan_network_directory(ip_address, share_path, computer_label=None):
+def iter_network_directory(ip_address, share_path, computer_label=None, on_error=None):
     """
-    Scan specific user folders (Desktop, Documents, Downloads) for PDF files.
+    Yield PDF files from the user folders (Desktop, Documents, Downloads by default)
+    of every profile under share_path as WalkEntry(path, size, mtime), as they are found.
     
     Args:
         ip_address (str): IP address of the computer to scan
         share_path (str): Base path to scan (e.g. 'C$\\Users')
         computer_label (str): Label of the computer being scanned (for logging)
-        
-    Returns:
-        list: List of PDF file paths found
+        on_error (callable): Called with (path, error) for anything that could not be read
     """
+    network_path = get_scan_backend().resolve(ip_address, share_path)
+    label_info = f" ({computer_label})" if computer_label else ""
+    log_scan_operation(f"Scanning network path: {network_path}{label_info}", event="SCAN_START")
+
+    def report_error(path, error):
+        log_scan_operation(f"Could not read {path}: {str(error)}", "warning", event="SCAN_ERROR")
+        if on_error is not None:
+            on_error(path, error)
+
+    target_folders = getattr(settings, 'SCAN_TARGET_FOLDERS', DEFAULT_TARGET_FOLDERS)
+    found = 0
     try:
-        # Build the full network path
-        network_path = f"\\\\{ip_address}\\{share_path}"
-        label_info = f" ({computer_label})" if computer_label else ""
-        log_scan_operation(f"Scanning network path: {network_path}{label_info}", event="SCAN_START")
-        
-        all_files = []
-        # Only scan specific user folders
-        target_folders = ["Desktop", "Documents", "Downloads"]
-        
-        # First, list all user profiles
-        cmd = f'dir /B /AD "{network_path}"'
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            user_profiles = [p.strip() for p in result.stdout.split('\n') if p.strip() 
-                           and not p.strip().lower() in ['public', 'default', 'default user', 'all users']]
-            
-            # For each user profile, scan the specific folders
-            for profile in user_profiles:
-                for folder in target_folders:
-                    folder_path = os.path.join(network_path, profile, folder)
-                    temp_file = os.path.join(os.environ.get('TEMP', ''), f'pdf_files_{profile}_{folder}.txt')
-                    
-                    # Use robocopy to list all PDF files in the specific folder
-                    cmd = f'robocopy "{folder_path}" NULL *.pdf /L /S /FP /NS /NC /NDL /NJH /NJS /LOG:"{temp_file}"'
-                    subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                    
-                    if os.path.exists(temp_file):
-                        # Read the file list
-                        with open(temp_file, 'r', encoding='utf-8') as f:
-                            files = [line.strip() for line in f if line.strip().lower().endswith('.pdf')]
-                            all_files.extend(files)
-                        
-                        # Clean up temp file
-                        try:
-                            os.remove(temp_file)
-                        except:
-                            pass
-        
-        log_scan_operation(f"Found {len(all_files)} PDF files in user folders", event="SCAN_COMPLETE")
-        return all_files
-        
-    except Exception as e:
+        for entry in iter_profile_files(
+            network_path,
+            target_folders=target_folders,
+            suffixes=('.pdf',),
+            prune=getattr(settings, 'SCAN_PRUNE_DIRS', DEFAULT_PRUNE_DIRS),
+            on_error=report_error,
+        ):
+            found += 1
+            yield entry
+    except OSError as e:
         log_scan_operation(f"Error scanning network directory: {str(e)}", "error", event="SCAN_ERROR")
-        return []
-    finally:
-        # Clean up any remaining temp files
-        try:
-            temp_dir = os.environ.get('TEMP', '')
-            for file in os.listdir(temp_dir):
-                if file.startswith('pdf_files_') and file.endswith('.txt'):
-                    os.remove(os.path.join(temp_dir, file))
-        except:
-            pass
\ No newline at end of file
+        if on_error is not None:
+            on_error(network_path, e)
+        return
+    log_scan_operation(f"Found {found} PDF files in user folders", event="SCAN_COMPLETE")
+
+def scan_network_directory(ip_address, share_path, computer_label=None):
+    """
+    Scan specific user folders (Desktop, Documents, Downloads) for PDF files.
+    
+    Returns:
+        list: List of PDF file paths found
+    """
+    return [entry.path for entry in iter_network_directory(ip_address, share_path, computer_label)]
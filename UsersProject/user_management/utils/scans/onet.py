@@ -2,8 +2,6 @@ import os
 import logging
 from datetime import datetime
 import unicodedata
-import shutil
-from PyPDF2 import PdfReader
 from .logs import log_scan_operation
 import re
 
@@ -168,62 +166,17 @@ def extract_name_from_onet(content):
         logger.error(f"Error parsing O*NET PDF: {str(e)}", extra={'event': 'PARSE_ONET_PDF'})
         return None
 
-def is_duplicate_onet(directory, name):
-    """Check if an O*NET file already exists for this person."""
+def is_duplicate_onet(directory, filename, content_hash=None):
+    """Check the document index for an O*NET file with the same content or the same person and date."""
+    from ...services.document_index import document_index
     try:
-        if not name:
-            return False
-            
-        # First normalize the name to handle special characters
-        normalized_name = normalize_name(name)
-        if not normalized_name or normalized_name == "Unknown_Name":
-            return False
-            
-        # Get current date
-        current_date = datetime.now().strftime("%m%d%Y")
-        
-        # Generate the pattern to match
-        pattern = f"O_NET_Interest_Profiler_{normalized_name}_{current_date}.pdf"
-        log_scan_operation(f"Checking for O*NET duplicates with pattern: {pattern}")
-        
-        # List all files in directory using os.scandir() instead of os.listdir()
-        try:
-            for entry in os.scandir(directory):
-                if not entry.is_file():
-                    continue
-                    
-                file = entry.name
-                if 'O_NET' in file.upper():
-                    # Normalize the existing filename for comparison
-                    existing_name = normalize_name(file)
-                    if not existing_name:
-                        continue
-                        
-                    if pattern.lower() == file.lower():
-                        log_scan_operation(f"Found duplicate O*NET file: {file}")
-                        return True
-                        
-                    # If names don't match exactly, try content comparison
-                    try:
-                        file_path = os.path.join(directory, file)
-                        reader = PdfReader(file_path)
-                        content = reader.pages[0].extract_text()
-                        pdf_name = extract_name_from_onet(content)
-                        if pdf_name:
-                            pdf_name = normalize_name(pdf_name)
-                            if pdf_name == normalized_name:
-                                log_scan_operation(f"Found duplicate O*NET by content: {file}")
-                                return True
-                    except Exception as e:
-                        logger.error(f"Error checking PDF content in {file}: {str(e)}")
-                        continue
-        except Exception as e:
-            logger.error(f"Error listing directory {directory}: {str(e)}")
+        if not filename:
             return False
-                
-        log_scan_operation(f"No duplicate O*NET found for {normalized_name}")
+        if document_index.is_duplicate(filename, content_hash):
+            log_scan_operation(f"Found duplicate O*NET file for {filename}")
+            return True
         return False
-        
+
     except Exception as e:
         logger.error(f"Error in is_duplicate_onet: {str(e)}")
         return False
@@ -251,64 +204,53 @@ def generate_onet_filename(name, date_str):
     
     return filename
 
-def process_onet_pdf(file_path, current_date=None, computer_label=None):
+def is_onet_filename(file_path):
+    """Cheap check on the file name alone, before anything is opened."""
+    filename = os.path.basename(file_path).lower()
+    if not any(x in filename for x in ['o_net', 'o*net', 'onet', 'perfil_o_net', 'perfil onet']):
+        logger.info(f"Skipping non-O*NET file: {filename}")
+        return False
+        
+    # Skip VIA and other non-Interest Profiler PDFs
+    if any(x in filename for x in ['via character', 'job zones', 'score report', 'clearinghouse']):
+        logger.info(f"Skipping non-Interest Profiler file: {filename}")
+        return False
+    return True
+
+def onet_filename_from_text(content, current_date=None):
+    """Standardized filename for an O*NET PDF's text, or None if no usable name is found."""
+    name = extract_name_from_onet(content)
+    if not name:
+        return None
+    logger.info(f"Successfully extracted name from O*NET: {name}")
+    
+    if current_date is None:
+        current_date = datetime.now()
+    return generate_onet_filename(name, current_date.strftime("%m%d%Y"))
+
+def process_onet_pdf(file_path, current_date=None, computer_label=None, content_hash=None):
     """
     Process O*NET Interest Profiler PDF and return tuple of (success, new_filename).
+    Copying and duplicate checks are left to the caller.
     
     Args:
         file_path: Path to the PDF file
         current_date: Optional date to use for filename (defaults to now)
-        computer_label: Label of the computer being scanned (required)
+        computer_label: Label of the computer being scanned (for logging)
+        content_hash: SHA-256 of the file, if the caller already has it
     """
     try:
-        # Skip non-O*NET files
-        filename = os.path.basename(file_path).lower()
-        if not any(x in filename for x in ['o_net', 'o*net', 'onet', 'perfil_o_net', 'perfil onet']):
-            logger.info(f"Skipping non-O*NET file: {filename}")
-            return False, None
-            
-        # Skip VIA and other non-Interest Profiler PDFs
-        if any(x in filename for x in ['via character', 'job zones', 'score report', 'clearinghouse']):
-            logger.info(f"Skipping non-Interest Profiler file: {filename}")
+        if not is_onet_filename(file_path):
             return False, None
 
         # Extract name from PDF
-        reader = PdfReader(file_path)
-        content = ""
-        for page in reader.pages:
-            content += page.extract_text()
-        name = extract_name_from_onet(content)
-        if not name:
-            logger.info(f"Could not extract name from O*NET PDF: {file_path}")
+        from ...services.pdf_extraction import pdf_extraction
+        content = pdf_extraction.get(file_path, content_hash).full_text
+        new_filename = onet_filename_from_text(content, current_date)
+        if not new_filename:
+            logger.info(f"Could not build a filename for O*NET PDF: {file_path}")
             return False, None
-            
-        logger.info(f"Successfully extracted name from O*NET: {name}")
-        
-        # Generate standardized filename
-        if current_date is None:
-            current_date = datetime.now()
-        date_str = current_date.strftime("%m%d%Y")
-        
-        new_filename = generate_onet_filename(name, date_str)
-        
-        # Get Django media root for storing files
-        from django.conf import settings
-        
-        # Use provided computer label or fall back to "unknown" if not provided
-        dest_dir = os.path.join(settings.MEDIA_ROOT, "pdfs", computer_label or "unknown")
-        os.makedirs(dest_dir, exist_ok=True)
-        
-        dest_path = os.path.join(dest_dir, new_filename)
-        
-        # Check if file already exists
-        if os.path.exists(dest_path):
-            logger.info(f"File already exists, skipping: {new_filename}")
-            return True, new_filename
-            
-        # Copy file to destination
-        shutil.copy2(file_path, dest_path)
-        logger.info(f"Successfully copied file to: {dest_path}")
-        logger.info(f"Generated new filename: {new_filename}")
+        logger.info(f"Generated new filename for {computer_label or 'unknown'}: {new_filename}")
         
         return True, new_filename
         
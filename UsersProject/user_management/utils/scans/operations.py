@@ -97,31 +97,15 @@ def get_base_filename(filename):
         return name + '.pdf'
     return filename
 
-def is_duplicate_file(filename, dir_path):
-    """Check if a file is a duplicate."""
-    log_scan_operation(f"Checking for duplicates of: {filename}", event="FILE_DUPLICATE_CHECK")
-    
+def is_duplicate_file(filename, dir_path, content_hash=None):
+    """Check if a file is a duplicate of one already collected."""
+    from ...services.document_index import document_index
     try:
-        # Get base filename without numbers or date
-        base_filename = get_base_filename(filename)
-        log_scan_operation(f"Base filename to check: {base_filename}", event="FILE_DUPLICATE_CHECK")
-        
-        # List all files in directory
-        existing_files = [f for f in os.listdir(dir_path) if f.lower().endswith('.pdf')]
-        log_scan_operation(f"Found {len(existing_files)} PDF files in destination", event="FILE_DUPLICATE_CHECK")
-        
-        # For each existing file, compare their base names
-        for existing_file in existing_files:
-            existing_base = get_base_filename(existing_file)
-            log_scan_operation(f"Comparing with existing file: {existing_file} (base: {existing_base})", event="FILE_DUPLICATE_CHECK")
-            
-            if base_filename.lower() == existing_base.lower():
-                log_scan_operation(f"MATCH FOUND! {filename} matches existing file {existing_file}", event="FILE_DUPLICATE_FOUND")
-                return True
-                
-        log_scan_operation(f"No duplicates found for {filename}", event="FILE_DUPLICATE_CHECK")
+        if document_index.is_duplicate(filename, content_hash):
+            log_scan_operation(f"MATCH FOUND! {filename} is already collected", event="FILE_DUPLICATE_FOUND")
+            return True
         return False
-        
+
     except Exception as e:
         log_scan_operation(f"Error checking for duplicates: {str(e)}", "error", event="FILE_DUPLICATE_CHECK")
         return False
@@ -150,75 +134,13 @@ def is_duplicate_strengthsprofile(directory, name):
         logger.error(f"Error checking for duplicates: {str(e)}")
         return False
 
-def is_duplicate_onet(directory, name):
-    """Check if an O*NET file already exists for this person."""
-    try:
-        if not name:
-            return False
-            
-        # First normalize the name to handle special characters
-        normalized_name = normalize_name(name)
-        if not normalized_name or normalized_name == "Unknown_Name":
-            return False
-            
-        # Get current date
-        current_date = datetime.now().strftime("%m%d%Y")
-        
-        # Generate the pattern to match
-        pattern = f"O_NET_Interest_Profiler_{normalized_name}_{current_date}.pdf"
-        log_scan_operation(f"Checking for O*NET duplicates with pattern: {pattern}")
-        
-        # List all files in directory using os.scandir() instead of os.listdir()
-        try:
-            for entry in os.scandir(directory):
-                if not entry.is_file():
-                    continue
-                    
-                file = entry.name
-                if 'O_NET' in file.upper():
-                    # Normalize the existing filename for comparison
-                    existing_name = normalize_name(file)
-                    if not existing_name:
-                        continue
-                        
-                    if pattern.lower() == file.lower():
-                        log_scan_operation(f"Found duplicate O*NET file: {file}")
-                        return True
-                        
-                    # If names don't match exactly, try content comparison
-                    try:
-                        file_path = os.path.join(directory, file)
-                        reader = PdfReader(file_path)
-                        content = reader.pages[0].extract_text()
-                        pdf_name = extract_name_from_onet(content)
-                        if pdf_name:
-                            pdf_name = normalize_name(pdf_name)
-                            if pdf_name == normalized_name:
-                                log_scan_operation(f"Found duplicate O*NET by content: {file}")
-                                return True
-                    except Exception as e:
-                        logger.error(f"Error checking PDF content in {file}: {str(e)}")
-                        continue
-        except Exception as e:
-            logger.error(f"Error listing directory {directory}: {str(e)}")
-            return False
-                
-        log_scan_operation(f"No duplicate O*NET found for {normalized_name}")
-        return False
-
-    except Exception as e:
-        logger.error(f"Error in is_duplicate_onet: {str(e)}")
-        return False
-
-
 def extract_name_from_pdf(self, pdf_file):
     """Extract name from PDF content using specific markers"""
     try:
         self.logger.info(f"Extracting name from PDF: {pdf_file}", extra={'event': 'EXTRACT_NAME_FROM_PDF'})
         # Open and read PDF content
-        reader = PdfReader(pdf_file)
-        page = reader.pages[0]
-        content = page.extract_text()
+        from ...services.pdf_extraction import pdf_extraction
+        content = pdf_extraction.get(pdf_file).page1_text
         self.logger.debug(f"Extracted PDF content (first 500 chars): {repr(content[:500])}", extra={'event': 'EXTRACT_NAME_FROM_PDF'})
         
         # Determine file type from filename
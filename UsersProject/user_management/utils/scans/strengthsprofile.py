@@ -2,7 +2,6 @@ import os
 import re
 import logging
 from datetime import datetime
-from PyPDF2 import PdfReader
 from .logs import log_scan_operation
 
 logger = logging.getLogger(__name__)
@@ -54,8 +53,8 @@ def process_strengthsprofile_pdf(file_path, current_date=None):
     """Process StrengthsProfile PDF and return new filename."""
     try:
         # First read the PDF content
-        reader = PdfReader(file_path)
-        content = reader.pages[0].extract_text()
+        from ...services.pdf_extraction import pdf_extraction
+        content = pdf_extraction.get(file_path).page1_text
 
         # Extract name from the content
         name = extract_name_from_strengthsprofile(content)
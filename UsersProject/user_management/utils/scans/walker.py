@@ -0,0 +1,110 @@
+import fnmatch
+import os
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Sequence
+
+from django.conf import settings
+
+# Directories never worth descending into on a lab machine: app caches,
+# dependency trees, OneDrive placeholders (opening them triggers downloads)
+# and the legacy junctions that loop back into the profile
+DEFAULT_PRUNE_DIRS = (
+    'AppData', 'Application Data', 'Local Settings', 'node_modules', 'OneDrive*',
+    '$Recycle.Bin', '.git', '.cache', '__pycache__', 'My Documents', 'Cookies',
+)
+SKIP_PROFILES = ('public', 'default', 'default user', 'all users')
+DEFAULT_TARGET_FOLDERS = ('Desktop', 'Documents', 'Downloads')
+
+
+class WalkEntry(NamedTuple):
+    path: str
+    size: int
+    mtime: float
+
+
+def _is_link(entry: os.DirEntry) -> bool:
+    is_junction = getattr(entry, 'is_junction', None)
+    return entry.is_symlink() or bool(is_junction and is_junction())
+
+
+def walk_files(root: str, suffixes: Sequence[str] = ('.pdf',), prune: Sequence[str] = DEFAULT_PRUNE_DIRS,
+               on_error: Optional[Callable[[str, OSError], None]] = None) -> Iterator[WalkEntry]:
+    """
+    Yield files under root whose name ends with one of the suffixes, depth first,
+    as they are found. Pruned directory names are matched case-insensitively and
+    may use shell wildcards; links and junctions are not followed.
+    """
+    suffixes = tuple(suffix.lower() for suffix in suffixes)
+    prune = [pattern.lower() for pattern in prune]
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                subdirectories = []
+                for entry in entries:
+                    try:
+                        if _is_link(entry):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            name = entry.name.lower()
+                            if not any(fnmatch.fnmatchcase(name, pattern) for pattern in prune):
+                                subdirectories.append(entry.path)
+                        elif entry.name.lower().endswith(suffixes):
+                            # On Windows this comes from the directory listing itself, no extra round trip
+                            st = entry.stat(follow_symlinks=False)
+                            yield WalkEntry(entry.path, st.st_size, st.st_mtime)
+                    except OSError as e:
+                        if on_error is not None:
+                            on_error(entry.path, e)
+                stack.extend(reversed(subdirectories))
+        except OSError as e:
+            if on_error is not None:
+                on_error(directory, e)
+
+
+def iter_profile_files(users_root: str, target_folders: Optional[Iterable[str]] = DEFAULT_TARGET_FOLDERS,
+                       **walk_options) -> Iterator[WalkEntry]:
+    """Walk the chosen folders of every real user profile under users_root (all of it if target_folders is None)"""
+    with os.scandir(users_root) as entries:
+        profiles = sorted(
+            entry.path for entry in entries
+            if entry.is_dir(follow_symlinks=False) and not _is_link(entry)
+            and entry.name.lower() not in SKIP_PROFILES
+        )
+    for profile in profiles:
+        if target_folders is None:
+            yield from walk_files(profile, **walk_options)
+            continue
+        for folder in target_folders:
+            folder_path = os.path.join(profile, folder)
+            if os.path.isdir(folder_path):
+                yield from walk_files(folder_path, **walk_options)
+
+
+class UncScanBackend:
+    """Windows hosts reached over their admin share, e.g. \\\\10.0.0.5\\C$\\Users"""
+
+    def resolve(self, ip_address: str, share_path: str) -> str:
+        return f"\\\\{ip_address}\\{share_path}"
+
+
+class LocalScanBackend:
+    """
+    Shares mounted on this machine (CIFS on Linux) or plain local folders.
+    root_template is formatted with ip_address and share_path, e.g.
+    '/mnt/lab/{ip_address}/{share_path}'.
+    """
+
+    def __init__(self, root_template: str):
+        self.root_template = root_template
+
+    def resolve(self, ip_address: str, share_path: str) -> str:
+        share_path = share_path.replace('\\', '/').strip('/')
+        return os.path.normpath(self.root_template.format(ip_address=ip_address, share_path=share_path))
+
+
+def get_scan_backend():
+    """Backend named by SCAN_BACKEND ('unc' or 'local')"""
+    if getattr(settings, 'SCAN_BACKEND', 'unc') == 'local':
+        return LocalScanBackend(getattr(settings, 'SCAN_LOCAL_ROOT', '/mnt/lab/{ip_address}/{share_path}'))
+    return UncScanBackend()
@@ -30,6 +30,8 @@ import json
 import unicodedata
 
 from .views_base import BaseAPIView, BaseViewSet
+from .services.fleet_summary import fleet_summary
+from .services.status_events import get_offline_threshold, online_filter
 
 # Get the User model
 User = get_user_model()
@@ -660,7 +662,9 @@ def admin_dashboard(request):
         
     stats = {
         'totalUsers': CustomUser.objects.count(),
-        'activeComputers': Computer.objects.filter(is_online=True).count(),
+        'activeComputers': Computer.active.filter(
+            online_filter(timezone.now() - get_offline_threshold())
+        ).count(),
         'totalDocuments': DocumentTag.objects.values('document_path', 'computer').distinct().count(),
         'recentScans': FileTransfer.objects.filter(
             timestamp__gte=timezone.now() - timezone.timedelta(days=1)
@@ -742,9 +746,10 @@ class LogViewSet(BaseViewSet):
             }
             activity_data.append(day_data)
 
-        # Get computer status
-        total_computers = Computer.objects.count()
-        up_to_date_computers = Computer.objects.filter(is_online=True).count()
+        # Get computer status from the fleet summary maintained at ingest
+        fleet = fleet_summary.get()
+        total_computers = fleet['total']
+        up_to_date_computers = fleet['online_count']
 
         summary_data = {
             'total_logs': SystemLog.objects.count(),
@@ -1,4 +1,5 @@
 import datetime
+import hashlib
 import json
 import os
 import logging
@@ -13,48 +14,76 @@ from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import TokenAuthentication, SessionAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Q, Max
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
 from django.shortcuts import get_object_or_404
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
 
 from .authentication import CookieTokenAuthentication
 from .models import (
-    Computer, AuditLog, SystemLog, Command
+    Computer, ComputerTombstone, AuditLog, SystemLog, Command, CommandJob
 )
 
 from asgiref.sync import async_to_sync, sync_to_async
-from .serializers import ComputerSerializer
+from .serializers import ComputerSerializer, ComputerListSerializer, parse_fields_param
 from .websocket_client import relay_client
+from .services.metrics_deadband import INGEST_STATS_CACHE_KEY
+from .services.status_events import status_tracker
+from .services.fleet_stream import fleet_publisher
+from .services.fleet_summary import fleet_summary
+from .services.computer_read_model import computer_read_model
+from .services.command_dispatch import command_dispatcher
+from .services.remote_exec import remote_exec, needs_elevation, build_elevated_script
 
 logger = logging.getLogger(__name__)
 
+GB = 1024 ** 3
+
+# Exact-match filters on columns denormalized from the metrics blob
+METRIC_FILTER_COLUMNS = ('cpu_model', 'os_version', 'logged_in_user')
+
+# ?param=<GB> -> indexed range lookup
+METRIC_RANGE_FILTERS = {
+    'min_disk_free_gb': 'disk_free__gte',
+    'max_disk_free_gb': 'disk_free__lt',
+    'min_memory_gb': 'memory_total__gte',
+    'max_memory_gb': 'memory_total__lt',
+}
+
+
+def _coerce_metric_value(value: str):
+    """Query strings are text; match JSON numbers and booleans as such"""
+    if value in ('true', 'false'):
+        return value == 'true'
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            continue
+    return value
+
+
 class ComputerViewSet(viewsets.ModelViewSet):
     """ViewSet for managing computers"""
-    queryset = Computer.objects.all()
+    queryset = Computer.active.all()
     serializer_class = ComputerSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [CookieTokenAuthentication, TokenAuthentication, SessionAuthentication]
 
     def get_queryset(self):
         """Get filtered queryset based on request parameters."""
-        queryset = Computer.objects.all()
-        
-        # Print all computer data for debugging
-        print("\n=== Computer Data Debug Info ===")
-        for computer in queryset:
-            print(f"\nComputer: {computer.hostname}")
-            print(f"Label: {computer.label}")
-            print(f"IP Address: {computer.ip_address}")
-            print(f"Last Seen: {computer.last_seen}")
-            print(f"Last Metrics Update: {computer.last_metrics_update}")
-            if computer.metrics:
-                print(f"Metrics Data:")
-                print(json.dumps(computer.metrics, indent=2))
-            else:
-                print("No metrics data available")
-            print("-" * 50)
-        
+        queryset = Computer.active.all()
+
+        # Skip loading the metrics blob unless the projection asks for it
+        fields = self.get_requested_fields()
+        if fields is not None and 'metrics' not in fields:
+            queryset = queryset.defer('metrics')
+
         # Filter by online status if requested
         online = self.request.query_params.get('online', None)
         if online is not None:
@@ -78,11 +107,56 @@ class ComputerViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(
                 Q(label__icontains=search) |
                 Q(ip_address__icontains=search) |
-                Q(model__icontains=search)
+                Q(hostname__icontains=search) |
+                Q(cpu_model__icontains=search)
             )
-            
+
+        queryset = self.filter_by_metrics(queryset)
         return queryset.order_by('label')
+
+    def filter_by_metrics(self, queryset):
+        """
+        Fleet filters on the indexed metric columns, e.g.
+        ?cpu_model=...&os_version=...&logged_in_user=...&max_disk_free_gb=10&min_memory_gb=8.
+        ?metric=path.to.key:value filters any other metrics path (GIN-indexed on Postgres).
+        """
+        params = self.request.query_params
+        for column in METRIC_FILTER_COLUMNS:
+            value = params.get(column)
+            if value:
+                queryset = queryset.filter(**{column: value})
+
+        for param, lookup in METRIC_RANGE_FILTERS.items():
+            value = params.get(param)
+            if value in (None, ''):
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: int(float(value) * GB)})
+            except ValueError:
+                raise ParseError(f'{param} must be a number of GB')
+
+        for expression in params.getlist('metric'):
+            path, separator, value = expression.partition(':')
+            keys = [key for key in path.split('.') if key]
+            if not separator or not keys:
+                raise ParseError('metric filters look like metric=path.to.key:value')
+            # Nested containment ({"cpu": {"architecture": "x64"}}) so Postgres can use the GIN index
+            condition = _coerce_metric_value(value)
+            for key in reversed(keys):
+                condition = {key: condition}
+            queryset = queryset.filter(metrics__contains=condition)
+
+        return queryset
     
+    def get_requested_fields(self):
+        """Sparse fieldset from ?fields=a,b,c (None when not given)."""
+        return parse_fields_param(self.request.query_params.get('fields'))
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request is not None and 'fields' not in kwargs:
+            kwargs['fields'] = self.get_requested_fields()
+        return super().get_serializer(*args, **kwargs)
+
     def _calculate_disk_percent(self, total: int, used: int) -> float:
         """Calculate disk usage percentage."""
         if not total or not used:
@@ -90,53 +164,87 @@ class ComputerViewSet(viewsets.ModelViewSet):
         return (used / total) * 100
 
     def get_computer_metrics(self, computer: Computer) -> Dict[str, Any]:
-        """Get computer metrics in a standardized format."""
+        """Get computer metrics in a standardized format (read-only; columns are filled at ingest)."""
         metrics = computer.metrics or {}
-        cpu_info = metrics.get('cpu', {})
-        memory_info = metrics.get('memory', {})
-        disk_info = metrics.get('disk', {})
-        system_info = metrics.get('system', {})
-        
-        # Update computer fields from metrics
-        computer.cpu_model = cpu_info.get('model')
-        computer.cpu_cores = cpu_info.get('cores')
-        computer.cpu_threads = cpu_info.get('threads')
-        computer.memory_total = memory_info.get('total_bytes')
-        computer.memory_usage = memory_info.get('percent')
-        computer.total_disk = disk_info.get('total_bytes')
-        computer.disk_usage = disk_info.get('percent')
-        computer.device_class = system_info.get('device_class')
-        computer.os_version = system_info.get('os_version')
-        computer.logged_in_user = system_info.get('logged_in_user')
-        computer.save()
-        
         return {
             'status': 'online' if computer.get_status() == 'online' else 'offline',
-            'cpu': cpu_info,
-            'memory': memory_info,
-            'disk': disk_info,
-            'system': system_info,
+            'cpu': metrics.get('cpu', {}),
+            'memory': metrics.get('memory', {}),
+            'disk': metrics.get('disk', {}),
+            'system': metrics.get('system', {}),
             'last_seen': computer.last_seen.isoformat() if computer.last_seen else None,
             'last_metrics_update': computer.last_metrics_update.isoformat() if computer.last_metrics_update else None
         }
 
+    def get_fleet_version(self):
+        """Newest modification or delete across the fleet, from two indexed MAX() lookups."""
+        last_modified = Computer.objects.aggregate(last=Max('updated_at'))['last']
+        last_deleted = ComputerTombstone.objects.aggregate(last=Max('deleted_at'))['last']
+        return max(filter(None, [last_modified, last_deleted]), default=None)
+
+    def _is_not_modified(self, request, etag, last_modified) -> bool:
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            if if_none_match.strip() == '*':
+                return True
+            # Weak comparison: W/"x" matches "x"
+            strip_weak = lambda tag: tag[2:] if tag.startswith('W/') else tag
+            return strip_weak(etag) in [strip_weak(tag.strip()) for tag in if_none_match.split(',')]
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return bool(if_modified_since and last_modified and int(last_modified.timestamp()) <= if_modified_since)
+
     def list(self, request):
-        """List all computers with their current status."""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        """List all computers with their current status; supports conditional GET and ?since= delta sync."""
+        # Read the version before the rows so nothing committed in between is skipped
+        version = self.get_fleet_version()
+        cursor = version.isoformat() if version else None
+        etag = quote_etag(hashlib.md5(f"{cursor}|{request.get_full_path()}".encode()).hexdigest())
+
+        if self._is_not_modified(request, etag, version):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            queryset = self.get_queryset()
+            serializer = ComputerListSerializer(fields=self.get_requested_fields())
+            since = request.query_params.get('since')
+            if since is None:
+                response = Response(serializer.serialize(queryset))
+            else:
+                # A '+' in an unencoded offset arrives as a space
+                since_time = parse_datetime(since.replace(' ', '+'))
+                if since_time is None:
+                    return Response(
+                        {'error': 'since must be a cursor returned by a previous response'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                # >= re-sends rows stamped exactly at the cursor; clients apply changes idempotently
+                response = Response({
+                    'cursor': cursor,
+                    'changed': serializer.serialize(queryset.filter(updated_at__gte=since_time)),
+                    'deleted': list(ComputerTombstone.objects.filter(
+                        deleted_at__gte=since_time
+                    ).values_list('computer_id', flat=True)),
+                })
+
+        response['ETag'] = etag
+        if version:
+            response['Last-Modified'] = http_date(version.timestamp())
+        if cursor:
+            response['X-Fleet-Cursor'] = cursor
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
     def retrieve(self, request, *args, **kwargs):
-        """Handle GET requests for a single computer."""
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        """Handle GET requests for a single computer from the cached read model."""
+        # Resolve through the viewset so queryset filters and object permissions still apply
+        computer = self.get_object()
+        return Response(computer_read_model.get_for(computer, fields=self.get_requested_fields()))
 
     def create(self, request):
         """Add a new computer."""
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
+            fleet_summary.invalidate()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -145,6 +253,7 @@ class ComputerViewSet(viewsets.ModelViewSet):
         try:
             computer = self.get_queryset().get(pk=pk)
             computer.delete()
+            fleet_summary.invalidate()
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Computer.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
@@ -165,6 +274,7 @@ class ComputerViewSet(viewsets.ModelViewSet):
             computer = self.get_object()
             data = request.data
             print(f"Received data for update: {data}")
+            status_tracker.prime(computer)
 
             # Update computer info
             computer.is_online = True
@@ -196,43 +306,12 @@ class ComputerViewSet(viewsets.ModelViewSet):
             computer.last_metrics_update = timezone.now()
             computer.save()
 
-            # Log system metrics
-            SystemLog.objects.create(
-                computer=computer,
-                category='COMPUTER_STATUS',
-                event='COMPUTER_ONLINE',
-                level='INFO',
-                message=f"Computer {computer.label} reported status",
-                details={
-                    'cpu': {
-                        'model': computer.cpu_model,
-                        'speed': computer.cpu_speed,
-                        'cores': computer.cpu_cores,
-                        'threads': computer.cpu_threads,
-                        'architecture': computer.cpu_architecture
-                    },
-                    'memory': {
-                        'total': computer.memory_total,
-                        'available': computer.memory_available,
-                        'used': computer.memory_used,
-                        'total_gb': f"{computer.memory_total / (1024 * 1024 * 1024):.1f}" if computer.memory_total else "0.0"
-                    },
-                    'disk': {
-                        'total': computer.disk_total,
-                        'free': computer.disk_free,
-                        'used': computer.disk_used,
-                        'total_gb': f"{computer.disk_total / (1024 * 1024 * 1024):.1f}" if computer.disk_total else "0.0",
-                        'percent': self._calculate_disk_percent(computer.disk_total, computer.disk_used)
-                    },
-                    'system': {
-                        'device_class': computer.device_class,
-                        'uptime': computer.format_uptime(),
-                        'boot_time': computer.boot_time.isoformat() if computer.boot_time else None,
-                        'os_version': computer.os_version,
-                        'logged_in_user': computer.logged_in_user
-                    }
-                }
-            )
+            # Log only status transitions and inventory changes
+            status_events = status_tracker.observe(computer, computer.last_metrics_update)
+            if status_events:
+                SystemLog.objects.bulk_create(status_events)
+            fleet_publisher.publish(computer)
+            fleet_summary.apply(computer)
 
             return Response(self.get_serializer(computer).data)
 
@@ -258,6 +337,35 @@ class ComputerViewSet(viewsets.ModelViewSet):
         except Exception as e:
             print(f"Error processing message: {e}")
 
+    @action(detail=False, methods=['get'])
+    def ingest_stats(self, request):
+        """Expose metrics ingestion write/suppression counters."""
+        stats = cache.get(INGEST_STATS_CACHE_KEY)
+        if stats is None:
+            return Response({
+                'persisted': 0,
+                'suppressed': 0,
+                'heartbeats': 0,
+                'heartbeats_skipped': 0,
+                'tracked_computers': 0,
+                'suppression_ratio': 0.0,
+                'updated_at': None
+            })
+        return Response(stats)
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Fleet aggregates maintained at ingest; honours If-None-Match."""
+        summary = fleet_summary.get()
+        etag = f'"{summary["etag"]}"'
+        if self._is_not_modified(request, etag, None):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(summary)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
     @action(detail=True, methods=['post'])
     def scan_directory(self, request, pk=None):
         """Scan a specific directory on the computer."""
@@ -382,48 +490,52 @@ class ComputerViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def commands(self, request):
-        """Endpoint for agents to pull pending commands"""
+        """
+        Endpoint for agents to pull pending commands. With ?wait=N the request is
+        held for up to N seconds until a command is queued for the host.
+        """
         hostname = request.query_params.get('hostname')
         if not hostname:
             return Response({'error': 'Hostname is required'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            computer = Computer.objects.get(hostname=hostname)
-        except Computer.DoesNotExist:
-            return Response({'error': 'Computer not found'}, status=status.HTTP_404_NOT_FOUND)
+            wait = min(float(request.query_params.get('wait', 0)),
+                       getattr(settings, 'COMMAND_LONG_POLL_MAX_SECONDS', 25))
+        except ValueError:
+            return Response({'error': 'wait must be a number of seconds'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Get pending commands for this computer
-        pending_commands = Command.objects.filter(
-            computer=computer,
-            status='pending'
-        ).values('id', 'type', 'parameters')
+        computer_id = Computer.objects.filter(hostname=hostname).values_list('id', flat=True).first()
+        if computer_id is None:
+            return Response({'error': 'Computer not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        return Response(list(pending_commands))
+        pending_commands = command_dispatcher.wait_for_commands(
+            hostname, wait, lambda: command_dispatcher.claim_pending(computer_id)
+        )
+        return Response(pending_commands)
 
     @action(detail=False, methods=['post'])
     def command_status(self, request):
         """Endpoint for agents to report command execution status"""
         command_id = request.data.get('command_id')
-        status = request.data.get('status')
+        new_status = request.data.get('status')
 
-        if not command_id or not status:
+        if not command_id or not new_status:
             return Response(
                 {'error': 'Command ID and status are required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            command = Command.objects.get(id=command_id)
-        except Command.DoesNotExist:
+        if not command_dispatcher.record_result(command_id, new_status, request.data.get('result')):
+            if not Command.objects.filter(id=command_id).exists():
+                return Response(
+                    {'error': 'Command not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
             return Response(
-                {'error': 'Command not found'},
-                status=status.HTTP_404_NOT_FOUND
+                {'error': 'Command has already finished'},
+                status=status.HTTP_409_CONFLICT
             )
 
-        command.status = status
-        command.completed_at = timezone.now()
-        command.save()
-
         return Response({'status': 'success'})
 
     @action(detail=True, methods=['post'])
@@ -452,12 +564,38 @@ class ComputerViewSet(viewsets.ModelViewSet):
             parameters=parameters,
             status='pending'
         )
+        # Push straight to the agent; if that is not possible a long-polling agent is woken instead
+        pushed = command_dispatcher.deliver(command)
 
         return Response({
             'id': command.id,
-            'status': 'Command queued successfully'
+            'status': 'Command sent to agent' if pushed else 'Command queued successfully'
         })
 
+    @action(detail=False, methods=['post'])
+    def bulk_command(self, request):
+        """Queue one command for many computers (ids, a lab tag or all online) as a single job."""
+        command_type = request.data.get('type')
+        if not command_type:
+            return Response(
+                {'error': 'Command type is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            job = command_dispatcher.create_job(
+                command_type,
+                request.data.get('parameters', {}),
+                request.data.get('targets', {}),
+                max_concurrency=int(request.data.get('max_concurrency', 10)),
+                user=request.user
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        command_dispatcher.dispatch_next(job.id)
+        return Response(command_dispatcher.progress(job), status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['post'])
     def update_metrics(self, request, pk=None):
         """Update computer system metrics."""
@@ -516,6 +654,7 @@ class ComputerViewSet(viewsets.ModelViewSet):
                 computer.last_seen = timezone.now()
             
             computer.metrics = metrics
+            computer.sync_metric_columns()
             computer.save()
             
             return Response({'status': 'metrics updated'})
@@ -528,100 +667,99 @@ class ComputerViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def execute_remote_command(self, request, pk=None):
         """Execute command directly on remote computer using WinRM"""
-        print(f"Execute command endpoint hit with pk={pk}")
-        print(f"Request data: {request.data}")
-
         command = request.data.get('command')
         if not command:
             return Response({'error': 'No command provided'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # List of commands that need PowerShell elevation
-        elevated_commands = ['net user', 'net localgroup', 'net group']
-        needs_elevation = any(cmd in command.lower() for cmd in elevated_commands)
-
         try:
             computer = self.get_object()
-            username = 'infotech'
+            elevated = needs_elevation(command)
+            logger.info(f"Executing {'elevated ' if elevated else ''}command '{command}' on {computer.label}")
 
-            # Configure WinRM session
-            session = winrm.Session(
+            result = remote_exec.run(
                 computer.ip_address,
-                auth=(username, settings.INFOTECH_PASSWORD),
-                transport='basic',
-                server_cert_validation='ignore',
-                message_encryption='never',
-                operation_timeout_sec=60,
-                read_timeout_sec=70
+                build_elevated_script(command) if elevated else command,
+                powershell=elevated
             )
 
-            print(f"Executing command '{command}' on {computer.label} as {username}")
-            
-            if needs_elevation:
-                # Use PowerShell with elevated rights and capture output
-                ps_script = f'''
-                $outputFile = "$env:TEMP\cmd_output.txt"
-                try {{
-                    # Run command with elevation and redirect output
-                    $pinfo = New-Object System.Diagnostics.ProcessStartInfo
-                    $pinfo.FileName = "cmd.exe"
-                    $pinfo.Arguments = "/c {command} > `"$outputFile`""
-                    $pinfo.Verb = "runas"
-                    $pinfo.WindowStyle = "Hidden"
-                    $pinfo.UseShellExecute = $true
-                    
-                    # Start the process and wait
-                    $p = [System.Diagnostics.Process]::Start($pinfo)
-                    $p.WaitForExit()
-                    
-                    # Read and return the output
-                    if (Test-Path $outputFile) {{
-                        $output = Get-Content -Path $outputFile -Raw
-                        Remove-Item -Path $outputFile -Force
-                        Write-Output $output
-                    }} else {{
-                        Write-Output "Command executed but produced no output"
-                    }}
-                }} catch {{
-                    Write-Error "Failed to execute elevated command: $_"
-                }} finally {{
-                    if (Test-Path $outputFile) {{
-                        Remove-Item -Path $outputFile -Force -ErrorAction SilentlyContinue
-                    }}
-                }}
-                '''
-                print(f"Executing elevated PowerShell script for command: {command}")
-                result = session.run_ps(ps_script)
-            else:
-                # Regular command execution
-                print(f"Executing regular command: {command}")
-                result = session.run_cmd(command)
-
-            if result.status_code == 0:
-                output = result.std_out.decode('utf-8', errors='replace')
-                print(f"Command executed successfully")
+            if result['status_code'] == 0:
                 return Response({
-                    'output': output if output else 'Command executed successfully (no output)',
-                    'exit_code': result.status_code
+                    'output': result['output'] or 'Command executed successfully (no output)',
+                    'exit_code': result['status_code']
                 })
-            else:
-                error = result.std_err.decode('utf-8', errors='replace')
-                print(f"Command failed: {error}")
-                return Response({
-                    'error': error or 'Command failed with no error message'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response({
+                'error': result['error'] or 'Command failed with no error message'
+            }, status=status.HTTP_504_GATEWAY_TIMEOUT if result['status_code'] is None
+                else status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         except winrm.exceptions.InvalidCredentialsError as e:
-            print(f"Authentication failed: {e}", exc_info=True)
+            logger.error(f"Authentication failed: {e}", exc_info=True)
             return Response({
                 'error': "Authentication failed. Please verify credentials."
             }, status=status.HTTP_401_UNAUTHORIZED)
         except winrm.exceptions.WinRMError as e:
-            print(f"WinRM error: {e}", exc_info=True)
+            logger.error(f"WinRM error: {e}", exc_info=True)
             return Response({
                 'error': f"WinRM error: {str(e)}"
             }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except Exception as e:
-            print(f"Error executing command: {e}", exc_info=True)
+            logger.error(f"Error executing command: {e}", exc_info=True)
             return Response({
                 'error': str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'])
+    def execute_fleet_command(self, request):
+        """
+        Execute one command over WinRM on many computers (ids, a lab tag or all online).
+        Results are streamed as newline-delimited JSON in the order hosts finish.
+        """
+        command = request.data.get('command')
+        if not command:
+            return Response({'error': 'No command provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            targets = list(
+                command_dispatcher.resolve_targets(request.data.get('targets', {}))
+                .exclude(ip_address__isnull=True)
+                .values_list('ip_address', 'id', 'label')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not targets:
+            return Response({'error': 'No computers match the given targets'}, status=status.HTTP_400_BAD_REQUEST)
+
+        computers = {ip: {'computer_id': computer_id, 'label': label} for ip, computer_id, label in targets}
+        elevated = needs_elevation(command)
+        script = build_elevated_script(command) if elevated else command
+        logger.info(f"Executing command '{command}' on {len(computers)} computers")
+
+        def stream():
+            for result in remote_exec.run_fleet(computers.keys(), script, powershell=elevated):
+                row = {**computers[result['host']], **result, 'command': command}
+                yield json.dumps(row) + '\n'
+
+        return StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+
+
+class CommandJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Aggregate view of fleet-wide command jobs"""
+    queryset = CommandJob.objects.all()
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CookieTokenAuthentication, TokenAuthentication, SessionAuthentication]
+
+    def list(self, request):
+        """Recent jobs with their progress."""
+        jobs = self.get_queryset()[:50]
+        return Response([command_dispatcher.progress(job) for job in jobs])
+
+    def retrieve(self, request, pk=None):
+        """Job progress plus per-host status."""
+        job = self.get_object()
+        return Response({
+            **command_dispatcher.progress(job),
+            'parameters': job.parameters,
+            'targets': job.targets,
+            'created_at': job.created_at.isoformat(),
+            'hosts': command_dispatcher.hosts(job)
+        })
@@ -12,12 +12,21 @@ from rest_framework.authentication import TokenAuthentication, SessionAuthentica
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from PyPDF2 import PdfReader
 from .authentication import CookieTokenAuthentication
-from .models import Computer, AuditLog, SystemLog
-from .serializers import ComputerSerializer
+from .models import Computer, AuditLog, SystemLog, ScanJob, ScanSchedule
+from .serializers import ComputerSerializer, ScanScheduleSerializer
 from .utils.scans.logs import log_scan_operation
-from .utils.scans.network import cleanup_network_connections, establish_network_connection, scan_network_directory
+from .utils.scans.hashing import sha256_file
+from .services.copy_engine import copy_engine
+from .services.scan_executor import ScanExecutor
+from .services.scan_jobs import scan_jobs
+from .services.scan_manifest import scan_manifest
+from .services.scan_pipeline import ScanPipeline
+from .services.document_index import document_index
+from .services.pdf_extraction import pdf_extraction
+from .utils.scans.network import (
+    cleanup_network_connections, establish_network_connection, iter_network_directory, scan_network_directory
+)
 from .utils.scans.operations import (
     find_case_insensitive_path, sanitize_filename, check_file_access,
     get_base_filename, is_duplicate_file, clean_up_duplicates,
@@ -32,18 +41,6 @@ logger = logging.getLogger(__name__)
 class ScanViewSet(viewsets.ViewSet):
     authentication_classes = [CookieTokenAuthentication, TokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated]
-    _scan_in_progress = False
-    _scan_queue = []
-    _current_scan_stats = {
-            'processed_pdfs': 0,
-            'computers_scanned': 0,
-            'total_computers': 0,
-            'start_time': None,
-            'estimated_completion': None,
-            'per_computer_progress': {},
-            'failed_computers': [],
-            'retry_attempts': {}
-        }
     MAX_RETRIES = 3
     SCAN_TIMEOUT = 3600
 
@@ -201,9 +198,7 @@ class ScanViewSet(viewsets.ViewSet):
         try:
             self.logger.info(f"Extracting name from PDF: {pdf_file}", extra={'event': 'EXTRACT_NAME_FROM_PDF'})
             # Open and read PDF content
-            reader = PdfReader(pdf_file)
-            page = reader.pages[0]
-            content = page.extract_text()
+            content = pdf_extraction.get(pdf_file).page1_text
             self.logger.debug(f"Extracted PDF content (first 500 chars): {repr(content[:500])}", extra={'event': 'EXTRACT_NAME_FROM_PDF'})
             
             # Determine file type from filename
@@ -270,6 +265,7 @@ class ScanViewSet(viewsets.ViewSet):
             return Response({"error": "No computers specified"}, status=400)
 
         # Convert computers to list of Computer objects
+        job = None
         try:
             computer_objects = []
             for computer_id in computers:
@@ -282,35 +278,27 @@ class ScanViewSet(viewsets.ViewSet):
             if not computer_objects:
                 return Response({"error": "No valid computers found"}, status=400)
                 
-            if self._scan_in_progress:
+            if scan_jobs.active():
                 return Response({"error": "Scan already in progress"}, status=400)
 
-            self._scan_in_progress = True
-            self._current_scan_stats = {
-                'processed_pdfs': 0,
-                'computers_scanned': 0,
-                'total_computers': len(computer_objects),
-                'start_time': timezone.now(),
-                'estimated_completion': None,
-                'per_computer_progress': {},
-                'failed_computers': [],
-                'retry_attempts': {}
-            }
+            job = scan_jobs.create(computer_objects, trigger='manual', user=request.user)
 
             # Start scan in background thread
-            thread = threading.Thread(target=self._scan_thread, args=(computer_objects,))
+            thread = threading.Thread(target=self._scan_thread, args=(job.id,))
             thread.daemon = True
             thread.start()
-            self.logger.info(f"Started scan thread for {len(computer_objects)} computers", extra={'event': 'SCAN_START'})
+            self.logger.info(f"Started scan job {job.id} for {len(computer_objects)} computers", extra={'event': 'SCAN_START'})
 
             return Response({
                 "message": f"Scan started for {len(computer_objects)} computers",
-                "scan": self._current_scan_stats
+                "job_id": job.id,
+                "scan": scan_jobs.status_payload(job.id)
             })
             
         except Exception as e:
             self.logger.error(f"Error starting scan: {str(e)}", extra={'event': 'SCAN_ERROR'})
-            self._scan_in_progress = False
+            if job is not None:
+                scan_jobs.fail(job.id, str(e))
             return Response({"error": f"Failed to start scan: {str(e)}"}, status=500)
 
     @action(detail=False, methods=['get'])
@@ -352,48 +340,57 @@ class ScanViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def status(self, request):
         """Get current scan status with detailed statistics."""
-        if not self._scan_in_progress:
-            return Response({
-                "status": "idle",
-                "message": "No scan in progress",
-                "scanning": False
-            })
-
-        # Calculate estimated completion time
-        if self._current_scan_stats['computers_scanned'] > 0:
-            elapsed = (timezone.now() - self._current_scan_stats['start_time']).total_seconds()
-            avg_time_per_computer = elapsed / self._current_scan_stats['computers_scanned']
-            remaining_computers = self._current_scan_stats['total_computers'] - self._current_scan_stats['computers_scanned']
-            estimated_remaining_seconds = avg_time_per_computer * remaining_computers
-            self._current_scan_stats['estimated_completion'] = (
-                timezone.now() + estimated_remaining_seconds
-            ).isoformat()
-
-        return Response({
-            "status": "running",
-            "message": "Scan in progress",
-            "scanning": True,
-            "stats": self._current_scan_stats,
-            "queue_length": len(self._scan_queue)
-        })
+        try:
+            job_id = request.query_params.get('job')
+            return Response(scan_jobs.status_payload(int(job_id) if job_id else None))
+        except ValueError:
+            return Response({'error': f'Invalid job ID: {job_id}'}, status=400)
+        except Exception as e:
+            self.logger.error(f"Error reading scan status: {str(e)}", extra={'event': 'SCAN_ERROR'})
+            return Response({'error': str(e)}, status=500)
 
     @action(detail=False, methods=['post'])
     def stop(self, request):
         """Stop the current scan."""
-        if self._scan_in_progress:
-            self._scan_in_progress = False
-            self._scan_queue.clear()  # Clear the queue
-            return Response({"message": "Scan stopped"})
+        if scan_jobs.cancel():
+            return Response({"message": "Scan stopping"})
         return Response({"message": "No scan in progress"})
 
+    @action(detail=False, methods=['post'])
+    def resume(self, request):
+        """Resume a cancelled, failed or interrupted scan job, skipping work already done."""
+        job_id = request.data.get('job')
+        try:
+            if scan_jobs.active():
+                return Response({"error": "Scan already in progress"}, status=400)
+            job = scan_jobs.resume(int(job_id))
+            if job is None:
+                return Response({"error": f"Scan job {job_id} cannot be resumed"}, status=400)
+
+            thread = threading.Thread(target=self._scan_thread, args=(job.id,))
+            thread.daemon = True
+            thread.start()
+            self.logger.info(f"Resumed scan job {job.id}", extra={'event': 'SCAN_START'})
+
+            return Response({
+                "message": f"Scan job {job.id} resumed",
+                "job_id": job.id,
+                "scan": scan_jobs.status_payload(job.id)
+            })
+        except (TypeError, ValueError):
+            return Response({"error": f"Invalid job ID: {job_id}"}, status=400)
+        except Exception as e:
+            self.logger.error(f"Error resuming scan: {str(e)}", extra={'event': 'SCAN_ERROR'})
+            return Response({"error": f"Failed to resume scan: {str(e)}"}, status=500)
+
     def _disconnect_computer(self, computer):
         """Disconnect from a specific computer's network share"""
         try:
             ip = computer.ip_address if hasattr(computer, 'ip_address') else computer
             network_path = fr'\\{ip}\c$'
             self.logger.info(f"Disconnecting from {getattr(computer, 'label', ip)} ({network_path})", extra={'event': 'DISCONNECT_COMPUTER'})
-            result = subprocess.run(['net', 'use', network_path, '/delete', '/y'], 
-                         capture_output=True, text=True)
+            result = subprocess.run(['net', 'use', network_path, '/delete', '/y'],
+                         capture_output=True, text=True, timeout=getattr(settings, 'SCAN_COMMAND_TIMEOUT', 120))
             if result.returncode == 0:
                 self.logger.info(f"Successfully disconnected from {getattr(computer, 'label', ip)}", extra={'event': 'DISCONNECT_COMPUTER'})
             else:
@@ -407,14 +404,19 @@ class ScanViewSet(viewsets.ViewSet):
         """Establish network connection to computer"""
         return establish_network_connection(computer.ip_address)
 
-    def _scan_single_computer(self, computer, share_path=None):
+    def _scan_single_computer(self, computer, share_path=None, progress=None, should_continue=None):
         """
-        Scan a single computer for PDF files.
+        Scan a single computer for PDF files, reporting to the job's progress if given.
+        should_continue defaults to the job's; the scan stops once it turns false.
         Returns True if scan was successful, False otherwise.
         """
         success = False
         computer_label = getattr(computer, 'label', computer.ip_address)
+        if should_continue is None:
+            should_continue = progress.should_continue if progress is not None else (lambda: True)
         try:
+            if progress is not None:
+                progress.host_started(computer.id)
             log_scan_operation(f"Starting scan for computer {computer_label}", event="SCAN_START")
             
             # Connect to the computer
@@ -426,66 +428,44 @@ class ScanViewSet(viewsets.ViewSet):
             log_scan_operation(f"Searching for PDF files on {computer_label}", event="SCAN_SEARCH")
             if share_path is None:
                 share_path = "C$\\Users"  # Default to Users directory
-            files = scan_network_directory(computer.ip_address, share_path=share_path, computer_label=computer_label)
-            
-            if not files:
+            # Files flow through the pipeline as the walk finds them; only new or changed ones are opened
+            known = scan_manifest.load(computer.id)
+            walk_errors = []
+            entries = iter_network_directory(computer.ip_address, share_path=share_path, computer_label=computer_label,
+                                             on_error=lambda path, error: walk_errors.append(path))
+            dest_dir = os.path.join(settings.MEDIA_ROOT, 'pdfs', computer_label)
+
+            def checkpoint(outcomes, touched):
+                # Finished files are remembered in batches, so a crash or cancel only loses the batch in flight
+                scan_manifest.record(computer.id, outcomes)
+                scan_manifest.touch(computer.id, touched)
+                if progress is not None:
+                    progress.host_checkpoint(computer.id, len(outcomes) + len(touched))
+
+            result = ScanPipeline().run(computer, entries, known, dest_dir,
+                                        should_continue=should_continue, checkpoint=checkpoint)
+            if not result['seen']:
                 log_scan_operation(f"No PDF files found on {computer_label}", "warning", event="NO_FILES_FOUND")
-                success = True  # Consider this a successful scan, just with no files
-                return success
-                
-            # Validate files and collect processable ones
-            valid_files = []
-            for file_path in files:
-                try:
-                    # Check if file is accessible
-                    if not check_file_access(file_path):
-                        log_scan_operation(f"Skipping inaccessible file: {file_path}", "warning", event="FILE_ACCESS_ERROR")
-                        continue
-                    
-                    # Process O*NET PDF to get new filename
-                    success, new_filename = process_onet_pdf(file_path, computer_label=computer_label)
-                    if not success:
-                        log_scan_operation(f"Error processing O*NET PDF {file_path}: {new_filename}", "error", event="FILE_PROCESSING_ERROR")
-                        continue
-                        
-                    valid_files.append((file_path, new_filename))
-                    
-                except Exception as file_error:
-                    log_scan_operation(f"Error validating file {file_path}: {str(file_error)}", "error", event="FILE_PROCESSING_ERROR")
-                    continue
-            
-            # Only create destination directory if we have valid files to process
-            if valid_files:
-                # Create destination directory using computer label
-                dest_dir = os.path.join(settings.MEDIA_ROOT, 'pdfs', computer_label)
-                os.makedirs(dest_dir, exist_ok=True)
-                log_scan_operation(f"Created destination directory for {computer_label}: {dest_dir}", event="DIRECTORY_CREATED")
-                
-                # Process valid files
-                processed_count = 0
-                for file_path, new_filename in valid_files:
-                    try:
-                        # Check for duplicates before copying
-                        if is_duplicate_onet(dest_dir, new_filename):
-                            log_scan_operation(f"Skipping duplicate O*NET file: {new_filename}", "info", event="DUPLICATE_FILE")
-                            continue
-                        
-                        # Create destination path with new filename
-                        dest_path = os.path.join(dest_dir, new_filename)
-                        
-                        # Copy file to destination with new name
-                        shutil.copy2(file_path, dest_path)
-                        log_scan_operation(f"Successfully copied file to: {dest_path}", event="FILE_COPIED")
-                        processed_count += 1
-                        
-                    except Exception as copy_error:
-                        log_scan_operation(f"Error copying file {file_path}: {str(copy_error)}", "error", event="FILE_PROCESSING_ERROR")
-                        continue
-                
-                log_scan_operation(f"Successfully processed {processed_count} files from {computer_label}", event="SCAN_SUCCESS")
-            else:
-                log_scan_operation(f"No valid files to process from {computer_label}", "warning", event="NO_VALID_FILES")
-            
+
+            # A partial listing must not make unreadable files look deleted
+            removed = 0
+            if not walk_errors and not result['cancelled']:
+                removed = scan_manifest.mark_deleted([e for path, e in known.items() if path not in result['seen']])
+            counts = result['counts']
+            copied = sum(1 for outcome in result['outcomes'] if outcome['status'] == 'copied')
+            # One batched write of this host's transfers
+            copy_engine.record(computer, result['transfers'])
+            if progress is not None:
+                progress.host_files(computer.id, counts, result['outcomes'], result['metrics'], result['transfers'])
+            if result['cancelled']:
+                log_scan_operation(f"Scan of {computer_label} stopped after {len(result['outcomes'])} files; {copied} copied", "warning", event="SCAN_CANCELLED")
+                return False
+            log_scan_operation(
+                f"{computer_label}: {counts['new']} new, {counts['changed']} changed, {counts['unchanged']} unchanged, "
+                f"{removed} removed PDF files; {copied} copied in {result['seconds']}s",
+                event="SCAN_SUCCESS"
+            )
+
             success = True
             
         except Exception as e:
@@ -502,61 +482,50 @@ class ScanViewSet(viewsets.ViewSet):
                 
         return success
 
-    def _scan_thread(self, computers):
-        """Background thread for scanning."""
+    def _scan_thread(self, job_id):
+        """Background thread that runs a queued scan job."""
+        progress = None
         try:
+            job = ScanJob.objects.get(pk=job_id)
+            # Hosts finished by an earlier attempt of this job are not scanned again
+            computers = list(Computer.objects.filter(scan_job_hosts__job_id=job_id, scan_job_hosts__status='pending'))
             total = len(computers)
-            self.logger.info(f"Starting scan thread for {total} computers", extra={'event': 'SCAN_START'})
-            self._current_scan_stats = {
-                'processed_pdfs': 0,
-                'computers_scanned': 0,
-                'total_computers': total,
-                'start_time': timezone.now(),
-                'estimated_completion': None,
-                'per_computer_progress': {},
-                'failed_computers': [],
-                'retry_attempts': {}
-            }
-            
-            for i, computer in enumerate(computers, 1):
-                if not self._scan_in_progress:
-                    self.logger.info("Scan cancelled", extra={'event': 'SCAN_CANCELLED'})
-                    break
-                
-                # Update progress before starting each computer
-                computer_label = getattr(computer, 'label', computer.ip_address)
-                self.logger.info(f"Starting scan for computer {computer_label} ({i} of {total})", extra={'event': 'COMPUTER_SCAN_START'})
-                self._current_scan_stats['per_computer_progress'][computer_label] = 0
-                
-                try:
-                    # Do the scan with retry logic
-                    success = self._scan_single_computer(computer)
-                    if success:
-                        self.logger.info(f"Successfully completed scan for {computer_label}", extra={'event': 'COMPUTER_SCAN_SUCCESS'})
-                        self._current_scan_stats['computers_scanned'] += 1
-                        self._current_scan_stats['per_computer_progress'][computer_label] = 100
-                    else:
-                        self.logger.error(f"Failed to complete scan for {computer_label}", extra={'event': 'COMPUTER_SCAN_FAILURE'})
-                        self._current_scan_stats['failed_computers'].append(computer_label)
-                except Exception as e:
-                    self.logger.error(f"Error scanning {computer_label}: {str(e)}", extra={'event': 'COMPUTER_SCAN_ERROR'})
-                    self._current_scan_stats['failed_computers'].append(computer_label)
-                    continue
-                
-                # Update estimated completion time
-                if i > 1:
-                    elapsed = (timezone.now() - self._current_scan_stats['start_time']).total_seconds()
-                    avg_time_per_computer = elapsed / i
-                    remaining_computers = total - i
-                    estimated_remaining_seconds = avg_time_per_computer * remaining_computers
-                    self.logger.info(f"Estimated completion time: {estimated_remaining_seconds}", extra={'event': 'ESTIMATED_COMPLETION_TIME'})
-                    self._current_scan_stats['estimated_completion'] = estimated_remaining_seconds
+            self.logger.info(f"Starting scan job {job_id} for {total} of {job.total_computers} computers", extra={'event': 'SCAN_START'})
+            progress = scan_jobs.start(job)
+
+            def on_progress(result):
+                # Runs on this thread only, once per finished host
+                computer_label = result['label']
+                error = result['error']
+                if result['success']:
+                    self.logger.info(f"Successfully completed scan for {computer_label} in {result['duration']}s", extra={'event': 'COMPUTER_SCAN_SUCCESS'})
+                else:
+                    if error is None and not progress.should_continue():
+                        error = 'Cancelled'
+                    self.logger.error(f"Failed to complete scan for {computer_label}: {error or 'scan failed'}", extra={'event': 'COMPUTER_SCAN_FAILURE'})
+                progress.host_finished(result['computer'].id, result['success'], error, result['duration'])
+
+            results = ScanExecutor().run(
+                computers,
+                lambda computer, host_continue: self._scan_single_computer(
+                    computer, progress=progress,
+                    # Stop when the job is cancelled or the executor gave up on this host
+                    should_continue=lambda: host_continue() and progress.should_continue()
+                ),
+                on_progress=on_progress,
+                should_continue=progress.should_continue
+            )
+            progress.finish()
 
-            self.logger.info(f"Scan thread completed. Successfully scanned {self._current_scan_stats['computers_scanned']} of {total} computers", extra={'event': 'SCAN_COMPLETE'})
+            scanned = sum(1 for result in results if result['success'])
+            self.logger.info(f"Scan job {job_id} completed. Successfully scanned {scanned} of {total} computers", extra={'event': 'SCAN_COMPLETE'})
 
-        finally:
-            self._scan_in_progress = False
-            self.logger.info("Marked scan as complete", extra={'event': 'SCAN_COMPLETE'})
+        except Exception as e:
+            self.logger.error(f"Scan job {job_id} failed: {str(e)}", extra={'event': 'SCAN_ERROR'})
+            if progress is not None:
+                progress.finish(error=str(e))
+            else:
+                scan_jobs.fail(job_id, str(e))
 
     @action(detail=False, methods=['get', 'post', 'put', 'delete'])
     def schedule(self, request):
@@ -613,40 +582,27 @@ class ScanViewSet(viewsets.ViewSet):
                 status=400
             )
 
-        if self._scan_in_progress:
+        if scan_jobs.active():
             return Response({"error": "Scan already in progress"}, status=400)
 
-        # Get the computers for this schedule
-        computers = list(schedule.computers.all())
-        
-        # Initialize scan stats with string computer labels
-        computer_progress = {str(computer.label): 0 for computer in computers}
-        
-        self._scan_in_progress = True
-        self._current_scan_stats = {
-            'processed_pdfs': 0,
-            'computers_scanned': 0,
-            'total_computers': len(computers),
-            'start_time': timezone.now(),
-            'estimated_completion': None,
-            'per_computer_progress': computer_progress,
-            'failed_computers': [],
-            'retry_attempts': {}
-        }
-
+        job = None
         try:
+            job = scan_jobs.create(schedule.computers.all(), trigger='schedule', schedule=schedule, user=request.user)
+
             # Start scan in background thread
-            thread = threading.Thread(target=self._scan_thread, args=(computers,))
+            thread = threading.Thread(target=self._scan_thread, args=(job.id,))
             thread.daemon = True
             thread.start()
 
             return Response({
                 'status': 'Scan started successfully',
-                'scan': self._current_scan_stats
+                'job_id': job.id,
+                'scan': scan_jobs.status_payload(job.id)
             })
             
         except Exception as e:
-            self._scan_in_progress = False
+            if job is not None:
+                scan_jobs.fail(job.id, str(e))
             logger.error(f"Failed to start scan: {str(e)}", extra={'event': 'SCAN_START_ERROR'})
             return Response(
                 {'error': f'Failed to start scan: {str(e)}'},
@@ -698,7 +654,8 @@ class ScanViewSet(viewsets.ViewSet):
                         continue
                     
                     # Check for duplicates
-                    if is_duplicate_file(new_filename, dest_dir):
+                    content_hash = sha256_file(file_path)
+                    if is_duplicate_file(new_filename, dest_dir, content_hash):
                         log_scan_operation(f"Skipping duplicate file: {new_filename}", "info", event="DUPLICATE_FILE")
                         continue
                     
@@ -706,6 +663,7 @@ class ScanViewSet(viewsets.ViewSet):
                     dest_path = os.path.join(dest_dir, new_filename)
                     
                     if copy_file(file_path, dest_path):
+                        document_index.register(dest_path, content_hash, computer=computer, source_path=file_path)
                         processed_files.append(new_filename)
                     
                 except Exception as e:
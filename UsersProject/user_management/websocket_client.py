@@ -8,6 +8,12 @@ from django.conf import settings
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync, sync_to_async
 from .models import Computer, SystemLog, Command
+from .services.metrics_deadband import metrics_deadband
+from .services.status_events import status_tracker
+from .services.fleet_stream import fleet_publisher
+from .services.metrics_anomaly import anomaly_detector
+from .services.fleet_summary import fleet_summary
+from .services.command_dispatch import command_dispatcher, RELAY_OUTBOX_GROUP
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
@@ -34,6 +40,8 @@ class RelayClient:
         if 'RUN_MAIN' not in os.environ:
             return
 
+        outbox_task = None
+
         try:
             # Connect
             print("\nConnecting to relay server...")
@@ -55,6 +63,9 @@ class RelayClient:
             response = await self.websocket.recv()
             print("\nRegistration response:")
             print(response)
+
+            # Forward frames queued by web workers (e.g. command fan-outs) to the relay
+            outbox_task = asyncio.create_task(self.forward_outbox())
             
             # Handle messages
             while True:
@@ -89,6 +100,14 @@ class RelayClient:
                                 computer = await sync_to_async(Computer.objects.filter(ip_address=ip_address).first)()
 
                                 if computer:
+                                    if not computer.is_active:
+                                        # A retired machine that reports again is back in service
+                                        computer.is_active = True
+                                        computer.retired_at = None
+                                    # Remember what is stored before applying this report
+                                    metrics_deadband.prime(computer)
+                                    status_tracker.prime(computer)
+
                                     # Update system information
                                     computer.device_class = metrics_data.get('device_class', computer.device_class)
                                     computer.model = metrics_data.get('model', computer.model)
@@ -134,19 +153,34 @@ class RelayClient:
                                         }
 
                                     computer.metrics = metrics
-                                    computer.last_metrics_update = timezone.now()
+                                    computer.sync_metric_columns()
+                                    now = timezone.now()
+
+                                    # Score every report in memory; the DB is only touched when a rule fires.
+                                    # Off the event loop, since it periodically checkpoints to disk.
+                                    anomalies = await sync_to_async(anomaly_detector.observe)(computer.id, metrics, now.timestamp())
+                                    if anomalies:
+                                        await sync_to_async(anomaly_detector.raise_alerts)(anomalies)
+
+                                    # Only status transitions and inventory changes are logged
+                                    status_events = status_tracker.observe(computer, now)
+
+                                    # Skip the full row write when nothing moved past its dead-band
+                                    if not status_events and not metrics_deadband.should_persist(computer, now):
+                                        await sync_to_async(metrics_deadband.heartbeat)(computer, now)
+                                        continue
+
+                                    computer.is_online = True
+                                    computer.last_metrics_update = now
+                                    computer.last_seen = now
                                     await sync_to_async(computer.save)()
+                                    metrics_deadband.record_persisted(computer, now)
                                     logging.info(f"Updated metrics for computer {computer.label} - Status: Online")
 
-                                    # Create a system log entry for the metrics update
-                                    await sync_to_async(SystemLog.objects.create)(
-                                        computer=computer,
-                                        category='COMPUTER_STATUS',
-                                        event='COMPUTER_ONLINE',
-                                        level='INFO',
-                                        message=f"Computer {computer.label} reported metrics",
-                                        details=metrics
-                                    )
+                                    if status_events:
+                                        await sync_to_async(SystemLog.objects.bulk_create)(status_events)
+                                    await fleet_publisher.apublish(computer)
+                                    await sync_to_async(fleet_summary.apply)(computer)
                                 else:
                                     # Create new computer with default label = PC{N} and store hostname
                                     # Get next available PC number
@@ -174,10 +208,23 @@ class RelayClient:
                                         is_online=True
                                     )
                                     logging.info(f"Created new computer {new_label} with hostname {agent_hostname} ({ip_address})")
+
+                                    status_events = status_tracker.observe(computer)
+                                    if status_events:
+                                        await sync_to_async(SystemLog.objects.bulk_create)(status_events)
+                                    await fleet_publisher.apublish(computer)
+                                    await sync_to_async(fleet_summary.apply)(computer)
                                     return
 
                             except Exception as e:
                                 logging.error(f"Error processing metrics: {str(e)}", exc_info=True)
+                        elif message_type == 'command_result':
+                            # Agent finished a command (or the relay could not reach it);
+                            # store it and let its job dispatch the next wave
+                            await sync_to_async(command_dispatcher.record_result)(
+                                data.get('command_id'), data.get('status'), data.get('data'),
+                                undelivered=bool(data.get('undelivered'))
+                            )
                     except json.JSONDecodeError:
                         print(f"Invalid JSON message received")
                     except Exception as e:
@@ -193,6 +240,34 @@ class RelayClient:
         except Exception as e:
             print(f"Relay connection error: {e}")
             self.is_connected = False
+        finally:
+            if outbox_task:
+                outbox_task.cancel()
+
+    async def forward_outbox(self):
+        """Relay frames published to the outbox channel layer group"""
+        if self.channel_layer is None:
+            logging.warning("No channel layer configured; relay outbox disabled")
+            return
+        channel = await self.channel_layer.new_channel()
+        await self.channel_layer.group_add(RELAY_OUTBOX_GROUP, channel)
+        try:
+            while True:
+                message = await self.channel_layer.receive(channel)
+                frame = message['frame']
+                try:
+                    await self.websocket.send(json.dumps(frame))
+                except Exception as e:
+                    logging.error(f"Failed to forward {frame.get('type')} frame to relay: {str(e)}")
+                    if frame.get('type') == 'command_fanout':
+                        # Same path as a relay that could not reach the agent
+                        for target in frame.get('targets', []):
+                            await sync_to_async(command_dispatcher.record_result)(
+                                target['command_id'], 'failed', {'error': f"Could not forward to relay: {e}"},
+                                undelivered=True
+                            )
+        finally:
+            await self.channel_layer.group_discard(RELAY_OUTBOX_GROUP, channel)
 
 # Global relay client instance
 relay_client = RelayClient()
@@ -64,15 +64,14 @@ export default function Dashboard() {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const data = await fetchWithAuth('/api/computers/')
+        const summary = await fetchWithAuth('/api/computers/summary/')
         const scanData = await fetchWithAuth('/api/scans/status/')
         
-        if (Array.isArray(data)) {
-          const onlineCount = data.filter(c => c.is_online).length
+        if (summary && typeof summary === 'object') {
           setStats(prevStats => ({
             ...prevStats,
-            onlineComputers: onlineCount,
-            totalComputers: data.length,
+            onlineComputers: summary.online_count || 0,
+            totalComputers: summary.total || 0,
           }))
         }
 
@@ -0,0 +1,78 @@
+import { useState, useEffect } from 'react';
+
+export interface FleetComputer {
+  id: number;
+  label: string;
+  hostname?: string | null;
+  ip_address?: string | null;
+  os_version?: string | null;
+  logged_in_user?: string | null;
+  status: 'online' | 'offline';
+  cpu_percent?: number | null;
+  memory_percent?: number | null;
+  disk_percent?: number | null;
+  last_seen?: string | null;
+  last_metrics_update?: string | null;
+}
+
+type FleetMessage =
+  | { type: 'snapshot'; computers: FleetComputer[] }
+  | { type: 'diff'; computers: (Partial<FleetComputer> & { id: number })[] };
+
+export function useFleetStream(enabled: boolean = true) {
+  const [computers, setComputers] = useState<Record<number, FleetComputer>>({});
+  const [connected, setConnected] = useState(false);
+
+  useEffect(() => {
+    if (!enabled) return;
+
+    let ws: WebSocket | null = null;
+    let retryTimeout: ReturnType<typeof setTimeout> | null = null;
+    let closed = false;
+
+    const connect = () => {
+      const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+      const host = process.env.NEXT_PUBLIC_WS_URL || window.location.host;
+      ws = new WebSocket(`${protocol}//${host}/ws/computers/`);
+
+      ws.onopen = () => setConnected(true);
+
+      ws.onmessage = (event: MessageEvent) => {
+        try {
+          const data: FleetMessage = JSON.parse(event.data);
+          if (data.type === 'snapshot') {
+            const next: Record<number, FleetComputer> = {};
+            data.computers.forEach(computer => { next[computer.id] = computer; });
+            setComputers(next);
+          } else if (data.type === 'diff') {
+            setComputers(prev => {
+              const next = { ...prev };
+              data.computers.forEach(diff => {
+                next[diff.id] = { ...next[diff.id], ...diff } as FleetComputer;
+              });
+              return next;
+            });
+          }
+        } catch (error) {
+          console.error('Error handling fleet stream message:', error);
+        }
+      };
+
+      ws.onclose = () => {
+        setConnected(false);
+        // Reconnect; the server re-sends a full snapshot on connect
+        if (!closed) retryTimeout = setTimeout(connect, 5000);
+      };
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      if (retryTimeout) clearTimeout(retryTimeout);
+      ws?.close();
+    };
+  }, [enabled]);
+
+  return { computers: Object.values(computers), connected };
+}
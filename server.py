@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import hashlib
 import time
 import uuid
 import shutil
@@ -12,7 +13,8 @@ from typing import List, Optional
 import logging
 from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
 from pydantic import BaseModel
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import create_engine, text
 import asyncio
@@ -35,6 +37,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'UsersProject.settings')
 django.setup()
 
 from notifications.utils import store_scanned_pdf
+from user_management.models import Computer as ComputerModel
+from user_management.services.copy_engine import copy_engine
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -180,47 +184,47 @@ def authenticate_remote(computer_ip):
         log_message(f"[{computer_ip}] Authentication failed")
 
 def copy_files(computer_ip, computer_label):
-    """Copy PDF files from remote computer's Desktop, Documents, and Downloads folders to web storage."""
+    """Copy PDF files from remote computer's Desktop, Documents, and Downloads folders straight into web storage."""
     folders_to_copy = ["Desktop", "Documents", "Downloads"]
     base_path = f"\\\\{computer_ip}\\C$\\Users"
-    
-    # Create a temporary directory for staging files
-    temp_dir = os.path.join(os.environ.get('TEMP', '/tmp'), 'pdf_staging', computer_label)
-    os.makedirs(temp_dir, exist_ok=True)
 
-    try:
-        for user in USER_PROFILES:
-            for folder in folders_to_copy:
-                source_folder = os.path.join(base_path, user, folder)
-                if not os.path.exists(source_folder):
-                    log_message(f"[{computer_label}] Skipping {source_folder} (not found)")
-                    continue
-
-                try:
-                    for file in os.listdir(source_folder):
-                        if file.lower().endswith(".pdf"):
-                            source_file = os.path.join(source_folder, file)
-                            sanitized_name = sanitize_filename(file)
-                            temp_file = os.path.join(temp_dir, sanitized_name)
-
-                            # First copy to temp directory
-                            shutil.copy2(source_file, temp_file)
-                            
-                            # Then store in web storage using the notifications.utils function
-                            attachment = store_scanned_pdf(temp_file, computer_label)
-                            if attachment:
-                                log_message(f"[{computer_label}] Successfully stored {file} in web storage")
-                            else:
-                                log_message(f"[{computer_label}] Failed to store {file} in web storage")
-
-                except Exception as e:
-                    log_message(f"[{computer_label}] Error copying from {source_folder}: {str(e)}")
-    finally:
-        # Clean up temp directory
-        try:
-            shutil.rmtree(temp_dir)
-        except Exception as e:
-            log_message(f"Error cleaning up temp directory: {str(e)}")
+    sources = []
+    for user in USER_PROFILES:
+        for folder in folders_to_copy:
+            source_folder = os.path.join(base_path, user, folder)
+            if not os.path.exists(source_folder):
+                log_message(f"[{computer_label}] Skipping {source_folder} (not found)")
+                continue
+
+            try:
+                sources += [os.path.join(source_folder, file) for file in os.listdir(source_folder)
+                            if file.lower().endswith(".pdf")]
+            except Exception as e:
+                log_message(f"[{computer_label}] Error listing {source_folder}: {str(e)}")
+
+    def store(source_file):
+        # One hop: the share is read once, straight into web storage, hashed on the way
+        sanitized_name = sanitize_filename(os.path.basename(source_file))
+
+        def save(content):
+            attachment = store_scanned_pdf(source_file, computer_label, filename=sanitized_name, content=content)
+            if attachment is None:
+                raise OSError(f"Failed to store {sanitized_name} in web storage")
+            return attachment.file.name
+
+        return copy_engine.stream_into(source_file, save)
+
+    results = copy_engine.map(store, sources)
+    for result in results:
+        if result.ok:
+            log_message(f"[{computer_label}] Successfully stored {os.path.basename(result.source)} in web storage "
+                        f"({result.bytes} bytes in {result.seconds}s)")
+        else:
+            log_message(f"[{computer_label}] Failed to store {os.path.basename(result.source)} in web storage: {result.error}")
+
+    computer = ComputerModel.objects.filter(label=computer_label).first()
+    if computer is not None:
+        copy_engine.record(computer, results)
 
 def cleanup_job(event):
     """Remove the job from database after it completes."""
@@ -527,10 +531,35 @@ class Computer(BaseModel):
 
 # Computer routes
 @app.get("/api/computers")
-async def get_computers():
-    """Get all computers from the database."""
+async def get_computers(request: Request, since: Optional[str] = None):
+    """Get all computers from the database, or only those changed since a cursor."""
+    params = {}
+    if since:
+        # A '+' in an unencoded offset arrives as a space
+        try:
+            params["since"] = datetime.fromisoformat(since.replace(' ', '+'))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="since must be a cursor returned by a previous response")
     try:
-        query = text("""
+        # Fleet version from the indexed updated_at column; answers 304 without reading rows
+        version_query = text("""
+            SELECT
+                (SELECT MAX(updated_at) FROM user_management_computer) AS last_modified,
+                (SELECT MAX(deleted_at) FROM user_management_computertombstone) AS last_deleted
+        """)
+        with engine.connect() as conn:
+            version_row = conn.execute(version_query).fetchone()
+        version = max(filter(None, [version_row.last_modified, version_row.last_deleted]), default=None)
+        cursor = version.isoformat() if version else None
+        etag = '"' + hashlib.md5(f"{cursor}|{since}".encode()).hexdigest() + '"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if cursor:
+            headers["X-Fleet-Cursor"] = cursor
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+
+        since_filter = "AND updated_at >= :since" if since else ""
+        query = text(f"""
             SELECT 
                 ip_address,
                 label,
@@ -544,11 +573,13 @@ async def get_computers():
                 total_bytes_transferred,
                 os_version,
                 user_profile
-            FROM user_management_computer 
+            FROM user_management_computer
+            WHERE is_active
+            {since_filter}
             ORDER BY label ASC
         """)
         with engine.connect() as conn:
-            result = conn.execute(query)
+            result = conn.execute(query, params)
             computer_list = []
             for row in result:
                 computer = dict(row._mapping)
@@ -565,7 +596,17 @@ async def get_computers():
                 # Ensure boolean fields are proper booleans
                 computer['is_online'] = bool(computer.get('is_online', False))
                 computer_list.append(computer)
-            return computer_list
+            if since:
+                deleted = conn.execute(text("""
+                    SELECT computer_id FROM user_management_computertombstone
+                    WHERE deleted_at >= :since
+                """), params)
+                return JSONResponse({
+                    "cursor": cursor,
+                    "changed": computer_list,
+                    "deleted": [row.computer_id for row in deleted]
+                }, headers=headers)
+            return JSONResponse(computer_list, headers=headers)
     except Exception as e:
         logger.error(f"Error fetching computers: {str(e)}")
         return {"error": str(e)}
@@ -594,7 +635,7 @@ async def update_computer_status(ip_address: str):
     try:
         query = text("""
             UPDATE user_management_computer 
-            SET last_seen = NOW(), is_online = TRUE
+            SET last_seen = NOW(), is_online = TRUE, updated_at = NOW()
             WHERE ip_address = :ip_address
             RETURNING *
         """)